@@ -17,8 +17,16 @@ case "$1" in
         find cache/ -type f -name '*_f.npy' ! -regex '.*\('$exclude'\).*' -delete
         find cache/ -type f -name '*_probstatus.txt' ! -regex '.*\('$exclude'\).*' -delete
         find cache/ -type f -name '*_x.npy' ! -regex '.*\('$exclude'\).*' -delete
+        find cache/ -type f -name '*_journal.bin' ! -regex '.*\('$exclude'\).*' -delete
+        find cache/ -type f -name '*_checkpoint.pkl' ! -regex '.*\('$exclude'\).*' -delete
+        find cache/ -type f -name 'grid_state.json' ! -regex '.*\('$exclude'\).*' -delete
+        find cache/ -type f -path '*/feasible_pool/*' -name '*.npz' ! -regex '.*\('$exclude'\).*' -delete
+        find cache/ -type f -path '*/terrain_grid/*' -name '*.npy' ! -regex '.*\('$exclude'\).*' -delete
+        find cache/ -type f -path '*/terrain_grid/*' -name '*.dat' ! -regex '.*\('$exclude'\).*' -delete
+        find cache/grid/ -type f -name 'output.log' ! -regex '.*\('$exclude'\).*' -delete
         find results/data/ -type f -name '*.log' ! -regex '.*\('$exclude'\).*' -delete
         find results/data/ -type f -name '*.csv' ! -regex '.*\('$exclude'\).*' -delete
+        find results/data/ -type f -name '*_trace.bin' ! -regex '.*\('$exclude'\).*' -delete
         ;;
     nn)
         find cache/ -type f -name '*.pth' ! -regex '.*\('$exclude'\).*' -delete
@@ -13,16 +13,36 @@ import mpl_toolkits.mplot3d.art3d as art3d
 import matplotlib.ticker as ticker
 
 
+class TurbineArrays:
+
+	# Struct of arrays with the positions, velocities, power and rated power of every turbine of a farm. The
+	# arrays are contiguous, so they are passed to the library without copies, and a layout is set (or the
+	# results are read) with a single array operation, e.g. windFLO.turbineArrays.position[:,0:2] = xy.
+
+	def __init__(self, nTurbines):
+		self.position = np.zeros((nTurbines, 3), dtype = c_double)
+		self.velocity = np.zeros((nTurbines, 3), dtype = c_double)
+		self.power = np.zeros(nTurbines, dtype = c_double)
+		self.ratedPower = np.zeros(nTurbines, dtype = c_double)
+
+
+
 class TurbineData:
 
+	# View of the turbine index of a TurbineArrays, position and velocity are rows of the arrays. If no
+	# arrays are given, the turbine has arrays of its own.
+
 	def __init__(self, **kwargs):
 	
 		params = kwargs.get('params', np.zeros(30))	
+		self.arrays = kwargs.get('arrays', None)
+		self.index = kwargs.get('index', 0)
+		if self.arrays is None:
+			self.arrays = TurbineArrays(1)
+			self.index = 0
 		self.turbineNum = params[0]
 
-		self.position = np.zeros(3)
 		self.orientation = np.zeros(3)
-		self.velocity = np.zeros(3)
 		
 		self.position[0] = params[1]
 		self.position[1] = params[2]
@@ -46,12 +66,46 @@ class TurbineData:
 		self.yaw = True
 		self.cpCurve = np.zeros((10,2))
 
-		self.variables = {'position': self.position, 'V': self.velocity, 'H': self.height, 'R': self.radius, \
+	@property
+	def position(self):
+		return self.arrays.position[self.index]
+
+	@position.setter
+	def position(self, value):
+		self.arrays.position[self.index] = value
+
+	@property
+	def velocity(self):
+		return self.arrays.velocity[self.index]
+
+	@velocity.setter
+	def velocity(self, value):
+		self.arrays.velocity[self.index] = value
+
+	@property
+	def power(self):
+		return self.arrays.power[self.index]
+
+	@power.setter
+	def power(self, value):
+		self.arrays.power[self.index] = value
+
+	@property
+	def ratedPower(self):
+		return self.arrays.ratedPower[self.index]
+
+	@ratedPower.setter
+	def ratedPower(self, value):
+		self.arrays.ratedPower[self.index] = value
+
+	@property
+	def variables(self):
+		return {'position': self.position, 'V': self.velocity, 'H': self.height, 'R': self.radius, \
 		'D': self.diameter, 'A': self.area, 'P_r': self.ratedPower, 'P': self.power}
 
 	def UpdateDict(self):
-		self.variables = {'position': self.position, 'V': self.velocity, 'H': self.height, 'R': self.radius, \
-		'D': self.diameter, 'A': self.area, 'P_r': self.ratedPower, 'P': self.power}
+		# variables is computed from the arrays every time, kept for compatibility.
+		pass
 
 	def WriteInputFile(self, filename):
 
@@ -110,7 +164,93 @@ class TurbineData:
 		if 'ratedpower' in namelist['turbine_data']:
 			self.ratedPower	= namelist['turbine_data']['ratedpower']
 			
-		
+
+
+class TerrainGrid:
+
+	# Elevation of the terrain in a regular grid, interpolated once from the points of a terrain file with
+	# the IDW or RBF terrain model. Later elevation lookups are bilinear interpolations in the grid. If
+	# cacheDir is given, the grid is saved there, keyed by the hash of the terrain file and of the terrain
+	# model parameters, and later loaded as a memory-mapped array, shared by every process that uses it.
+	# RBF kernels 1, 2 and 3 are the multiquadric, inverse multiquadric and gaussian, with shape parameter shapeFactor.
+
+	def __init__(self, terrainFile, terrainModel = 'IDW', powerIDW = 4, rbfKernel = 1, shapeFactor = 5.0, resolution = 201, cacheDir = None):
+
+		import hashlib
+
+		self.terrainModel = terrainModel.upper()
+		assert self.terrainModel in ('IDW', 'RBF'), 'Terrain model ' + terrainModel + ' not supported.'
+		with open(terrainFile, 'rb') as f:
+			content = f.read()
+		self.points = np.loadtxt(terrainFile).reshape(-1, 3)
+		self.lower = np.min(self.points[:,0:2], axis = 0)
+		self.upper = np.max(self.points[:,0:2], axis = 0)
+		self.resolution = resolution
+
+		h = hashlib.sha256(content)
+		h.update(repr((self.terrainModel, float(powerIDW), int(rbfKernel), float(shapeFactor), resolution)).encode())
+		self.key = h.hexdigest()
+
+		cacheFile = None if cacheDir is None else os.path.join(cacheDir, 'terrain_' + self.key + '.npy')
+		if cacheFile is not None and os.path.exists(cacheFile):
+			self.grid = np.load(cacheFile, mmap_mode = 'r')
+			return
+
+		gx = np.linspace(self.lower[0], self.upper[0], resolution)
+		gy = np.linspace(self.lower[1], self.upper[1], resolution)
+		nodes = np.stack(np.meshgrid(gx, gy, indexing = 'ij'), axis = -1).reshape(-1, 2)
+		if self.terrainModel == 'IDW':
+			grid = np.empty(nodes.shape[0])
+			for i in range(0, nodes.shape[0], 4096):
+				d = np.sqrt(np.sum((nodes[i:i+4096,None,:] - self.points[:,0:2])**2, axis = -1))
+				w = np.maximum(d, 1e-9) ** -float(powerIDW)
+				grid[i:i+4096] = np.sum(w * self.points[:,2], axis = -1) / np.sum(w, axis = -1)
+		else:
+			from scipy.interpolate import RBFInterpolator
+			# Repeated points make the interpolation matrix singular, their elevations are averaged.
+			xy, inverse = np.unique(self.points[:,0:2], axis = 0, return_inverse = True)
+			inverse = inverse.ravel()
+			z = np.bincount(inverse, self.points[:,2]) / np.bincount(inverse)
+			kernel = {1: 'multiquadric', 2: 'inverse_multiquadric', 3: 'gaussian'}[int(rbfKernel)]
+			grid = RBFInterpolator(xy, z, kernel = kernel, epsilon = 1.0 / float(shapeFactor))(nodes)
+		grid = grid.reshape(resolution, resolution)
+
+		if cacheFile is None:
+			self.grid = grid
+			return
+		os.makedirs(cacheDir, exist_ok = True)
+		# Several processes might build the same grid at the same time, the content is the same.
+		tmpFile = cacheFile + '.' + str(os.getpid()) + '.tmp.npy'
+		np.save(tmpFile, grid)
+		os.replace(tmpFile, cacheFile)
+		self.grid = np.load(cacheFile, mmap_mode = 'r')
+
+
+	def elevation(self, x, y):
+		# Bilinear interpolation of the grid at the points (x, y), which are clipped to the bounding box of the terrain.
+		n = self.resolution - 1
+		u = np.clip((np.asarray(x, dtype = np.float64) - self.lower[0]) / (self.upper[0] - self.lower[0]) * n, 0.0, n)
+		v = np.clip((np.asarray(y, dtype = np.float64) - self.lower[1]) / (self.upper[1] - self.lower[1]) * n, 0.0, n)
+		i = np.minimum(u.astype(np.intp), n - 1)
+		j = np.minimum(v.astype(np.intp), n - 1)
+		du = u - i
+		dv = v - j
+		g = self.grid
+		return (g[i, j] * (1.0 - du) + g[i + 1, j] * du) * (1.0 - dv) + (g[i, j + 1] * (1.0 - du) + g[i + 1, j + 1] * du) * dv
+
+
+	def writeTerrainFile(self, path):
+		# Writes the nodes of the grid as a terrain file, one "x y elevation" line per node, so that the compiled
+		# library reads the already interpolated terrain instead of the original points.
+		gx = np.linspace(self.lower[0], self.upper[0], self.resolution)
+		gy = np.linspace(self.lower[1], self.upper[1], self.resolution)
+		nodes = np.stack(np.meshgrid(gx, gy, indexing = 'ij'), axis = -1).reshape(-1, 2)
+		tmpFile = path + '.' + str(os.getpid()) + '.tmp'
+		np.savetxt(tmpFile, np.column_stack((nodes, np.asarray(self.grid).ravel())), fmt = '%.6f')
+		os.replace(tmpFile, path)
+
+
+
 def fmt(x, pos):
 	return str('{0:.2f}'.format(x))
 
@@ -153,9 +293,7 @@ class WindFLO:
 
 
 		self.nTurbines = kwargs.get('nTurbines', 0)
-		self.turbines = []
-		for i in range(0, self.nTurbines):
-			self.turbines.append( TurbineData( **kwargs ) )
+		self.SetTurbines([kwargs.get('params', np.zeros(30))] * self.nTurbines)
 
 
 		inputFile = kwargs.get('inputFile', '')
@@ -182,6 +320,8 @@ class WindFLO:
 			self.libWindFLO = cdll.LoadLibrary('./'+libPath+'libWindFLO_LINUX.so')
 
 		self.montecarlopts = kwargs.get('monteCarloPts', 1000)
+		self.writtenInputFiles = {}
+		self.terrainGrid = None
 
 	def __del__(self):
 	
@@ -287,9 +427,8 @@ class WindFLO:
 			nTurbines = len(self.namelist['windflo_data']['turbinefiles'])
 			
 		turbineFile = kwargs.get('turbineFile', '')
-		self.turbines = []
+		self.SetTurbines([np.zeros(30)] * self.nTurbines)
 		for i in range(0, self.nTurbines):
-			self.turbines.append( TurbineData( params = np.zeros(30) ) )
 			if turbineFile != '':
 				self.turbines[i].SetFromNamelist(turbineFile)
 			elif i < nTurbines:
@@ -299,6 +438,12 @@ class WindFLO:
 
 
 
+	def SetTurbines(self, turbineParams):
+		# Creates the turbines with the given params, as views of a new TurbineArrays.
+		self.turbineArrays = TurbineArrays(len(turbineParams))
+		self.turbines = [TurbineData( params = params, arrays = self.turbineArrays, index = i ) for i, params in enumerate(turbineParams)]
+
+
 	def WriteInputFile(self, **kwargs):
 	
 		runDir = kwargs.get('runDir', self.runDir)		
@@ -333,6 +478,48 @@ class WindFLO:
 		filename = kwargs.get('inFile', 'WindFLO.inp')
 		self.namelist.write(runDir + filename, force=True)
 
+
+	def InputParamsKey(self):
+		# Everything written by WriteInputFile() except the positions of the turbines.
+		turbineParams = [(t.turbineNum, t.orientation.tolist(), t.yaw, t.fictitious, float(t.height), float(t.radius), \
+						  t.cpCurve.tolist(), float(t.ratedPower)) for t in self.turbines]
+		return repr((self.rho, self.modelvelocity.tolist(), self.windmodel, self.gaussorder, self.montecarlopts, \
+					 self.referenceheight, self.surfaceroughness, self.turbulenceintensity, self.wakemodel, \
+					 self.wakemergemodel, self.wakeexpansioncoeff.tolist(), self.coe, self.terrainmodel, self.terrainfile, \
+					 self.poweridw, self.rbfkernel, self.shapefactor, self.octreemaxpts, self.octreedepth, \
+					 self.windrosefile, turbineParams))
+
+
+	def WriteChangedInputFiles(self, **kwargs):
+		# Same files as WriteInputFile(), but the files written by a previous call in the same runDir are reused.
+		# Everything is written the first time (or when a parameter other than the positions changes), and
+		# later only the turbine files whose position changed are written again, without f90nml.
+
+		runDir = kwargs.get('runDir', self.runDir)
+		filename = kwargs.get('inFile', 'WindFLO.inp')
+		key = self.InputParamsKey()
+		written = self.writtenInputFiles.get((runDir, filename))
+
+		if written is None or written['key'] != key:
+			self.WriteInputFile(**kwargs)
+			templates = []
+			for i in range(0, self.nTurbines):
+				with open(runDir + 'turbine'+str(i+1)+'.inp', 'r') as f:
+					lines = f.readlines()
+				j = [k for k, line in enumerate(lines) if line.strip().startswith('position')][0]
+				templates.append((''.join(lines[:j]), ''.join(lines[j+1:])))
+			written = {'key': key, 'templates': templates, 'positions': self.turbineArrays.position.copy()}
+			self.writtenInputFiles[(runDir, filename)] = written
+			return
+
+		positions = self.turbineArrays.position.copy()
+		for i in np.nonzero(np.any(positions != written['positions'], axis = 1))[0]:
+			before, after = written['templates'][i]
+			position = ', '.join(repr(float(v)) for v in positions[i])
+			with open(runDir + 'turbine'+str(i+1)+'.inp', 'w') as f:
+				f.write(before + '    position = ' + position + '\n' + after)
+		written['positions'] = positions
+
 		
 
 
@@ -340,7 +527,14 @@ class WindFLO:
 		self.ParseKwargsForAnalysisParams(**kwargs)
 		
 		self.runDir = kwargs.get('runDir', self.runDir)			
-		self.WriteInputFile(**kwargs)
+		# With incremental = True, the input files are kept in runDir after the run, and the next
+		# run with the same runDir only writes the turbine files whose position changed.
+		incremental = kwargs.get('incremental', False)
+		if incremental:
+			self.WriteChangedInputFiles(**kwargs)
+		else:
+			self.writtenInputFiles.pop((self.runDir, kwargs.get('inFile', 'WindFLO.inp')), None)
+			self.WriteInputFile(**kwargs)
 			
 		self.libWindFLO.Python_WindFLO_API.argtypes = [POINTER(c_char),		# infilename
 												 	  POINTER(c_char),		# infilename
@@ -359,14 +553,10 @@ class WindFLO:
 		CoutFile = np.asarray(resFile + '\0', dtype = c_char).ctypes.data_as(POINTER(c_char))
 
 		
-		velocities = np.zeros(self.nTurbines*3, dtype = c_double)
-		Cvelocities = velocities.ctypes.data_as(POINTER(c_double))
-		
-		power = np.zeros(self.nTurbines, dtype = c_double)		
-		Cpower = power.ctypes.data_as(POINTER(c_double))
-
-		ratedpower = np.zeros(self.nTurbines, dtype = c_double)		
-		Cratedpower = ratedpower.ctypes.data_as(POINTER(c_double))
+		# The library writes the results directly in the arrays of the turbines.
+		Cvelocities = self.turbineArrays.velocity.ctypes.data_as(POINTER(c_double))
+		Cpower = self.turbineArrays.power.ctypes.data_as(POINTER(c_double))
+		Cratedpower = self.turbineArrays.ratedPower.ctypes.data_as(POINTER(c_double))
 
 
 		outputs = np.zeros(100, dtype = c_double)				
@@ -380,26 +570,25 @@ class WindFLO:
 		self.farmCost = outputs[3]
 		self.landUsed = outputs[4]
 		self.COE = self.farmCost / self.AEP		
-		self.totalRatedPower = np.sum(ratedpower)
+		self.totalRatedPower = np.sum(self.turbineArrays.ratedPower)
 		self.normalizedAEP = self.AEP / (self.totalRatedPower * 365.0 * 24.0)
 		
 		self.UpdateDict()
 		
-		clean = kwargs.get('clean', True)		
-		k = 0
-		for i in range(0, self.nTurbines):
-			for j in range(0, 3):
-				self.turbines[i].velocity[j] = velocities[k]
-				k = k + 1
-			self.turbines[i].power = power[i]
-			self.turbines[i].ratedPower = ratedpower[i]
-			self.turbines[i].UpdateDict()			
-			if clean:			
-				os.remove(self.namelist['windflo_data']['turbinefiles'][i])
+		clean = kwargs.get('clean', True) and not incremental
 		if clean:		
+			for i in range(0, self.nTurbines):
+				os.remove(self.namelist['windflo_data']['turbinefiles'][i])
 			os.remove(inFile)
 
 			
+	def GetTerrainGrid(self, terrainFile = None, cacheDir = None, resolution = 201):
+		# TerrainGrid of the terrain file and model of this object, also used by plotWindFLO3D().
+		terrainFile = self.terrainfile if terrainFile is None else terrainFile
+		self.terrainGrid = TerrainGrid(terrainFile, self.terrainmodel, self.poweridw, self.rbfkernel, self.shapefactor, resolution, cacheDir)
+		return self.terrainGrid
+
+
 	def clean(self):
 		self.libWindFLO.Clean_()
 	def cleanall(self):
@@ -436,15 +625,15 @@ class WindFLO:
 		# Get turbines in farm
 		line = f.readline()
 		line = f.readline()
-		self.turbines = []
+		turbineParams = []
 		for i in range(0, self.nTurbines):
 			line = f.readline()
 			
 			if(line.strip() == '$ConvexHull'):
 				break
 			
-			turbineParams = [float(i) for i in line.split(',')]
-			self.turbines.append( TurbineData( params = turbineParams ) )
+			turbineParams.append([float(i) for i in line.split(',')])
+		self.SetTurbines(turbineParams)
 		
 		# Get convex hull params		
 		line = f.readline()
@@ -465,9 +654,8 @@ class WindFLO:
 		self.convexHull.resize((j,2))
 		
 		
-		ratedPower = np.array([i.ratedPower for i in self.turbines])
-		self.totalRatedPower = np.sum(ratedPower)
-		self.farmPower = np.sum(np.array([i.power for i in self.turbines]))
+		self.totalRatedPower = np.sum(self.turbineArrays.ratedPower)
+		self.farmPower = np.sum(self.turbineArrays.power)
 		self.farmEfficiency = self.farmPower / self.totalRatedPower
 		self.normalizedAEP = self.AEP / (self.totalRatedPower * 365.0 * 24.0)
 
@@ -605,6 +793,13 @@ class WindFLO:
 		y = np.array([i.position[1] for i in self.turbines])
 		z = np.array([i.position[2] for i in self.turbines])
 		H = np.array([i.height for i in self.turbines])
+		if self.terrainGrid is not None:
+			z = self.terrainGrid.elevation(x, y)
+			step = max(1, self.terrainGrid.resolution // 50)
+			gx = np.linspace(self.terrainGrid.lower[0], self.terrainGrid.upper[0], self.terrainGrid.resolution)[::step]
+			gy = np.linspace(self.terrainGrid.lower[1], self.terrainGrid.upper[1], self.terrainGrid.resolution)[::step]
+			GX, GY = np.meshgrid(gx, gy, indexing = 'ij')
+			ax.plot_surface(GX, GY, np.asarray(self.terrainGrid.grid)[::step, ::step], cmap = cm.terrain, alpha = 0.4, linewidth = 0)
 		var1 = np.array([LA.norm(i.variables[plotVariable[0]]) for i in self.turbines])	* scale[0]
 	
 		for i in range(0,len(x)):
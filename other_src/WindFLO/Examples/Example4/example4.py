@@ -27,6 +27,7 @@ sys.path.append('../../Optimizers/')
 import os
 import numpy as np
 import matplotlib.pyplot as plt
+from functools import partial
 from multiprocessing import Pool
 from numpy import linalg
 
@@ -41,7 +42,7 @@ inputFile = 'WindFLO.dat'	# Input file to read
 turbineFile = 'V90-3MW.dat'	# Turbine parameters
 terrainfile = 'terrain.dat'	# Terrain file
 diameter = 90.0			# Diameter to compute clearance constraint
-MaxSimulRun = 10		# maximum allowable parallel runs (depends on core availability)
+MaxSimulRun = os.cpu_count()	# maximum allowable parallel runs (depends on core availability)
 
 windFLO = WindFLO(inputFile = inputFile, nTurbines = nTurbines, libDir = libPath, 
 		  turbineFile = turbineFile, terrainfile = terrainfile, runDir = '')
@@ -113,24 +114,33 @@ def ComputeClearance(x):
 	return ( minClearence - diameter ) # g(x) = minClearence - diameter
 
 
+# ComputeClearance of every configuration (i.e. of every row of x) at once
+def ComputeClearanceBatch(x):
+
+	position = x.reshape(x.shape[0], nTurbines, 2)
+	i, j = np.triu_indices(nTurbines, 1)
+	# minimum clearance of each farm over every pair of turbines
+	minClearence = linalg.norm( position[:,i,:] - position[:,j,:], axis = 2 ).min(axis = 1)
+	return ( minClearence - diameter ).reshape(-1, 1)
+
+
 # Given a set of configurations (i.e. a matrix of turbines x), compute the
-# performance of each farm configuration in parallel 
-def RunParallel(x):
+# performance of each farm configuration in parallel in the worker processes
+# of casePool, and its clearance constraint at the same time
+def RunParallel(x, casePool):
 
 	# Number of individual farm configurations
 	n = x.shape[0]
 
-	# Create pool of worker process... taken as minimum
-	# of number of allowable parallel process and number of configurations
-	casePool = Pool(min(n,MaxSimulRun))
-	
 	# Run the cases in parallel... first argument is the function to unzip arguments
 	# prep the directories and call the EvaluateFarm function... the second argument
 	# zips the name of the directory and the turbine locations in each configuration
-	outputs = casePool.map( EvaluateFarm_Helper , zip( ('Run'+str(i)+'/', x[i,:]) for i in range(0,n) ) )
-	casePool.close()
+	outputs = casePool.map_async( EvaluateFarm_Helper , zip( ('Run'+str(i)+'/', x[i,:]) for i in range(0,n) ) )
+	
+	# The constraint is computed while the cases run
+	clearance = ComputeClearanceBatch(x)
 
-	return np.array(outputs)
+	return np.array(outputs.get()), clearance
 
 
 if __name__ == "__main__":
@@ -140,10 +150,16 @@ if __name__ == "__main__":
 	ubound = np.ones(nTurbines*2)*2000	#upper bounds of x and y of turbines
 
 
-	# Solve the optimization problem in parallel
-	xBest, bestPower = pso(lbound, ubound, parallelFunc = RunParallel, ieqcons=[ComputeClearance],
-			 args=(), kwargs={}, swarmsize=50, omega=0.5, phip=0.5, phig=0.5, maxiter=100, 
-			 minstep=1e-8, minfunc=1e-8, debug=True)
+	# Create the pool of worker processes once, it is reused in every iteration
+	with Pool(MaxSimulRun) as casePool:
+
+		# Solve the optimization problem in parallel, RunParallel returns the
+		# objective and the constraint of the whole swarm
+		xBest, bestPower, times = pso(lbound, ubound, parallelFunc = partial(RunParallel, casePool = casePool), 
+				 ieqcons=[ComputeClearance], args=(), kwargs={}, swarmsize=50, omega=0.5, phip=0.5, phig=0.5, 
+				 maxiter=100, minstep=1e-8, minfunc=1e-8, debug=True, timing_output=True)
+
+	print('Seconds per iteration: {:} (evaluating the swarm {:})'.format(times[:,1].mean(), times[:,0].mean()))
 
 
 	# Evaluate the best farm layout
@@ -17,6 +17,8 @@
 '''
 
 from functools import partial
+import os
+import time
 import numpy as np
 
 def dummyFunc(x):
@@ -31,6 +33,19 @@ def _is_feasible_wrapper(func, x):
     return np.sum(np.where(constraint < 0.0, np.abs(constraint), 0.0 ) )
 
 
+def _is_feasible_batch(constraints):
+    # Same as _is_feasible_wrapper for a (S, m) matrix of constraint values
+    constraints = np.asarray(constraints, dtype=float)
+    constraints = constraints.reshape(constraints.shape[0], -1)
+    return np.sum(np.where(constraints < 0.0, np.abs(constraints), 0.0 ), axis=1)
+
+
+def _obj_is_feasible_wrapper(obj, is_feasible, x):
+    # Objective and constraints of a particle in a single task, so that each
+    # iteration is a single map over the swarm
+    return obj(x), is_feasible(x)
+
+
 def _cons_none_wrapper(x):
     return np.array([0])
 
@@ -40,10 +55,52 @@ def _cons_ieqcons_wrapper(ieqcons, args, kwargs, x):
 def _cons_f_ieqcons_wrapper(f_ieqcons, args, kwargs, x):
     return np.array(f_ieqcons(x, *args, **kwargs))
     
+def move_swarm(x, v, p, g, lb, ub, omega, phip, phig, rp, rg):
+    """
+    Returns the new positions and velocities (x, v) of the particles, given
+    their best known positions p, the swarm's best known position g and the
+    uniform random matrices rp and rg of the same shape as x
+    """
+    # Update the particles velocities
+    v = omega*v + phip*rp*(p - x) + phig*rg*(g - x)
+    # Update the particles' positions
+    x = x + v
+    # Correct for bound violations
+    maskl = x < lb
+    masku = x > ub
+    x = x*(~np.logical_or(maskl, masku)) + lb*maskl + ub*masku
+    return x, v
+
+
+def update_particle_best(x, fx, fs, p, fp, sp):
+    """
+    Updates in place the best known position p, objective value fp and 
+    constraint violation sp of each particle, with the positions x, objective 
+    values fx and constraint violations fs of the last iteration
+    """
+    mask = (fs <= sp)
+    minf = (fx[mask] < fp[mask])
+    i_update =  np.arange(len(fx))[mask][minf]
+    p[i_update, :] = x[i_update, :].copy()
+    fp[i_update] = fx[i_update]
+    sp[i_update] = fs[i_update]
+
+
+def swarm_best(fs, fp):
+    """
+    Index of the particle that is a candidate for the swarm's best position: 
+    the one with the lowest fp among those with the lowest violation fs in 
+    the last iteration
+    """
+    mask = ( fs == np.min(fs) )
+    minf = np.argmin(fp[mask])
+    return np.arange(len(fs))[mask][minf]
+
+
 def pso(lb, ub, func = dummyFunc, parallelFunc = [], ieqcons=[], f_ieqcons=None, args=(), kwargs={}, 
         swarmsize=100, omega=0.5, phip=0.5, phig=0.5, maxiter=100, 
         minstep=1e-8, minfunc=1e-8, debug=False, processes=1,
-        particle_output=False):
+        particle_output=False, executor=None, n_workers=None, timing_output=False):
     """
     Perform a particle swarm optimization (PSO)
    
@@ -58,6 +115,13 @@ def pso(lb, ub, func = dummyFunc, parallelFunc = [], ieqcons=[], f_ieqcons=None,
    
     Optional
     ========
+    parallelFunc : function
+        Evaluates the whole swarm at once. It is given the (S, D) matrix of
+        particle positions and returns either the array of the S objective 
+        values, or a tuple (objective values, constraint values) where the 
+        constraint values are a (S, m) matrix with the same meaning as 
+        f_ieqcons. In the second case, ieqcons and f_ieqcons are not used 
+        (Default: [])
     ieqcons : list
         A list of functions of length n such that ieqcons[j](x,*args) >= 0.0 in 
         a successfully optimized problem (Default: [])
@@ -94,10 +158,25 @@ def pso(lb, ub, func = dummyFunc, parallelFunc = [], ieqcons=[], f_ieqcons=None,
         (Default: False)
     processes : int
         The number of processes to use to evaluate objective function and 
-        constraints (default: 1)
+        constraints (default: 1). The processes are created once per call 
+        and closed before returning.
     particle_output : boolean
         Whether to include the best per-particle position and the objective
         values at those.
+    executor : object
+        A multiprocessing.Pool, a concurrent.futures executor or any object
+        with a map(fn, iterable, chunksize) method, used instead of creating 
+        processes. It is owned by the caller, so the same workers can be 
+        reused by several calls to pso, and it is not closed. Ignored if 
+        parallelFunc is given (Default: None)
+    n_workers : int
+        The number of workers of executor, used to split the swarm in tasks 
+        of several particles. If None, it is taken from the executor 
+        (_max_workers of concurrent.futures executors, _processes of 
+        multiprocessing.Pool or n_workers), or the number of cores 
+        (Default: None)
+    timing_output : boolean
+        Whether to include the time spent in each iteration (Default: False)
    
     Returns
     =======
@@ -109,6 +188,10 @@ def pso(lb, ub, func = dummyFunc, parallelFunc = [], ieqcons=[], f_ieqcons=None,
         The best known position per particle
     pf: arrray
         The objective values at each position in p
+    t : array
+        Only if timing_output is True. A (iterations+1, 2) matrix with the
+        seconds spent evaluating the swarm and the total seconds of each
+        iteration. The first row is the initialization of the swarm.
    
     """
    
@@ -118,9 +201,6 @@ def pso(lb, ub, func = dummyFunc, parallelFunc = [], ieqcons=[], f_ieqcons=None,
     ub = np.array(ub)
     assert np.all(ub>lb), 'All upper-bound values must be greater than lower-bound values'
    
-    vhigh = np.abs(ub - lb)
-    vlow = -vhigh
-
     # Initialize objective function
     obj = partial(_obj_wrapper, func, args, kwargs)
     
@@ -139,12 +219,78 @@ def pso(lb, ub, func = dummyFunc, parallelFunc = [], ieqcons=[], f_ieqcons=None,
             print('Single constraint function given in f_ieqcons')
         cons = partial(_cons_f_ieqcons_wrapper, f_ieqcons, args, kwargs)
     is_feasible = partial(_is_feasible_wrapper, cons)
+    obj_is_feasible = partial(_obj_is_feasible_wrapper, obj, is_feasible)
 
     # Initialize the multiprocessing module if necessary
-    if processes > 1:
+    mp_pool = None
+    if parallelFunc == [] and executor is None and processes > 1:
         import multiprocessing
         mp_pool = multiprocessing.Pool(processes)
-        
+        executor = mp_pool
+        n_workers = processes
+    elif executor is not None and n_workers is None:
+        n_workers = _executor_workers(executor)
+    try:
+        return _pso(lb, ub, parallelFunc, obj, is_feasible, obj_is_feasible, executor, n_workers,
+                    swarmsize, omega, phip, phig, maxiter, minstep, minfunc, debug,
+                    particle_output, timing_output)
+    finally:
+        if mp_pool is not None:
+            mp_pool.close()
+            mp_pool.join()
+
+
+def _executor_workers(executor):
+    # Number of workers of a concurrent.futures executor, a multiprocessing.Pool
+    # or a windflo_evaluator_pool
+    for attribute in ('_max_workers', '_processes', 'n_workers'):
+        value = getattr(executor, attribute, None)
+        if isinstance(value, int):
+            return value
+    return os.cpu_count()
+
+
+def _evaluate_swarm(x, parallelFunc, obj, is_feasible, obj_is_feasible, executor, n_workers):
+    # Objective values and feasibility of every particle, each in a single call
+    S = x.shape[0]
+    if parallelFunc != []:
+        res = parallelFunc(x)
+        if isinstance(res, tuple):
+            fx, constraints = res
+            return np.asarray(fx, dtype=float), _is_feasible_batch(constraints)
+        fx = np.asarray(res, dtype=float)
+        fs = np.array([is_feasible(x[i, :]) for i in range(S)])
+    elif executor is not None:
+        # Several particles per task when there are many particles per worker
+        chunksize = max(1, S // (4 * n_workers))
+        res = list(executor.map(obj_is_feasible, x, chunksize=chunksize))
+        fx = np.array([r[0] for r in res], dtype=float)
+        fs = np.array([r[1] for r in res], dtype=float)
+    else:
+        fx = np.zeros(S)
+        fs = np.zeros(S)
+        for i in range(S):
+            fx[i] = obj(x[i, :])
+            fs[i] = is_feasible(x[i, :])
+    return fx, fs
+
+
+def _pso(lb, ub, parallelFunc, obj, is_feasible, obj_is_feasible, executor, n_workers,
+         swarmsize, omega, phip, phig, maxiter, minstep, minfunc, debug,
+         particle_output, timing_output):
+
+    vhigh = np.abs(ub - lb)
+    vlow = -vhigh
+    times = []
+
+    def output(g, fg, p, fp):
+        res = (g, fg)
+        if particle_output:
+            res = res + (p, fp)
+        if timing_output:
+            res = res + (np.array(times).reshape(-1, 2),)
+        return res
+
     # Initialize the particle swarm ############################################
     S = swarmsize
     D = len(lb)  # the number of dimensions each particle has
@@ -160,34 +306,19 @@ def pso(lb, ub, func = dummyFunc, parallelFunc = [], ieqcons=[], f_ieqcons=None,
     sg = np.inf  # best swarm position starting value    
     
     # Initialize the particle's position
+    t_start = time.perf_counter()
     x = lb + x*(ub - lb)
 
     # Calculate objective and constraints for each particle
-    if processes > 1:
-        fx = np.array(mp_pool.map(obj, x))
-        fs = np.array(mp_pool.map(is_feasible, x))
-    elif parallelFunc != []:
-            fx = parallelFunc(x)
-            for i in range(S):
-                fs[i] = is_feasible(x[i, :])
-    else:
-        for i in range(S):
-            fx[i] = obj(x[i, :])
-            fs[i] = is_feasible(x[i, :])
+    t_eval = time.perf_counter()
+    fx, fs = _evaluate_swarm(x, parallelFunc, obj, is_feasible, obj_is_feasible, executor, n_workers)
+    t_eval = time.perf_counter() - t_eval
        
 
-    mask = (fs <= sp)
-    minf = (fx[mask] < fp[mask])
-    i_update =  np.arange(S)[mask][minf]
-    p[i_update, :] = x[i_update, :].copy()
-    fp[i_update] = fx[i_update]
-    sp[i_update] = fs[i_update]
-
+    update_particle_best(x, fx, fs, p, fp, sp)
 
     # Update swarm's best position
-    mask = ( fs == np.min(fs) )
-    minf = np.argmin(fp[mask])
-    i_min = np.arange(S)[mask][minf]
+    i_min = swarm_best(fs, fp)
     if (fs[i_min] < sg) or (fs[i_min] == sg and fp[i_min] < fg) :        
         g = p[i_min, :].copy()    
         fg = fp[i_min]
@@ -199,47 +330,27 @@ def pso(lb, ub, func = dummyFunc, parallelFunc = [], ieqcons=[], f_ieqcons=None,
        
     # Initialize the particle's velocity
     v = vlow + np.random.rand(S, D)*(vhigh - vlow)
+    times.append((t_eval, time.perf_counter() - t_start))
        
     # Iterate until termination criterion met ##################################
     it = 1
     while it <= maxiter:
+        t_start = time.perf_counter()
         rp = np.random.uniform(size=(S, D))
         rg = np.random.uniform(size=(S, D))
-
-        # Update the particles velocities
-        v = omega*v + phip*rp*(p - x) + phig*rg*(g - x)
-        # Update the particles' positions
-        x = x + v
-        # Correct for bound violations
-        maskl = x < lb
-        masku = x > ub
-        x = x*(~np.logical_or(maskl, masku)) + lb*maskl + ub*masku
+        x, v = move_swarm(x, v, p, g, lb, ub, omega, phip, phig, rp, rg)
 
         # Update objectives and constraints
-        if processes > 1:
-            fx = np.array(mp_pool.map(obj, x))
-            fs = np.array(mp_pool.map(is_feasible, x))
-        elif parallelFunc != []:
-            fx = parallelFunc(x)
-            for i in range(S):
-                fs[i] = is_feasible(x[i, :])
-        else:
-            for i in range(S):
-                fx[i] = obj(x[i, :])
-                fs[i] = is_feasible(x[i, :])
+        t_eval = time.perf_counter()
+        fx, fs = _evaluate_swarm(x, parallelFunc, obj, is_feasible, obj_is_feasible, executor, n_workers)
+        t_eval = time.perf_counter() - t_eval
 
         # Store particle's best position (if constraints are satisfied)
-        mask = (fs <= sp)
-        minf = (fx[mask] < fp[mask])
-        i_update =  np.arange(S)[mask][minf]
-        p[i_update, :] = x[i_update, :].copy()
-        fp[i_update] = fx[i_update]
-        sp[i_update] = fs[i_update]
+        update_particle_best(x, fx, fs, p, fp, sp)
+        times.append((t_eval, time.perf_counter() - t_start))
 
         # Compare swarm's best position with global best position
-        mask = ( fs == np.min(fs) )
-        minf = np.argmin(fp[mask])
-        i_min = np.arange(S)[mask][minf]
+        i_min = swarm_best(fs, fp)
         if (fs[i_min] < sg) or (fs[i_min] == sg and fp[i_min] < fg) :        
             if debug:
                 print('New best for swarm at iteration {:}: {:} {:}'\
@@ -250,17 +361,11 @@ def pso(lb, ub, func = dummyFunc, parallelFunc = [], ieqcons=[], f_ieqcons=None,
             if (sg == fs[i_min]) and np.abs(fg - fp[i_min]) <= minfunc:
                 print('Stopping search: Swarm best objective change less than {:}'\
                     .format(minfunc))
-                if particle_output:
-                    return p_min, fp[i_min], p, fp
-                else:
-                    return p_min, fp[i_min]
+                return output(p_min, fp[i_min], p, fp)
             elif stepsize <= minstep:
                 print('Stopping search: Swarm best position change less than {:}'\
                     .format(minstep))
-                if particle_output:
-                    return p_min, fp[i_min], p, fp
-                else:
-                    return p_min, fp[i_min]
+                return output(p_min, fp[i_min], p, fp)
             else:
                 g = p_min.copy()
                 fg = fp[i_min]
@@ -275,7 +380,4 @@ def pso(lb, ub, func = dummyFunc, parallelFunc = [], ieqcons=[], f_ieqcons=None,
     
     if is_feasible(g) > 0:
         print("However, the optimization couldn't find a feasible design. Sorry")
-    if particle_output:
-        return g, fg, p, fp
-    else:
-        return g, fg
\ No newline at end of file
+    return output(g, fg, p, fp)
\ No newline at end of file
@@ -1,7 +1,6 @@
 import numpy as np
-import threading
-import queue
 from interfaces import *
+from ask_tell_bridge import ask_tell_bridge
 from ax import optimize
 from contextlib import contextmanager
 import random
@@ -41,15 +40,11 @@ class ax_optimizer:
         def fun(x):
             # numpy array for x from wierd framework format
             restore_global_rs(self.old_state)
-            self.x_queue.put(np.array([el[1] for el in sorted(x.items(), key=lambda z: float(z[0].strip("x")))]))
-            f_res = self.f_queue.get(timeout=30000.0)
+            f_res = self.bridge.evaluate(np.array([el[1] for el in sorted(x.items(), key=lambda z: float(z[0].strip("x")))]))
             assert type(f_res)==float or type(f_res) == np.float64, "f_res = "+str(f_res) + "| type = " + str(type(f_res))
             set_global_rs(self.rs.randint(int(4294967293)))
             return f_res
 
-        self.x_queue = queue.Queue()
-        self.f_queue = queue.Queue()
-
 
         gs = GenerationStrategy(
             steps=[
@@ -77,6 +72,8 @@ class ax_optimizer:
 
 
         def minimize():
+            # Global random states of the optimizer, swapped with the ones of local_solve in fun().
+            self.old_state = set_global_rs(self.rs.randint(4294967293))
             best_parameters, best_values, experiment, model = optimize(
                 parameters=[
                 {
@@ -92,16 +89,15 @@ class ax_optimizer:
                 generation_strategy=gs,
 
             )
-        self.old_state = set_global_rs(self.rs.randint(4294967293))
-        thread = threading.Thread(target=minimize, args=[], daemon=True)
-        thread.start()
+        self.bridge = ask_tell_bridge(minimize)
+        self.bridge.start()
 
         # print(best_parameters)
         # param.random_state = self.rs
 
     def ask(self):
-        return self.x_queue.get()
+        return self.bridge.ask()
 
     def tell(self, f):
-        self.f_queue.put(f)
+        self.bridge.tell(f)
 
@@ -1,32 +1,22 @@
 import numpy as np
 from cobyqa import minimize
 from scipy.optimize import NonlinearConstraint, Bounds
-import threading
-import queue
+from ask_tell_bridge import ask_tell_bridge
 from main import problem
 
 
 
-x_queue = queue.Queue()
-f_queue = queue.Queue()
-
-
-def fun(x):
-    x_queue.put(x)
-    f_res = f_queue.get(timeout=30000.0)
-    assert type(f_res)==float or f_res==np.nan or type(f_res) == np.float64, "f_res = "+str(f_res) + "| type = " + str(type(f_res))
-    return f_res
-
-
-
 class cobyqa:
 
     def __init__(self, problem: problem, seed):
-        self.x_queue = x_queue
-        self.f_queue = f_queue
         self.problem = problem
         self.rs = np.random.RandomState(seed+78)
 
+        def fun(x):
+            f_res = self.bridge.evaluate(x)
+            assert type(f_res)==float or f_res==np.nan or type(f_res) == np.float64, "f_res = "+str(f_res) + "| type = " + str(type(f_res))
+            return f_res
+
         def minimz():
             while True:
                 x0 = problem.random_initial_sol()
@@ -43,15 +33,15 @@ class cobyqa:
         "radius_init": 0.1,
         "feasibility_tol": np.finfo(float).eps,
         }
-        thread = threading.Thread(target=minimz, daemon=True)
-        thread.start()
+        self.bridge = ask_tell_bridge(minimz)
+        self.bridge.start()
 
 
     def ask(self):
-        return self.x_queue.get()
+        return self.bridge.ask()
 
     def tell(self, f):
-        self.f_queue.put(f)
+        self.bridge.tell(f)
  
 
 
@@ -10,11 +10,16 @@ import warnings
 
 class ng_optimizer:
 
+    supports_async = True
+
     def __init__(self, prob:problem, seed: int, parallel_threads: int, total_budget: int):
         self.prob = prob
         self.rs = np.random.RandomState(seed+78)
         self.total_budget = total_budget
         self.parallel_threads = parallel_threads
+        # Candidates asked and not told yet, used when results are told out of order with tell(f, x).
+        # Maps the bytes of x to a list of (optimizer, candidate) pairs.
+        self.pending = {}
         self.reinitialize()
 
     def reinitialize(self):
@@ -24,17 +29,26 @@ class ng_optimizer:
         param.random_state = self.rs
         self.optimizer = ng.optimizers.NGOpt(parametrization=param,budget=self.total_budget, num_workers=self.parallel_threads, )
 
+    def get_state(self):
+        # Pickled together so that the parametrization and self.rs remain the same object after loading.
+        return {'optimizer': self.optimizer, 'rs': self.rs, 'prev_sol': getattr(self, 'prev_sol', None), 'pending': self.pending}
 
-    def ask(self):
+    def set_state(self, state):
+        self.optimizer = state['optimizer']
+        self.rs = state['rs']
+        self.prev_sol = state['prev_sol']
+        self.pending = state['pending']
+
+    def _ask_candidate(self):
         with warnings.catch_warnings(record=True) as wrngs:
             warnings.simplefilter("always")  # Set warning mode to always to catch warnings
-            self.prev_sol = self.optimizer.ask()
+            candidate = self.optimizer.ask()
             while len(wrngs) > 0:
                 warning = wrngs.pop()
                 if ' has already converged' in str(warning.message) or 'random' in str(warning.message):
                     print(f"Reinitializing nevergrad on {self.prob.n_f_evals} evaluations.")
                     self.reinitialize()
-                    self.prev_sol = self.optimizer.ask()
+                    candidate = self.optimizer.ask()
                         # if self.budget - self.n_f_evals > 10:
                         #     print(f"Reinitializing nevergrad with budget {self.budget - self.n_f_evals} left, as it already converged.")
                         #     x0 = self.prob.random_initial_sol()
@@ -42,12 +56,9 @@ class ng_optimizer:
                         #     self.optimizer = ng.optimizers.NGOpt(parametrization=param, budget=self.budget - self.n_f_evals, num_workers=self.parallel_threads,)
                 else:
                     print(warning.message)
+        return candidate
 
-
-        return self.prev_sol[0][0].value
-
-    def tell(self, f, x=None):
-        assert x is None and self.optimizer.num_workers==1, "Parallelization has not been yet implemented."
+    def _tell_candidate(self, optimizer, candidate, f):
         if self.prob.constraint_method == 'algo_specific':
             """
             Nevergrad uses the penalty method, where unfeasible solutions get penalized. The penalization is added to the loss function,
@@ -64,8 +75,43 @@ class ng_optimizer:
             """
             
 
-            self.optimizer.tell(self.prev_sol, f, constraint_violation=-np.array(self.prob.constraint_check(self.prev_sol[0][0].value)))
+            optimizer.tell(candidate, f, constraint_violation=-np.array(self.prob.constraint_check(candidate[0][0].value)))
         else:
-            self.optimizer.tell(self.prev_sol, f)
+            optimizer.tell(candidate, f)
 
+    def ask(self):
+        self.prev_sol = self._ask_candidate()
+        x = self.prev_sol[0][0].value
+        if self.optimizer.num_workers > 1:
+            self.pending.setdefault(x.tobytes(), []).append((self.optimizer, self.prev_sol))
+        return x
+
+    def ask_batch(self, k):
+        # The optimizer is stored with each candidate, as it might be reinitialized in the middle of the batch.
+        self.pending_batch = []
+        for _ in range(min(k, self.optimizer.num_workers)):
+            candidate = self._ask_candidate()
+            self.pending_batch.append((self.optimizer, candidate))
+        return np.array([candidate[0][0].value for _, candidate in self.pending_batch])
+
+    def tell_batch(self, fs):
+        assert len(fs) == len(self.pending_batch)
+        for (optimizer, candidate), f in zip(self.pending_batch, fs):
+            self._tell_candidate(optimizer, candidate, f)
+        self.pending_batch = []
 
+    def tell(self, f, x=None):
+        if x is None:
+            assert self.optimizer.num_workers==1, "With num_workers > 1, x needs to be given in tell(f, x), as results can be told out of order."
+            self._tell_candidate(self.optimizer, self.prev_sol, f)
+            return
+        key = x.tobytes()
+        if key in self.pending:
+            optimizer, candidate = self.pending[key].pop(0)
+            if len(self.pending[key]) == 0:
+                del self.pending[key]
+        else:
+            # Solution that was not asked to this optimizer, for example when resuming from a checkpoint.
+            optimizer = self.optimizer
+            candidate = self.optimizer.parametrization.spawn_child(new_value=((x,), {}))
+        self._tell_candidate(optimizer, candidate, f)
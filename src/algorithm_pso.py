@@ -0,0 +1,95 @@
+import numpy as np
+import sys
+from interfaces import *
+
+sys.path.append('other_src/WindFLO/Optimizers')
+from pso import move_swarm, update_particle_best, swarm_best
+
+
+
+class pso_optimizer:
+
+    '''
+    Particle swarm optimization with the swarm update of WindFLO/Optimizers/pso.py. Each iteration the whole swarm
+    is asked with ask_batch(), in rows of up to k particles, and the swarm only moves when the objective value of
+    every particle was told. The swarm size is rounded up to a multiple of n_workers, so that every batch fills
+    the process pool. With constraint_method 'algo_specific', the constraint violation of the particles is compared
+    before the objective value, as in pso().
+    '''
+
+    def __init__(self, prob:problem, seed: int, n_workers: int = 1, omega: float = 0.5, phip: float = 0.5, phig: float = 0.5):
+        self.prob = prob
+        self.rs = np.random.RandomState(seed+78)
+        self.omega = omega
+        self.phip = phip
+        self.phig = phig
+        swarmsize = 10 + int(2 * np.sqrt(prob.dim))
+        self.swarmsize = n_workers * int(np.ceil(swarmsize / n_workers))
+        self.reinitialize()
+
+    def reinitialize(self):
+        S, D = self.swarmsize, self.prob.dim
+        # The initial solutions are evaluated as part of the swarm, so the problem does not need to evaluate x0 first.
+        self.x = np.array([self.prob.random_initial_sol() for _ in range(S)])
+        self.prob.x0 = None
+        self.v = -1.0 + self.rs.random((S, D)) * 2.0
+        self.p = np.zeros_like(self.x)
+        self.fp = np.full(S, np.inf)
+        self.sp = np.full(S, np.inf)
+        self.g = self.x[0].copy()
+        self.fg = np.inf
+        self.sg = np.inf
+        self.fx = np.zeros(S)
+        self.fs = np.zeros(S)
+        self.n_asked = 0
+        self.n_told = 0
+
+    def get_state(self):
+        return {key: getattr(self, key) for key in ('rs', 'x', 'v', 'p', 'fp', 'sp', 'g', 'fg', 'sg', 'fx', 'fs', 'n_asked', 'n_told')}
+
+    def set_state(self, state):
+        for key, value in state.items():
+            setattr(self, key, value)
+
+    def ask_batch(self, k):
+        assert self.n_asked == self.n_told, "The previous batch was not told yet."
+        X = self.x[self.n_asked:self.n_asked + k].copy()
+        self.n_asked += X.shape[0]
+        return X
+
+    def tell_batch(self, fs):
+        i, j = self.n_told, self.n_told + len(fs)
+        assert j == self.n_asked
+        self.fx[i:j] = fs
+        if self.prob.constraint_method == 'algo_specific':
+            # Sum of the constraint violations as in pso(), with the convention that constraints > 0 are satisfied.
+            G = self.prob.constraint_check_batch(self.x[i:j])
+            self.fs[i:j] = np.sum(np.where(G <= 0.0, np.abs(G), 0.0), axis=1)
+        self.n_told = j
+        if self.n_told == self.swarmsize:
+            self._next_iteration()
+
+    def ask(self):
+        return self.ask_batch(1)[0]
+
+    def tell(self, f):
+        self.tell_batch([f])
+
+    def _next_iteration(self):
+        update_particle_best(self.x, self.fx, self.fs, self.p, self.fp, self.sp)
+        i_min = swarm_best(self.fs, self.fp)
+        if (self.fs[i_min] < self.sg) or (self.fs[i_min] == self.sg and self.fp[i_min] < self.fg):
+            self.g = self.p[i_min].copy()
+            self.fg = self.fp[i_min]
+            self.sg = self.fs[i_min]
+
+        if np.max(np.abs(self.v)) < 1e-8:
+            print(f"Reinitializing pso on {self.prob.n_f_evals} evaluations, as the swarm already converged.")
+            self.reinitialize()
+            return
+
+        rp = self.rs.random(self.x.shape)
+        rg = self.rs.random(self.x.shape)
+        self.x, self.v = move_swarm(self.x, self.v, self.p, self.g, 0.0, 1.0, self.omega, self.phip, self.phig, rp, rg)
+        self.n_asked = 0
+        self.n_told = 0
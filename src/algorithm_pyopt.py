@@ -1,25 +1,18 @@
 import numpy as np
 from numpy import cos, exp, pi
 from pyOpt import NSGA2, SLSQP, Optimization
-import threading
-import queue
+from ask_tell_bridge import ask_tell_bridge
 from main import problem
 
-x_queue = queue.Queue()
-f_queue = queue.Queue()
-
 class pyopt:
 
     def __init__(self, problem: problem, seed):
-        self.x_queue = x_queue
-        self.f_queue = f_queue
         self.problem = problem
         self.seed = seed
         self.rs = np.random.RandomState(seed+78)
 
         def fun(x):
-            self.x_queue.put(np.array(x))
-            f_res = self.f_queue.get(timeout=30000.0)
+            f_res = self.bridge.evaluate(np.array(x))
             assert type(f_res)==float or f_res==np.nan or type(f_res) == np.float64, "f_res = "+str(f_res) + "| type = " + str(type(f_res))
             constraints = [-el for el in problem.constraint_check(np.array(x))] if self.problem.constraint_method == 'algo_specific' else None
             return f_res, constraints, 1 if type(f_res)==np.nan else 0
@@ -44,15 +37,15 @@ class pyopt:
 
 
 
-        thread = threading.Thread(target=minimize, args=[opt_prob], daemon=True)
-        thread.start()
+        self.bridge = ask_tell_bridge(lambda: minimize(opt_prob))
+        self.bridge.start()
 
 
     def ask(self):
-        return self.x_queue.get()
+        return self.bridge.ask()
 
     def tell(self, f):
-        self.f_queue.put(f)
+        self.bridge.tell(f)
  
 
 
@@ -2,8 +2,7 @@ import scipy
 from scipy.optimize import NonlinearConstraint, Bounds
 import scipy.optimize
 from interfaces import *
-import threading
-import queue
+from ask_tell_bridge import ask_tell_bridge
 
 class scipyDIRECT_optimizer:
 
@@ -12,8 +11,7 @@ class scipyDIRECT_optimizer:
         self.rs = np.random.RandomState(seed+78)
 
         def fun(x):
-            self.x_queue.put(np.array(x))
-            f_res = self.f_queue.get(timeout=30000.0)
+            f_res = self.bridge.evaluate(np.array(x))
             assert type(f_res)==float or f_res==np.nan or type(f_res) == np.float64, "f_res = "+str(f_res) + "| type = " + str(type(f_res))
             return f_res
 
@@ -28,23 +26,20 @@ class scipyDIRECT_optimizer:
             for i in range(self.prob.n_constraints):
                 constraint_list.append(NonlinearConstraint(lambda x: self.prob.constraint_check(x)[i], 0.0, np.inf, keep_feasible=False))
 
-        self.x_queue = queue.Queue()
-        self.f_queue = queue.Queue()
-
         def minimize():
             scipy.optimize.direct(self.fun, bounds=bd, len_tol=0.0001, vol_tol=(0.01)**self.prob.dim,  locally_biased=False)
             print(f"Direct terminated after {self.prob.n_f_evals} evaluations. Exiting:")
             exit(1)
 
-        thread = threading.Thread(target=minimize, args=[], daemon=True)
-        thread.start()
+        self.bridge = ask_tell_bridge(minimize)
+        self.bridge.start()
 
 
 
     def ask(self):
-        return self.x_queue.get()
+        return self.bridge.ask()
 
     def tell(self, f):
-        self.f_queue.put(f)
+        self.bridge.tell(f)
  
         
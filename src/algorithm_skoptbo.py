@@ -1,8 +1,7 @@
 from skopt import gp_minimize
 import scipy.optimize
 from interfaces import *
-import threading
-import queue
+from ask_tell_bridge import ask_tell_bridge
 
 class skoptbo_optimizer:
 
@@ -10,14 +9,11 @@ class skoptbo_optimizer:
         self.prob = prob
         self.rs = np.random.RandomState(seed+78)
         def fun(x):
-            self.x_queue.put(np.array(x))
-            f_res = self.f_queue.get(timeout=30000.0)
+            f_res = self.bridge.evaluate(np.array(x))
             assert type(f_res)==float or type(f_res) == np.float64, "f_res = "+str(f_res) + "| type = " + str(type(f_res))
             return f_res
 
         self.fun = fun
-        self.x_queue = queue.Queue()
-        self.f_queue = queue.Queue()
 
 
 
@@ -33,14 +29,14 @@ class skoptbo_optimizer:
                             )
 
                 
-        thread = threading.Thread(target=minimize, args=[], daemon=True)
-        thread.start()
+        self.bridge = ask_tell_bridge(minimize)
+        self.bridge.start()
 
 
     def ask(self):
-        return self.x_queue.get()
+        return self.bridge.ask()
 
     def tell(self, f):
-        self.f_queue.put(f)
+        self.bridge.tell(f)
  
         
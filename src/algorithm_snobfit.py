@@ -9,15 +9,12 @@ https://qiskit-community.github.io/qiskit-algorithms/stubs/qiskit_algorithms.opt
 import numpy as np
 from skquant.opt import minimize
 from main import problem
-import threading
-import queue
+from ask_tell_bridge import ask_tell_bridge
 
 
 class snobfit:
 
     def __init__(self, problem: problem, seed):
-        self.x_queue = queue.Queue()
-        self.f_queue = queue.Queue()
         self.problem = problem
         self.rs = np.random.RandomState(seed+78)
         def minimiz():
@@ -32,14 +29,16 @@ class snobfit:
                 print("Optimization end. Optimization algorithm restart.")
         
 
-        thread = threading.Thread(target=minimiz, args=(), kwargs={}, daemon=True)
-        thread.start()
+        self.bridge = ask_tell_bridge(minimiz)
+        # The customized skquant minimize() communicates with x_queue.put(x) and f = f_queue.get().
+        self.x_queue, self.f_queue = self.bridge.queues()
+        self.bridge.start()
 
     def ask(self):
-        return self.x_queue.get()
+        return self.bridge.ask()
 
     def tell(self, f):
-        self.f_queue.put(f)
+        self.bridge.tell(f)
 
 
 
@@ -0,0 +1,212 @@
+import numpy as np
+import numpy.typing
+import threading
+from collections import deque
+
+'''
+Ask/tell interface for optimizers that only have a callback interface, i.e., that call the objective
+function themselves (scipy.optimize.minimize, cobyqa, pyOpt, skopt...).
+
+The optimizer runs as a coroutine: start() runs solve() until it needs the first objective value,
+and every time it needs one it calls evaluate(x), which suspends the optimizer and returns x from ask(). The
+next ask() after tell(f) resumes the optimizer, and evaluate(x) returns f. Only one side runs at a
+time, and every bridge has its own channel, so any number of optimizers can be used in the same process.
+
+If greenlet is installed, the optimizer runs in a greenlet and switching costs about a microsecond.
+Otherwise, it runs in its own thread, and each side wakes up the other with a semaphore.
+'''
+
+try:
+    import greenlet
+    HAS_GREENLET = True
+except ImportError:
+    HAS_GREENLET = False
+
+
+class ask_tell_bridge:
+
+    def __init__(self, solve, use_greenlet:bool=HAS_GREENLET):
+        '''
+        Parameters:
+            solve: Function with no arguments that runs the optimizer, computing objective values with
+                self.evaluate(x). Usually a restart loop that never returns. If it returns or raises an
+                exception, the exception is raised in the next ask().
+            use_greenlet (bool): Run solve() in a greenlet instead of a thread.
+        '''
+        assert not use_greenlet or HAS_GREENLET, "greenlet is not installed."
+        self.solve = solve
+        self.use_greenlet = use_greenlet
+        self._x_buffer = deque()
+        self._f_buffer = deque()
+        self._started = False
+        self._finished = False
+        self._error = None
+        if use_greenlet:
+            self._solver_greenlet = greenlet.greenlet(self._run)
+            self._main_greenlet = None
+        else:
+            self._to_solver = threading.Semaphore(0)
+            self._to_main = threading.Semaphore(0)
+
+    def _run(self):
+        try:
+            self.solve()
+            self._error = RuntimeError("The optimizer finished and can not be asked for more solutions.")
+        except BaseException as e:
+            self._error = e
+        self._finished = True
+        if not self.use_greenlet:
+            self._to_main.release()
+
+    def start(self):
+        '''
+        Runs the optimizer until it asks for the first solution. Adapters call it at the end of their
+        constructor, so that the optimizer is initialized (e.g. calls problem.random_initial_sol()) 
+        before the first ask().
+        '''
+        if not self._started:
+            self._resume_solver()
+
+    def _resume_solver(self):
+        # Runs the optimizer until it needs an objective value that has not been told yet.
+        if self._finished:
+            raise self._error
+        if self.use_greenlet:
+            self._main_greenlet = greenlet.getcurrent()
+            self._solver_greenlet.switch()
+        else:
+            if not self._started:
+                threading.Thread(target=self._run, daemon=True).start()
+            else:
+                self._to_solver.release()
+            self._to_main.acquire()
+        self._started = True
+        if self._finished and len(self._x_buffer) == 0:
+            raise self._error
+
+    def _wait_f(self) -> float:
+        # Called by the optimizer, suspends it until an objective value is told.
+        while len(self._f_buffer) == 0:
+            if self.use_greenlet:
+                self._main_greenlet.switch()
+            else:
+                self._to_main.release()
+                self._to_solver.acquire()
+        return self._f_buffer.popleft()
+
+    def evaluate(self, x:numpy.typing.NDArray[np.float_]) -> float:
+        '''Objective function for the optimizer: x is returned by the next ask(), and f is the value told next.'''
+        self._x_buffer.append(x)
+        return self._wait_f()
+
+    def ask(self) -> numpy.typing.NDArray[np.float_]:
+        while len(self._x_buffer) == 0:
+            self._resume_solver()
+        return self._x_buffer.popleft()
+
+    def tell(self, f:float):
+        self._f_buffer.append(f)
+
+    def queues(self):
+        '''
+        Returns (x_queue, f_queue), with the put() and get() methods of queue.Queue, for optimizers that
+        communicate with x_queue.put(x) and f = f_queue.get().
+        '''
+        return _x_channel(self), _f_channel(self)
+
+
+
+class _x_channel:
+
+    def __init__(self, bridge:ask_tell_bridge):
+        self.bridge = bridge
+
+    def put(self, x, block=True, timeout=None):
+        self.bridge._x_buffer.append(x)
+
+
+class _f_channel:
+
+    def __init__(self, bridge:ask_tell_bridge):
+        self.bridge = bridge
+
+    def get(self, block=True, timeout=None):
+        return self.bridge._wait_f()
+
+
+
+if __name__ == "__main__":
+    # Compare the cost of handing x and f between the optimizer and local_solve, and check that optimizers give the
+    # same results through the bridge: python src/ask_tell_bridge.py
+    import queue
+    import time
+    import scipy.optimize
+
+    n = 20000
+    def queue_handoff():
+        x_queue = queue.Queue()
+        f_queue = queue.Queue()
+        def solve():
+            while True:
+                x_queue.put(np.zeros(2))
+                f_queue.get()
+        threading.Thread(target=solve, daemon=True).start()
+        ref = time.time()
+        for _ in range(n):
+            x_queue.get()
+            f_queue.put(0.0)
+        return time.time() - ref
+
+    def bridge_handoff(use_greenlet):
+        def solve():
+            while True:
+                bridge.evaluate(np.zeros(2))
+        bridge = ask_tell_bridge(solve, use_greenlet)
+        bridge.start()
+        ref = time.time()
+        for _ in range(n):
+            bridge.ask()
+            bridge.tell(0.0)
+        return time.time() - ref
+
+    print(f"thread + two queues: {1e6 * queue_handoff() / n:.2f} us per evaluation")
+    print(f"bridge with threads: {1e6 * bridge_handoff(False) / n:.2f} us per evaluation")
+    if HAS_GREENLET:
+        print(f"bridge with greenlet: {1e6 * bridge_handoff(True) / n:.2f} us per evaluation")
+
+    # Several optimizers asked alternately in the same process.
+    bridges = []
+    for i in range(4):
+        def solve(i=i):
+            while True:
+                scipy.optimize.minimize(lambda x: bridges[i].evaluate(x), np.full(2, 0.1 * i), method='Nelder-Mead')
+        bridges.append(ask_tell_bridge(solve))
+        bridges[-1].start()
+    for _ in range(200):
+        for i, bridge in enumerate(bridges):
+            x = bridge.ask()
+            bridge.tell(float(np.sum((x - i) ** 2)))
+    print("Solutions of 4 interleaved optimizers:", [np.round(bridge.ask(), 3).tolist() for bridge in bridges])
+
+    # Constrained optimizers driven through the bridge give the same result as a direct call.
+    def objective(x):
+        return float((1.0 - x[0]) ** 2 + 100.0 * (x[1] - x[0] ** 2) ** 2)
+    constraints = [{'type': 'ineq', 'fun': lambda x: 1.0 - x[0] ** 2 - x[1] ** 2}]
+    for method in ('SLSQP', 'COBYLA'):
+        direct = scipy.optimize.minimize(objective, np.array([-0.5, 0.5]), constraints=constraints, method=method)
+        for use_greenlet in [False] + [True] * HAS_GREENLET:
+            results = []
+            def solve():
+                results.append(scipy.optimize.minimize(lambda x: bridge.evaluate(np.array(x)), np.array([-0.5, 0.5]), constraints=constraints, method=method))
+            bridge = ask_tell_bridge(solve, use_greenlet)
+            bridge.start()
+            n_evaluations = 0
+            while True:
+                try:
+                    x = bridge.ask()
+                except RuntimeError: # solve() returned.
+                    break
+                bridge.tell(objective(x))
+                n_evaluations += 1
+            assert len(results) == 1 and np.array_equal(results[0].x, direct.x) and results[0].fun == direct.fun and n_evaluations == direct.nfev, (method, use_greenlet, results[0], direct)
+        print(f"{method} through the bridge matches the direct call: x={np.round(direct.x, 4).tolist()}, {direct.nfev} evaluations.")
@@ -0,0 +1,63 @@
+import numpy as np
+import numpy.typing
+from collections import OrderedDict
+
+'''
+Bounded memoization of objective function and constraint values. Solutions are identified by the
+exact bytes of x (as float64), so only solutions that are bit by bit equal share a cached value.
+'''
+
+
+class evaluation_cache:
+
+    def __init__(self, max_size:int):
+        '''
+        Least recently used cache with at most max_size entries. A max_size of 0 disables the
+        cache: nothing is stored, and lookups always fail without being counted as misses.
+        '''
+        assert max_size >= 0
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.n_hits = 0
+        self.n_misses = 0
+
+    @staticmethod
+    def key(x:numpy.typing.NDArray[np.float_]) -> bytes:
+        return np.ascontiguousarray(x, dtype=np.float64).tobytes()
+
+    def lookup(self, x:numpy.typing.NDArray[np.float_]):
+        '''Returns (True, value) if x is in the cache and (False, None) otherwise.'''
+        if self.max_size == 0:
+            return False, None
+        key = self.key(x)
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.n_hits += 1
+            return True, self.entries[key]
+        self.n_misses += 1
+        return False, None
+
+    def store(self, x:numpy.typing.NDArray[np.float_], value):
+        if self.max_size == 0:
+            return
+        key = self.key(x)
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def get_or_compute(self, x:numpy.typing.NDArray[np.float_], function):
+        found, value = self.lookup(x)
+        if not found:
+            value = function(x)
+            self.store(x, value)
+        return value
+
+    def clear(self):
+        self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __str__(self):
+        return f"{self.n_hits} hits, {self.n_misses} misses, {len(self.entries)}/{self.max_size} entries"
@@ -0,0 +1,191 @@
+import numpy as np
+import numpy.typing
+import os
+import time
+import warnings
+import zlib
+
+'''
+Append-only binary journal of the evaluations made by local_solve.
+
+The file starts with a fixed size header followed by fixed size records. Each record stores the
+solution x, the objective value f, the constraint values g, the counters of the problem, the
+solver time and a wall clock timestamp, and ends with a crc32 of the rest of the record. Appending
+an evaluation writes a single record, so the cost of saving the optimization status no longer
+grows with the number of evaluations.
+
+Torn writes (a record that was only partially written to disk when the process was killed) are
+detected when the journal is reopened, and the damaged tail of the file is truncated.
+'''
+
+JOURNAL_MAGIC = b'EVALJRNL'
+JOURNAL_VERSION = 1
+HEADER_SIZE = 64
+
+
+def journal_dtype(dim:int, n_constraints:int) -> np.dtype:
+    return np.dtype([
+        ('x', np.float64, (dim,)),
+        ('f', np.float64),
+        ('g', np.float64, (n_constraints,)),
+        ('n_f_evals', np.int64),
+        ('n_constraint_evals', np.int64),
+        ('n_unfeasible_on_ask', np.int64),
+        ('f_cost_carry', np.float64), # Cost of lower fidelity evaluations not yet counted in n_f_evals.
+        ('is_x0', np.bool_), # Whether x was the initial solution problem.x0, which is not told to the algorithm.
+        ('solver_time', np.float64),
+        ('timestamp', np.float64),
+        ('crc', np.uint32),
+    ])
+
+
+def _encode_header(dim:int, n_constraints:int, record_size:int) -> bytes:
+    header = JOURNAL_MAGIC + np.array([JOURNAL_VERSION, dim, n_constraints, record_size], dtype=np.int64).tobytes()
+    return header + b'\0' * (HEADER_SIZE - len(header))
+
+
+def _decode_header(header:bytes):
+    if len(header) < HEADER_SIZE or header[:len(JOURNAL_MAGIC)] != JOURNAL_MAGIC:
+        raise ValueError("File is not an evaluation journal (bad magic number).")
+    version, dim, n_constraints, record_size = np.frombuffer(header[len(JOURNAL_MAGIC):len(JOURNAL_MAGIC)+32], dtype=np.int64)
+    if version != JOURNAL_VERSION:
+        raise ValueError(f"Evaluation journal version {version} not supported, expected {JOURNAL_VERSION}.")
+    if journal_dtype(int(dim), int(n_constraints)).itemsize != record_size:
+        raise ValueError(f"Evaluation journal record size {record_size} does not match the record layout.")
+    return int(dim), int(n_constraints), int(record_size)
+
+
+def _record_crc(record_bytes:bytes) -> int:
+    # The crc is stored in the last 4 bytes of the record.
+    return zlib.crc32(record_bytes[:-4])
+
+
+def _n_valid_records(path:str, dtype:np.dtype) -> int:
+    '''
+    Number of complete records with a valid crc at the start of the journal. Torn writes can
+    only damage the tail of the file, so records are checked from the end backwards until the
+    first valid one is found.
+    '''
+    n_records = (os.path.getsize(path) - HEADER_SIZE) // dtype.itemsize
+    if n_records <= 0:
+        return 0
+    records = np.memmap(path, dtype=dtype, mode='r', offset=HEADER_SIZE, shape=(n_records,))
+    raw = records.view(np.uint8).reshape(n_records, dtype.itemsize)
+    while n_records > 0:
+        record_bytes = raw[n_records-1].tobytes()
+        if _record_crc(record_bytes) == int(records['crc'][n_records-1]):
+            break
+        n_records -= 1
+    del records, raw
+    return n_records
+
+
+def load_journal(path:str, mmap:bool=True) -> np.ndarray:
+    '''
+    Load the valid records of an evaluation journal as a structured array with fields
+    x, f, g, n_f_evals, n_constraint_evals, n_unfeasible_on_ask, f_cost_carry, is_x0, solver_time and timestamp.
+    If mmap is True the records are memory-mapped (read only) instead of read into memory.
+    '''
+    with open(path, 'rb') as file:
+        dim, n_constraints, _ = _decode_header(file.read(HEADER_SIZE))
+    dtype = journal_dtype(dim, n_constraints)
+    n_records = _n_valid_records(path, dtype)
+    if n_records == 0:
+        return np.empty(0, dtype=dtype)
+    if mmap:
+        return np.memmap(path, dtype=dtype, mode='r', offset=HEADER_SIZE, shape=(n_records,))
+    else:
+        return np.fromfile(path, dtype=dtype, count=n_records, offset=HEADER_SIZE)
+
+
+
+class evaluation_journal:
+
+    def __init__(self, path:str, dim:int, n_constraints:int, fsync_every:int=100, fsync_interval:float=10.0):
+        '''
+        Opens the journal in path for appending, creating it if it does not exist. If the journal
+        already exists, records damaged by a torn write are truncated away.
+
+        Parameters:
+            path (str): Path of the journal file.
+            dim (int): Dimension of the solutions.
+            n_constraints (int): Number of constraint values stored per evaluation.
+            fsync_every (int): Group commit policy, fsync after this many appended records. 1
+                means fsync every record and 0 means never fsync (rely on the OS to flush).
+            fsync_interval (float): Also fsync if this many seconds passed since the last fsync,
+                so that slow runs are committed regularly. Ignored if fsync_every is 0.
+        '''
+        self.path = path
+        self.dim = dim
+        self.n_constraints = n_constraints
+        self.dtype = journal_dtype(dim, n_constraints)
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.n_truncated_bytes = 0
+
+        if os.path.exists(path) and os.path.getsize(path) >= HEADER_SIZE:
+            with open(path, 'rb') as file:
+                header_dim, header_n_constraints, _ = _decode_header(file.read(HEADER_SIZE))
+            assert (header_dim, header_n_constraints) == (dim, n_constraints), f"Journal {path} was created with (dim, n_constraints)={(header_dim, header_n_constraints)}, but {(dim, n_constraints)} was expected."
+            self.n_records = _n_valid_records(path, self.dtype)
+            valid_size = HEADER_SIZE + self.n_records * self.dtype.itemsize
+            self.n_truncated_bytes = os.path.getsize(path) - valid_size
+            if self.n_truncated_bytes > 0:
+                warnings.warn(f"Evaluation journal {path}: truncating {self.n_truncated_bytes} bytes of torn/damaged records.", RuntimeWarning)
+                os.truncate(path, valid_size)
+            self.file = open(path, 'ab')
+        else:
+            self.n_records = 0
+            self.file = open(path, 'wb')
+            self.file.write(_encode_header(dim, n_constraints, self.dtype.itemsize))
+            self.file.flush()
+            os.fsync(self.file.fileno())
+
+        self._record = np.zeros(1, dtype=self.dtype)
+        self._n_not_synced = 0
+        self._last_sync = time.time()
+
+
+    def append(self, x:numpy.typing.NDArray[np.float_], f:float, g, n_f_evals:int, n_constraint_evals:int, n_unfeasible_on_ask:int, solver_time:float, f_cost_carry:float=0.0, is_x0:bool=False):
+        record = self._record
+        record['x'] = x
+        record['f'] = f
+        record['g'] = g
+        record['n_f_evals'] = n_f_evals
+        record['n_constraint_evals'] = n_constraint_evals
+        record['n_unfeasible_on_ask'] = n_unfeasible_on_ask
+        record['f_cost_carry'] = f_cost_carry
+        record['is_x0'] = is_x0
+        record['solver_time'] = solver_time
+        record['timestamp'] = time.time()
+        record['crc'] = _record_crc(record.tobytes())
+        self.file.write(record.tobytes())
+        self.file.flush()
+        self.n_records += 1
+        self._n_not_synced += 1
+        if self.fsync_every > 0 and (self._n_not_synced >= self.fsync_every or time.time() - self._last_sync > self.fsync_interval):
+            self.sync()
+
+    def sync(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self._n_not_synced = 0
+        self._last_sync = time.time()
+
+    def load(self, mmap:bool=True) -> np.ndarray:
+        self.file.flush()
+        return load_journal(self.path, mmap)
+
+    def close(self):
+        if not self.file.closed:
+            self.sync()
+            self.file.close()
+
+    def __len__(self):
+        return self.n_records
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
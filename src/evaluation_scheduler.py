@@ -0,0 +1,132 @@
+import numpy as np
+import numpy.typing
+import time
+from concurrent.futures import wait, FIRST_COMPLETED
+
+'''
+Asynchronous evaluation of expensive objective functions. Up to n_in_flight solutions are being
+evaluated at the same time, and each result is told to the algorithm as soon as it is available,
+which is not necessarily in the same order as the solutions were asked.
+'''
+
+
+class async_evaluation_scheduler:
+
+    def __init__(self, prob, algo, n_in_flight:int, executor, fidelity:int=None):
+        '''
+        Parameters:
+            prob (problem): The problem, its objective function prob._f is evaluated with executor.
+            algo (optimization_algorithm): Needs to support out of order tells, see optimization_algorithm.supports_async().
+            n_in_flight (int): Maximum number of solutions asked and not yet told.
+            executor: A concurrent.futures executor to evaluate prob._f with.
+            fidelity (int): Fidelity level of the evaluations, as in prob.f(x, fidelity). None is the highest level.
+        '''
+        assert algo.supports_async(), f"Algorithm {algo.algorithm_name} cannot tell results out of order."
+        assert n_in_flight >= 1
+        self.fidelity = prob._check_fidelity(fidelity)
+        self.prob = prob
+        self.algo = algo
+        self.n_in_flight = n_in_flight
+        self.executor = executor
+        # Evaluations being computed. Maps the bytes of x to [future, x, encoded x, constraint values, number of times x was asked, submission time].
+        self.pending = {}
+        self.n_asked_not_told = 0
+        self.n_duplicates = 0
+        # Seconds spent in algo.ask_async() and algo.tell_async() (without the constraint checks made 
+        # inside them), and duration of the last evaluation told, for the timing trace of local_solve.
+        self.time_ask = 0.0
+        self.time_tell = 0.0
+        self.last_evaluation_time = 0.0
+
+    def _timed(self, function, *args):
+        ref, constraint_ref = time.perf_counter(), self.prob.constraint_check_time
+        res = function(*args)
+        return res, (time.perf_counter() - ref) - (self.prob.constraint_check_time - constraint_ref)
+
+    def _ask(self, on_result):
+        x, elapsed = self._timed(self.algo.ask_async)
+        self.time_ask += elapsed
+        key = x.tobytes()
+        self.n_asked_not_told += 1
+        if key in self.pending:
+            # Do not evaluate a solution that is already being evaluated, tell its result twice instead.
+            self.pending[key][4] += 1
+            self.n_duplicates += 1
+            return
+        x_encoded, g, return_value = self.prob._f_prepare(x)
+        if x_encoded is None:
+            # Not evaluated (e.g. unfeasible with nan_on_unfeasible), can be told right away.
+            self.last_evaluation_time = 0.0
+            self._tell(x, return_value, g, 1, on_result)
+            return
+        found, f = self.prob._lookup_f(x_encoded, self.fidelity)
+        if found:
+            self.prob._f_evaluated(self.fidelity)
+            self.last_evaluation_time = 0.0
+            self._tell(x, f, g, 1, on_result)
+        else:
+            future = self.executor.submit(self.prob._f_at(self.fidelity), x_encoded)
+            self.pending[key] = [future, x, x_encoded, g, 1, time.perf_counter()]
+
+    def _tell(self, x, f, g, n_times, on_result):
+        for _ in range(n_times):
+            _, elapsed = self._timed(self.algo.tell_async, x, f)
+            self.time_tell += elapsed
+            self.n_asked_not_told -= 1
+            if not on_result is None:
+                on_result(x, f, g)
+
+    def run(self, on_result=None, stop=None):
+        '''
+        Ask, evaluate and tell until the budget of the problem is exhausted. on_result(x, f, g) is called
+        after each tell. If stop() returns True, no more solutions are asked and the pending ones are
+        finished before returning.
+        '''
+        while True:
+            while self.n_asked_not_told < self.n_in_flight and self.prob.n_f_evals + len(self.pending) < self.prob.budget and (stop is None or not stop()):
+                self._ask(on_result)
+            if len(self.pending) == 0:
+                if self.prob.n_f_evals >= self.prob.budget or (not stop is None and stop()):
+                    return
+                continue
+            done, _ = wait([el[0] for el in self.pending.values()], return_when=FIRST_COMPLETED)
+            for key in [key for key, el in self.pending.items() if el[0] in done]:
+                future, x, x_encoded, g, n_times, submit_time = self.pending.pop(key)
+                f = future.result()
+                # Time from submission until the result is processed, including waiting for a free worker.
+                self.last_evaluation_time = time.perf_counter() - submit_time
+                self.prob._store_f(x_encoded, f, self.fidelity)
+                self.prob._f_evaluated(self.fidelity)
+                self._tell(x, f, g, n_times, on_result)
+
+
+
+def sleep_objective(x:numpy.typing.NDArray[np.float_], seconds:float=0.1) -> float:
+    '''Stand-in for an expensive objective function. Sleeps for a duration between 0 and 2*seconds that depends on x.'''
+    time.sleep(2.0 * seconds * float(x[0]))
+    return float(np.linalg.norm(x - 0.5))
+
+
+
+if __name__ == "__main__":
+    # Check the scheduler with nevergrad and a sleep based objective function: python src/evaluation_scheduler.py
+    import functools
+    from concurrent.futures import ThreadPoolExecutor
+    from interfaces import problem, optimization_algorithm
+
+    budget = 40
+    for n_in_flight in [1, 4, 8]:
+        prob = problem("toy", budget, 'ignore', 2, True)
+        prob._f = functools.partial(sleep_objective, seconds=0.05)
+        algo = optimization_algorithm(prob, "nevergrad", 2, n_workers=n_in_flight)
+        asked = []
+        told = []
+        ask_async = algo.ask_async
+        algo.ask_async = lambda: asked.append(ask_async()) or asked[-1]
+        with ThreadPoolExecutor(n_in_flight) as executor:
+            ref = time.time()
+            async_evaluation_scheduler(prob, algo, n_in_flight, executor).run(lambda x, f, g: told.append(x))
+            elapsed = time.time() - ref
+        assert prob.n_f_evals == budget and len(told) == len(asked)
+        n_out_of_order = sum(not np.all(x_asked == x_told) for x_asked, x_told in zip(asked, told))
+        print(f"n_in_flight={n_in_flight}: {budget} evaluations in {elapsed:.2f}s, {n_out_of_order} of {len(told)} results told out of order.")
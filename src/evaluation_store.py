@@ -0,0 +1,83 @@
+import numpy as np
+import numpy.typing
+import os
+import sqlite3
+
+'''
+Persistent content-addressed store of objective function values, shared by every run (and every
+process) that evaluates the same deterministic problem. Values are keyed by (problem id, problem
+configuration hash, bytes of x), so a solution evaluated once by any algorithm, seed or constraint
+method is not evaluated again as long as the configuration of the problem does not change.
+
+The store is a sqlite database in write-ahead logging mode, which allows several processes to read
+while another one writes. Noisy problems must not use it, as the stored value would be served for
+every later evaluation of x.
+'''
+
+
+class evaluation_store:
+
+    def __init__(self, path:str, problem_id:str, config_hash:str, timeout:float=60.0):
+        '''
+        Parameters:
+            path (str): Path of the sqlite database, created if it does not exist.
+            problem_id (str): Name of the problem.
+            config_hash (str): Hash of the configuration of the problem (see windflo_instance.config_hash() in problem_windflo.py).
+            timeout (float): Seconds to wait for the lock held by other processes before failing.
+        '''
+        self.path = path
+        self.problem_id = problem_id
+        self.config_hash = config_hash
+        self.timeout = timeout
+        self.n_hits = 0
+        self.n_misses = 0
+        self._connection = None
+        self._connection_pid = None
+        self._get_connection()
+
+    def _get_connection(self) -> sqlite3.Connection:
+        # sqlite connections can not be shared with forked processes, so each process opens its own.
+        if self._connection_pid != os.getpid():
+            self._connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute('PRAGMA synchronous=NORMAL')
+            self._connection.execute('CREATE TABLE IF NOT EXISTS evaluations (problem_id TEXT NOT NULL, config_hash TEXT NOT NULL, x BLOB NOT NULL, f REAL, PRIMARY KEY (problem_id, config_hash, x)) WITHOUT ROWID')
+            self._connection_pid = os.getpid()
+        return self._connection
+
+    @staticmethod
+    def key(x:numpy.typing.NDArray[np.float_]) -> bytes:
+        return np.ascontiguousarray(x, dtype=np.float64).tobytes()
+
+    def lookup(self, x:numpy.typing.NDArray[np.float_]):
+        '''Returns (True, f) if x is in the store and (False, None) otherwise.'''
+        row = self._get_connection().execute('SELECT f FROM evaluations WHERE problem_id=? AND config_hash=? AND x=?', (self.problem_id, self.config_hash, self.key(x))).fetchone()
+        if row is None:
+            self.n_misses += 1
+            return False, None
+        self.n_hits += 1
+        # sqlite stores nan as NULL.
+        return True, np.nan if row[0] is None else row[0]
+
+    def store(self, x:numpy.typing.NDArray[np.float_], f:float):
+        # If another process stored x in the meantime, the value is the same, so keep the existing one.
+        self._get_connection().execute('INSERT OR IGNORE INTO evaluations VALUES (?, ?, ?, ?)', (self.problem_id, self.config_hash, self.key(x), float(f)))
+
+    def __len__(self):
+        return self._get_connection().execute('SELECT COUNT(*) FROM evaluations WHERE problem_id=? AND config_hash=?', (self.problem_id, self.config_hash)).fetchone()[0]
+
+    def close(self):
+        if not self._connection is None and self._connection_pid == os.getpid():
+            self._connection.close()
+        self._connection = None
+        self._connection_pid = None
+
+    def __str__(self):
+        return f"{self.n_hits} hits, {self.n_misses} misses"
+
+    def __getstate__(self):
+        # Connections can not be pickled, they are opened again when needed.
+        state = self.__dict__.copy()
+        state['_connection'] = None
+        state['_connection_pid'] = None
+        return state
@@ -0,0 +1,77 @@
+import numpy as np
+import numpy.typing
+import os
+
+'''
+Per evaluation timing trace of local_solve. For each evaluation, the seconds spent in algo.ask(),
+in the objective function, in constraint checks, in algo.tell() and in saving the journal,
+checkpoints and logs are appended to a binary file with fixed size records (28 bytes each).
+
+Time spent checking constraints inside ask(), f() or tell() is counted as constraint time, and
+not in the other components. With batches, the time of the batch is split evenly among its
+evaluations.
+'''
+
+TRACE_COMPONENTS = ['ask', 'f', 'constraint', 'tell', 'io']
+TRACE_DTYPE = np.dtype([('n_f_evals', np.int64)] + [(name, np.float32) for name in TRACE_COMPONENTS])
+
+
+def load_trace(path:str) -> np.ndarray:
+    '''Load a trace as a structured array with fields n_f_evals, ask, f, constraint, tell and io. An incomplete last record is ignored.'''
+    n_records = os.path.getsize(path) // TRACE_DTYPE.itemsize
+    return np.fromfile(path, dtype=TRACE_DTYPE, count=n_records)
+
+
+def time_per_1000_evaluations(trace:np.ndarray, block_size:int=1000):
+    '''
+    Returns (n_blocks, time), where time[i,j] is the time spent in component TRACE_COMPONENTS[j] by the
+    evaluations with n_f_evals in [i*block_size, (i+1)*block_size).
+    '''
+    blocks = (trace['n_f_evals'] - 1) // block_size
+    blocks = np.maximum(blocks, 0)
+    n_blocks = int(blocks.max()) + 1 if len(trace) > 0 else 0
+    time = np.zeros((n_blocks, len(TRACE_COMPONENTS)))
+    for j, name in enumerate(TRACE_COMPONENTS):
+        time[:,j] = np.bincount(blocks, weights=trace[name], minlength=n_blocks)
+    return n_blocks, time
+
+
+def trace_summary(trace:np.ndarray) -> str:
+    '''Total and mean time of each component, and the share of the total time.'''
+    total = sum(float(np.sum(trace[name], dtype=np.float64)) for name in TRACE_COMPONENTS)
+    lines = [f"Timing of {len(trace)} evaluations, {total:.2f}s in total:"]
+    for name in TRACE_COMPONENTS:
+        component_total = float(np.sum(trace[name], dtype=np.float64))
+        component_mean = component_total / max(len(trace), 1)
+        lines.append(f"{name:>10}: {component_total:12.3f}s total {1000*component_mean:12.4f}ms mean {100*component_total/max(total, 1e-12):6.2f}%")
+    return "\n".join(lines)
+
+
+
+class evaluation_trace:
+
+    def __init__(self, path:str, buffer_size:int=1000):
+        '''Appends to the trace in path, creating it if it does not exist. Records are written to disk in groups of buffer_size evaluations.'''
+        self.path = path
+        self.buffer = np.zeros(buffer_size, dtype=TRACE_DTYPE)
+        self.n_buffered = 0
+        if os.path.exists(path):
+            # Drop an incomplete record left by a run that was killed while writing.
+            os.truncate(path, (os.path.getsize(path) // TRACE_DTYPE.itemsize) * TRACE_DTYPE.itemsize)
+        self.file = open(path, 'ab')
+
+    def append(self, n_f_evals:int, ask:float, f:float, constraint:float, tell:float, io:float):
+        if self.n_buffered == len(self.buffer):
+            self.flush()
+        self.buffer[self.n_buffered] = (n_f_evals, ask, f, constraint, tell, io)
+        self.n_buffered += 1
+
+    def flush(self):
+        self.file.write(self.buffer[:self.n_buffered].tobytes())
+        self.file.flush()
+        self.n_buffered = 0
+
+    def close(self):
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
@@ -0,0 +1,243 @@
+import numpy as np
+import json
+import os
+import sys
+import time
+import traceback
+import multiprocessing
+from multiprocessing.connection import wait
+
+'''
+Runs a grid of local_solve() jobs on several worker processes.
+
+Each job runs in its own process, so a job that crashes (an exception, or a segfault in one of
+the compiled simulators) does not take the rest of the grid with it, and is retried up to
+max_retries times. As local_solve() resumes from its evaluation journal, a retried job continues
+from the last evaluation saved. The status of each job is saved in a json state file, so running
+the same grid again skips the finished jobs and resumes the unfinished ones.
+
+Jobs are started from the most expensive to the cheapest (estimated with the costs below, or the
+measured time of finished jobs of the same kind), so that the long jobs do not end up running
+alone at the end of the grid.
+'''
+
+
+# Rough time in seconds of evaluating the objective function once.
+F_EVAL_COST = {'airframes': 600.0, 'windflo': 0.05, 'toy': 1e-5}
+# The wake interactions of windflo_{n} grow with the square of the number of turbines.
+F_EVAL_COST.update({f'windflo_{n}': 0.05 * (n / 10)**2 for n in (20, 50, 100, 200, 500)})
+F_EVAL_COST.update({f'{name}_terrain': cost for name, cost in F_EVAL_COST.items() if name.startswith('windflo')})
+
+# Rough time in seconds the algorithm needs for its i-th ask/tell, as (a, b) in a + b*i. Model based
+# algorithms get slower as the number of evaluations increases (see --plot-snobfit-time-per-1000-evaluations).
+ALGORITHM_COST = {
+    'snobfit': (0.035, 2.5e-5),
+    'cobyqa': (1e-3, 1e-6),
+    'pyopt': (1e-3, 1e-6),
+    'nevergrad': (1e-3, 0.0),
+    'scipySLSQP': (1e-4, 0.0),
+    'scipyDIRECT': (1e-4, 0.0),
+    'skoptbo': (0.5, 1e-3),
+    'ax': (1.0, 1e-3),
+    'pso': (1e-5, 0.0),
+}
+
+# Problems whose evaluations use fixed file paths, so two jobs of these problems can not run at the same time.
+SERIAL_PROBLEMS = {'airframes'}
+
+
+
+class grid_job:
+
+    def __init__(self, problem_name:str, algorithm_name:str, constraint_method:str, seed:int, budget:int, reuse_encoding:bool, task_info=None, log_every=None):
+        self.problem_name = problem_name
+        self.algorithm_name = algorithm_name
+        self.constraint_method = constraint_method
+        self.seed = seed
+        self.budget = budget
+        self.reuse_encoding = reuse_encoding
+        self.task_info = task_info
+        self.log_every = log_every
+        task_info_str = "" if task_info is None else task_info["task_name"]
+        self.job_id = f"{problem_name}_{task_info_str}_{algorithm_name}_{constraint_method}_{budget}_{seed}"
+        # Jobs with the same kind are expected to take the same time.
+        self.kind = f"{problem_name}_{task_info_str}_{algorithm_name}_{constraint_method}_{budget}"
+
+    def prior_cost(self) -> float:
+        a, b = ALGORITHM_COST.get(self.algorithm_name, (1e-3, 0.0))
+        return self.budget * F_EVAL_COST.get(self.problem_name, 1.0) + a * self.budget + b * self.budget * self.budget / 2.0
+
+    def run(self, cache_dir:str, result_dir:str):
+        from interfaces import local_solve
+        local_solve(self.problem_name, self.algorithm_name, self.constraint_method, self.seed, self.budget, self.reuse_encoding,
+                    log_every=self.log_every, task_info=self.task_info, cache_dir=cache_dir, result_dir=result_dir)
+
+    def __str__(self):
+        return f"{self.problem_name} {self.seed} {self.constraint_method} {self.algorithm_name}"
+
+
+
+def _run_job_process(job:grid_job, cache_dir:str, result_dir:str, output_path:str):
+    # Executed in the worker process. stdout and stderr (also of compiled libraries) go to the output file of the job.
+    output = os.open(output_path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+    sys.stdout.flush()
+    sys.stderr.flush()
+    os.dup2(output, 1)
+    os.dup2(output, 2)
+    try:
+        job.run(cache_dir, result_dir)
+    except BaseException:
+        traceback.print_exc()
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(1)
+    sys.stdout.flush()
+    sys.stderr.flush()
+
+
+
+class experiment_grid:
+
+    def __init__(self, job_list:list, n_workers:int, state_path:str='cache/grid_state.json', cache_root:str='cache/grid/', result_dir:str='results/data/', max_retries:int=2, log_path:str='global_log.log'):
+        '''
+        Parameters:
+            job_list (list): The grid_job-s to run.
+            n_workers (int): Maximum number of jobs running at the same time.
+            state_path (str): Json file with the status of each job.
+            cache_root (str): Each job saves its journal and checkpoint in its own directory cache_root/job_id/.
+            result_dir (str): Where the result csv and log of each job are saved. The file names of different
+                jobs are different, and the plots expect them all in the same directory.
+            max_retries (int): A job that crashes is run again up to max_retries times before marking it as failed.
+            log_path (str): Log with the start and end of each job.
+        '''
+        assert n_workers >= 1
+        job_ids = [job.job_id for job in job_list]
+        assert len(set(job_ids)) == len(job_ids), "Repeated jobs in the grid."
+        self.job_list = job_list
+        self.n_workers = n_workers
+        self.state_path = state_path
+        self.cache_root = cache_root
+        self.result_dir = result_dir
+        self.max_retries = max_retries
+        self.log_path = log_path
+        self.state = self._load_state()
+
+    def _load_state(self) -> dict:
+        state = {}
+        if os.path.exists(self.state_path):
+            with open(self.state_path, 'r') as file:
+                state = json.load(file)
+        for job in self.job_list:
+            if job.job_id not in state:
+                state[job.job_id] = {'status': 'pending', 'attempts': 0, 'elapsed': None, 'kind': job.kind}
+            elif state[job.job_id]['status'] == 'running':
+                # The grid was interrupted while this job was running, it will resume from its journal.
+                state[job.job_id]['status'] = 'pending'
+        return state
+
+    def _save_state(self):
+        with open(self.state_path + '.tmp', 'w') as file:
+            json.dump(self.state, file, indent=1)
+        os.replace(self.state_path + '.tmp', self.state_path)
+
+    def _log(self, *args):
+        with open(self.log_path, 'a') as file:
+            print(time.strftime('%Y-%m-%d %H:%M:%S'), *args, file=file)
+
+    def estimated_cost(self, job:grid_job) -> float:
+        measured = [el['elapsed'] for el in self.state.values() if el['kind'] == job.kind and el['status'] == 'done' and not el['elapsed'] is None]
+        if len(measured) > 0:
+            return float(np.mean(measured))
+        return job.prior_cost()
+
+    def job_cache_dir(self, job:grid_job) -> str:
+        return os.path.join(self.cache_root, job.job_id)
+
+    def prepare(self):
+        '''
+        Train the encoders needed by the nn_encoding jobs before starting the workers, as jobs
+        with reuse_encoding share the encoder and would otherwise train it at the same time.
+        '''
+        from interfaces import problem
+        prepared = set()
+        for job in self.job_list:
+            if job.constraint_method != 'nn_encoding' or self.state[job.job_id]['status'] != 'pending':
+                continue
+            encoding_seed = 2 if job.reuse_encoding else job.seed
+            if (job.problem_name, encoding_seed) in prepared:
+                continue
+            problem(job.problem_name, job.budget, job.constraint_method, job.seed, job.reuse_encoding, job.task_info)
+            prepared.add((job.problem_name, encoding_seed))
+
+    def _start(self, job:grid_job) -> multiprocessing.Process:
+        from interfaces import local_solve_paths
+        cache_dir = self.job_cache_dir(job)
+        os.makedirs(cache_dir, exist_ok=True)
+        journal_path, _, result_file_path = local_solve_paths(job.problem_name, job.algorithm_name, job.constraint_method, job.seed, job.budget, job.task_info, cache_dir, self.result_dir)
+        if not os.path.exists(journal_path) and os.path.exists(result_file_path) and self.state[job.job_id]['attempts'] > 0:
+            # The previous attempt crashed before saving its first evaluation, start again.
+            os.remove(result_file_path)
+        process = multiprocessing.Process(target=_run_job_process, args=(job, cache_dir, self.result_dir, os.path.join(cache_dir, 'output.log')), name=job.job_id)
+        process.start()
+        self.state[job.job_id]['status'] = 'running'
+        self.state[job.job_id]['attempts'] += 1
+        self._save_state()
+        self._log(f"Launching {job} (attempt {self.state[job.job_id]['attempts']})")
+        return process
+
+    def run(self, show_progress:bool=True):
+        '''Runs the jobs that are not finished yet. Returns the list of ids of the jobs that failed.'''
+        from tqdm import tqdm as tqdm
+        pending = [job for job in self.job_list if self.state[job.job_id]['status'] in ('pending', 'failed')]
+        for job in pending:
+            if self.state[job.job_id]['status'] == 'failed':
+                # Failed jobs of a previous run of the grid get max_retries attempts again.
+                self.state[job.job_id]['status'] = 'pending'
+                self.state[job.job_id]['attempts'] = 0
+        pending.sort(key=self.estimated_cost, reverse=True)
+        self.prepare()
+
+        pb = tqdm(total=len(self.job_list), initial=len(self.job_list) - len(pending), disable=not show_progress)
+        running = {} # Maps process sentinels to (process, job, start time).
+        try:
+            while len(pending) > 0 or len(running) > 0:
+                running_serial_problems = {job.problem_name for _, job, _ in running.values() if job.problem_name in SERIAL_PROBLEMS}
+                for job in list(pending):
+                    if len(running) >= self.n_workers:
+                        break
+                    if job.problem_name in running_serial_problems:
+                        continue
+                    pending.remove(job)
+                    process = self._start(job)
+                    running[process.sentinel] = (process, job, time.time())
+                    if job.problem_name in SERIAL_PROBLEMS:
+                        running_serial_problems.add(job.problem_name)
+
+                for sentinel in wait(list(running.keys())):
+                    process, job, start_time = running.pop(sentinel)
+                    process.join()
+                    job_state = self.state[job.job_id]
+                    if process.exitcode == 0:
+                        job_state['status'] = 'done'
+                        job_state['elapsed'] = time.time() - start_time
+                        self._log(f"done {job} in {job_state['elapsed']:.1f}s")
+                        pb.update()
+                    elif job_state['attempts'] <= self.max_retries:
+                        job_state['status'] = 'pending'
+                        self._log(f"crashed {job} with exit code {process.exitcode}, retrying. See {os.path.join(self.job_cache_dir(job), 'output.log')}")
+                        pending.insert(0, job)
+                    else:
+                        job_state['status'] = 'failed'
+                        self._log(f"failed {job} after {job_state['attempts']} attempts. See {os.path.join(self.job_cache_dir(job), 'output.log')}")
+                        pb.update()
+                    self._save_state()
+        finally:
+            # If interrupted, the running jobs are stopped and will be resumed the next time the grid is run.
+            for process, job, _ in running.values():
+                process.terminate()
+                process.join()
+                self.state[job.job_id]['status'] = 'pending'
+            self._save_state()
+            pb.close()
+
+        return [job.job_id for job in self.job_list if self.state[job.job_id]['status'] == 'failed']
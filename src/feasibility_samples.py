@@ -0,0 +1,122 @@
+import numpy as np
+import numpy.typing
+import os
+import json
+import time
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+'''
+Generation of the feasible and unfeasible samples used to train the classifier of learn_encoding.py.
+
+Uniform random points are drawn in chunks of chunk_size rows, chunk c is always the same (it is generated
+with the seeds c and seed) and its constraints are checked with a single vectorized call. Chunks are
+checked in n_workers processes, and their feasible points (all constraints > 0) and unfeasible points
+(all constraints < 0) are written in chunk order straight into two preallocated .npy files opened with
+np.memmap, so the result does not depend on n_workers.
+
+While the samples are being generated, the files have the suffix .tmp.npy and a .progress.json file
+records how many chunks were written, together with the number of feasible and unfeasible points they
+contained. An interrupted generation continues from the last recorded chunk.
+When both files are full, they are renamed to feasible_path and unfeasible_path, which can be loaded
+with np.load().
+'''
+
+
+_WORKER_FEASIBILITY_FUNCTION = None
+
+def _init_sampler_worker(feasibility_function):
+    # Workers are forked, so the feasibility function (and the problem it belongs to) is not pickled.
+    global _WORKER_FEASIBILITY_FUNCTION
+    _WORKER_FEASIBILITY_FUNCTION = feasibility_function
+
+
+def _check_chunk(c:int, seed:int, chunk_size:int, dim:int, feasibility_function=None):
+    '''Returns the feasible and the unfeasible points of chunk c.'''
+    if feasibility_function is None:
+        feasibility_function = _WORKER_FEASIBILITY_FUNCTION
+    X = np.random.RandomState([c, seed, 5917]).random((chunk_size, dim))
+    G = np.asarray(feasibility_function(X)).reshape(chunk_size, -1)
+    return X[np.all(G > 0.0, axis=1)], X[np.all(G < 0.0, axis=1)]
+
+
+def generate_feasibility_samples(feasibility_function, dim:int, n_samples:int, feasible_path:str, unfeasible_path:str, seed:int, n_workers:int=None, chunk_size:int=8192):
+    '''
+    Generates n_samples feasible and n_samples unfeasible points, saved as (n_samples, dim) matrices in
+    feasible_path and unfeasible_path.
+
+    Parameters:
+        feasibility_function: Returns the (n, n_constraints) matrix of constraint values of a (n, dim) matrix.
+        seed (int): The same seed and chunk_size always produce the same samples.
+        n_workers (int): Number of processes that check the constraints, all the cores by default.
+        chunk_size (int): Number of uniform random points checked together.
+    '''
+    n_workers = os.cpu_count() if n_workers is None else n_workers
+    tmp_paths = [path[:-len('.npy')] + '.tmp.npy' for path in (feasible_path, unfeasible_path)]
+    progress_path = feasible_path[:-len('.npy')] + '.progress.json'
+
+    progress = {'seed': seed, 'chunk_size': chunk_size, 'n_samples': n_samples, 'n_chunks': 0, 'counts': [0, 0]}
+    if os.path.exists(progress_path) and all(os.path.exists(path) for path in tmp_paths):
+        with open(progress_path, 'r') as file:
+            saved = json.load(file)
+        if all(saved[key] == progress[key] for key in ('seed', 'chunk_size', 'n_samples')):
+            progress = saved
+            print(f"Resuming sample generation from chunk {progress['n_chunks']}.")
+    mode = 'r+' if progress['n_chunks'] > 0 else 'w+'
+    samples = [np.lib.format.open_memmap(path, mode=mode, dtype=np.float64, shape=(n_samples, dim)) for path in tmp_paths]
+
+    def save_progress():
+        # n_chunks and counts are written together, in a single file that replaces the previous one.
+        for sample in samples:
+            sample.flush()
+        with open(progress_path + '.tmp', 'w') as file:
+            json.dump(progress, file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(progress_path + '.tmp', progress_path)
+
+    from tqdm import tqdm as tqdm
+    pb = tqdm(total=n_samples, initial=min(progress['counts']))
+    executor = None
+    if n_workers > 1:
+        executor = ProcessPoolExecutor(max_workers=n_workers, mp_context=multiprocessing.get_context('fork'), initializer=_init_sampler_worker, initargs=(feasibility_function,))
+    ref = time.time()
+    n_checked = 0
+    last_save = ref
+    c = progress['n_chunks']
+    in_flight = deque()
+    try:
+        while min(progress['counts']) < n_samples:
+            # Keep every worker busy, results are written in chunk order.
+            while executor is not None and len(in_flight) < 2 * n_workers:
+                in_flight.append(executor.submit(_check_chunk, c + len(in_flight), seed, chunk_size, dim))
+            new_points = _check_chunk(c, seed, chunk_size, dim, feasibility_function) if executor is None else in_flight.popleft().result()
+            counts = list(progress['counts'])
+            for i in range(2):
+                n_new = min(len(new_points[i]), n_samples - counts[i])
+                samples[i][counts[i]:counts[i] + n_new] = new_points[i][:n_new]
+                counts[i] += n_new
+            c += 1
+            n_checked += chunk_size
+            # A single assignment, so that an interruption never saves the counts of a chunk without the chunk.
+            progress = dict(progress, n_chunks=c, counts=counts)
+            if time.time() - last_save > 10.0:
+                save_progress()
+                last_save = time.time()
+            pb.n = min(counts)
+            pb.set_postfix({'samples/s': f'{n_checked / max(time.time() - ref, 1e-9):.0f}', 'feasible': counts[0], 'unfeasible': counts[1]}, refresh=True)
+    finally:
+        for future in in_flight:
+            future.cancel()
+        if executor is not None:
+            executor.shutdown()
+        pb.close()
+        save_progress()
+    elapsed = max(time.time() - ref, 1e-9)
+    print(f"Checked {n_checked} samples in {elapsed:.1f}s, {n_checked / elapsed:.0f} samples per second.")
+
+    del samples
+    os.replace(tmp_paths[0], feasible_path)
+    os.replace(tmp_paths[1], unfeasible_path)
+    os.remove(progress_path)
@@ -0,0 +1,111 @@
+import numpy as np
+import numpy.typing
+import os
+
+'''
+Pool of feasible points for problem.random_initial_sol(), so that initial solutions are not found
+by checking the constraints of one uniform random point at a time.
+
+The pool is made of n_blocks fixed blocks of block_size uniform random points. Block b only depends
+on b and the seed of the problem, and its constraints are checked with a single vectorized call. If a
+cache path is given, all the blocks are checked the first time the pool is used, and the positions,
+values and constraint values of their feasible points are saved to a single file, so that later runs
+load the whole pool at once.
+
+Sampling is equivalent to rejection sampling: a feasible point is chosen uniformly among the feasible
+points of the pool, and the number of points that rejection sampling would have checked to find it is
+drawn from the geometric distribution with the fraction of feasible points of the pool. If the pool
+has no feasible points, uniform random points are checked one at a time instead. Both only depend on
+the random state given, so the initial solutions of each seed are reproducible and do not depend on
+whether the pool was loaded from the cache or not.
+'''
+
+
+class feasible_point_pool:
+
+    def __init__(self, dim:int, n_constraints:int, feasibility_function, seed:int, cache_path:str=None, block_size:int=8192, n_blocks:int=256):
+        '''
+        Parameters:
+            dim (int): Dimension of the points.
+            n_constraints (int): Number of constraint values of each point.
+            feasibility_function: Returns the (n, n_constraints) matrix of constraint values of a (n, dim) matrix.
+            seed (int): Seed of the problem, mixed into the seed of each block.
+            cache_path (str): File where the pool is saved. If None, the pool is only kept in memory.
+            block_size (int): Number of uniform random points per block.
+            n_blocks (int): Number of different blocks.
+        '''
+        self.dim = dim
+        self.n_constraints = n_constraints
+        self.feasibility_function = feasibility_function
+        self.seed = seed
+        self.cache_path = cache_path
+        self.block_size = block_size
+        self.n_blocks = n_blocks
+        self.blocks = {} # Maps the block index to (positions, points, constraint values) of its feasible points.
+        self.points = None # Feasible points of all the blocks, set by fill().
+        self.G = None
+        if not cache_path is None:
+            if os.path.exists(cache_path):
+                self._load()
+            else:
+                self.fill()
+                self._save()
+
+    def _load(self):
+        with np.load(self.cache_path) as data:
+            assert int(data['block_size']) == self.block_size and int(data['seed']) == self.seed and len(data['offsets']) == self.n_blocks + 1, f"Feasible pool {self.cache_path} was saved with other parameters."
+            offsets, positions, points, G = data['offsets'], data['positions'], data['points'], data['g']
+        for b in range(self.n_blocks):
+            self.blocks[b] = (positions[offsets[b]:offsets[b+1]], points[offsets[b]:offsets[b+1]], G[offsets[b]:offsets[b+1]])
+
+    def _save(self):
+        blocks = [self.blocks[b] for b in range(self.n_blocks)]
+        offsets = np.cumsum([0] + [len(block[0]) for block in blocks])
+        os.makedirs(os.path.dirname(self.cache_path) or '.', exist_ok=True)
+        # Several processes might create the same pool at the same time, the content is the same.
+        tmp_path = self.cache_path + f'.{os.getpid()}.tmp.npz'
+        np.savez(tmp_path, block_size=self.block_size, seed=self.seed, offsets=offsets,
+                 positions=np.concatenate([block[0] for block in blocks]),
+                 points=np.concatenate([block[1] for block in blocks]),
+                 g=np.concatenate([block[2] for block in blocks]))
+        os.replace(tmp_path, self.cache_path)
+
+    def _block(self, b:int):
+        if not b in self.blocks:
+            X = np.random.RandomState([b, self.seed, 8274]).random((self.block_size, self.dim))
+            G = np.asarray(self.feasibility_function(X), dtype=np.float64).reshape(self.block_size, self.n_constraints)
+            positions = np.nonzero(np.all(G > 0, axis=1))[0]
+            self.blocks[b] = (positions, X[positions], G[positions])
+        return self.blocks[b]
+
+    def fill(self):
+        '''Checks the constraints of every block that has not been checked yet.'''
+        from tqdm import tqdm as tqdm
+        for b in tqdm(range(self.n_blocks), desc="Feasible point pool", disable=len(self.blocks) == self.n_blocks):
+            self._block(b)
+        if self.points is None:
+            self.points = np.concatenate([self.blocks[b][1] for b in range(self.n_blocks)])
+            self.G = np.concatenate([self.blocks[b][2] for b in range(self.n_blocks)])
+
+    def sample(self, rs:np.random.RandomState):
+        '''
+        Returns (x, g, n_checked), a feasible point x, its constraint values g, and the number of points that
+        rejection sampling would have checked to find it.
+        '''
+        self.fill()
+        if len(self.points) == 0:
+            # No feasible points in the pool, rejection sampling with fresh uniform random points.
+            n_checked = 0
+            while True:
+                x = rs.random((1, self.dim))
+                g = np.asarray(self.feasibility_function(x), dtype=np.float64).reshape(self.n_constraints)
+                n_checked += 1
+                if np.all(g > 0):
+                    return x[0], tuple(g), n_checked
+        i = rs.randint(len(self.points))
+        n_checked = rs.geometric(len(self.points) / (self.n_blocks * self.block_size))
+        return self.points[i].copy(), tuple(self.G[i]), int(n_checked)
+
+    def n_feasible(self) -> int:
+        '''Number of feasible points in the blocks checked so far.'''
+        return sum(len(block[0]) for block in self.blocks.values())
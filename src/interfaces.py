@@ -2,15 +2,21 @@ import numpy as np
 import numpy.typing
 import os
 import time
+import pickle
 from tqdm import tqdm as tqdm
-
-problem_name_list = ["airframes", "windflo", "toy"]
-algorithm_name_list = ["snobfit", "cobyqa", "pyopt", "nevergrad", "scipySLSQP", "scipyDIRECT", "skoptbo", "ax"]
+from evaluation_journal import evaluation_journal
+from evaluation_cache import evaluation_cache
+from evaluation_store import evaluation_store
+from evaluation_trace import evaluation_trace, load_trace, trace_summary
+
+problem_name_list = ["airframes", "windflo", "toy"] + [f"windflo_{n}" for n in (20, 50, 100, 200, 500)] # See problem_windflo.PROBLEM_NAMES.
+problem_name_list += [f"{name}_terrain" for name in problem_name_list if name.startswith("windflo")]
+algorithm_name_list = ["snobfit", "cobyqa", "pyopt", "nevergrad", "scipySLSQP", "scipyDIRECT", "skoptbo", "ax", "pso"]
 constraint_method_list = ['ignore','nan_on_unfeasible','constant_penalty_no_evaluation','algo_specific', 'nn_encoding']
 
 class problem:
 
-    def __init__(self, problem_name:str, budget:int, constraint_method:str, seed:int, reuse_encoding:bool, task_info=None):
+    def __init__(self, problem_name:str, budget:int, constraint_method:str, seed:int, reuse_encoding:bool, task_info=None, cache_size:int=10000, evaluation_store_path:str='cache/evaluation_store.sqlite'):
         '''
         Initializes the problem to be solved. All the problems are minimization of the objective 
         function f, and solutions are feasible as long as the constraints >= 0. This is the convention used 
@@ -20,6 +26,11 @@ class problem:
         Parameters:
             problem_name (str): The name of the problem.
             constraint_method (str): How to deal with constraints. Supported values are 'ignore','nan_on_unfeasible', 'constant_penalty_no_evaluation', 'algo_specific'.
+            cache_size (int): Maximum number of solutions whose constraint values (and objective values, if the problem is 
+                deterministic) are memoized. Cached values are not computed again, but they still count in n_f_evals and 
+                n_constraint_evals as before. 0 disables the cache.
+            evaluation_store_path (str): Persistent store of objective values shared across runs, only used by 
+                deterministic problems (see evaluation_store.py). None disables it.
         '''
         assert problem_name in problem_name_list
         assert constraint_method in constraint_method_list
@@ -28,11 +39,29 @@ class problem:
         self.budget = budget
         self.n_f_evals = 0
         self.n_constraint_evals = 0
+        self.n_constraint_cache_hits = 0 # Constraint checks found in constraint_cache, which are still counted in n_constraint_evals.
         self.n_unfeasible_on_ask = 0
         self.n_f_calls_without_evaluation = 0
+        self.constraint_check_time = 0.0 # Seconds spent checking constraints, for the timing trace of local_solve.
         self.x0 = None
         self.x0_f = None
+        self.seed = seed
         self.rs = np.random.RandomState(seed=seed+128428)
+        self.parallel_evaluation = True # Whether _f can be evaluated in several processes at the same time.
+        # Vectorized versions of _f and _constraint_check, that take a (n, dim) matrix and return an array with one value (row) 
+        # per solution. When a problem does not define them, _f_batch is None and _constraint_check_batch loops over the rows.
+        self._f_batch = None
+        self._constraint_check_batch = None
+        self.deterministic = False # Whether _f always returns the same value for the same x, so that it can be cached.
+        self.config_hash = None # Required for deterministic problems, identifies the configuration of _f in the evaluation store.
+        self.constraint_hash = None # Identifies the constraints in the name of the feasible pool file. If None, see _constraint_hash().
+        self.evaluator_pool = None # Function (n_workers) -> executor that evaluates _f in parallel. If None, a ProcessPoolExecutor is used.
+        # Problems with several fidelity levels define _f(x, fidelity), with fidelity an index of fidelity_levels (see f()).
+        self.fidelity_levels = None
+        self._fidelity_costs = None # Function () -> cost of each fidelity level relative to the highest, only called if a lower level is used.
+        self.fidelity_costs = None
+        self.n_f_evals_per_fidelity = None
+        self.f_cost_carry = 0.0 # Cost of lower fidelity evaluations not yet counted in n_f_evals.
 
         if problem_name == "airframes":
             import problem_airframes
@@ -50,34 +79,66 @@ class problem:
                 raise subprocess.CalledProcessError(f"f_function_airframes crashed 5 times in a row. The solution x = {x} produced some errors consistently.")
 
             self.dim = 15
+            self.parallel_evaluation = False # The simulator uses fixed file paths.
             self._constraint_check = lambda x: (1.0,)
             self._f = f_function_airframes
             self.plot_solution = lambda x: problem_airframes.plot_airframe_design(problem_airframes._decode_symmetric_hexarotor_to_RobotParameter(x))
 
-        if problem_name == "windflo":
+        if problem_name == "windflo" or problem_name.startswith("windflo_"):
             import problem_windflo
-            self.dim = problem_windflo.SOLUTION_DIM
-            self._constraint_check = problem_windflo.constraint_check
-            self._f = problem_windflo.f
-            self.plot_solution = problem_windflo.plot_WindFLO
+            self.windflo_instance = problem_windflo.get_instance(*problem_windflo.problem_parameters(problem_name))
+            self.dim = self.windflo_instance.solution_dim
+            self._constraint_check = self.windflo_instance.constraint_check
+            self._constraint_check_batch = self.windflo_instance.constraint_check_batch
+            self._f = self.windflo_instance.f
+            self.deterministic = True
+            self.config_hash = self.windflo_instance.config_hash()
+            self.constraint_hash = self.windflo_instance.constraint_hash()
+            self.plot_solution = self.windflo_instance.plot_WindFLO
+            self.evaluator_pool = self.windflo_instance.evaluator_pool
+            self.fidelity_levels = problem_windflo.FIDELITY_MONTECARLO_PTS
+            self._fidelity_costs = self.windflo_instance.fidelity_costs
+            if problem_windflo.BACKEND == 'numpy':
+                self._f_batch = self.windflo_instance.f_batch
 
         if problem_name == "toy":
             dim = 8
             import problem_toy
             self.dim = dim
             self._constraint_check = problem_toy.constraint_check
+            self._constraint_check_batch = problem_toy.constraint_check_batch
             self._f = problem_toy.f
+            self._f_batch = problem_toy.f_batch
 
         self.last_x_constraint_check = np.random.random(self.dim)
         self.last_x_constraint_check_result = self._constraint_check(self.last_x_constraint_check)
         self.n_constraints = len(self.last_x_constraint_check_result)
+        if self._constraint_check_batch is None:
+            self._constraint_check_batch = lambda X: np.array([self._constraint_check(x) for x in X]).reshape(-1, self.n_constraints)
+        self.constraint_cache = evaluation_cache(cache_size)
+        self.f_cache = evaluation_cache(cache_size if self.deterministic else 0)
+        self.f_store = None
+        self.cache_size = cache_size
+        self.evaluation_store_path = evaluation_store_path
+        self._fidelity_memo = {} # Maps lower fidelity levels to their (f_cache, f_store).
+        if not self.fidelity_levels is None:
+            self.n_f_evals_per_fidelity = [0] * len(self.fidelity_levels)
+        self.feasible_pool = None # Created on the first call to random_initial_sol().
+        if self.deterministic and not evaluation_store_path is None:
+            assert not self.config_hash is None, f"Deterministic problem {problem_name} needs a config_hash to use the evaluation store."
+            self.f_store = evaluation_store(evaluation_store_path, problem_name, self.config_hash)
 
         if self.constraint_method == 'nn_encoding':
             import learn_encoding
             self.encoder = learn_encoding.solution_space_encoder(self, 2 if reuse_encoding else seed)
 
 
-    def f(self, x:numpy.typing.NDArray[np.float_]):
+    def _f_prepare(self, x:numpy.typing.NDArray[np.float_]):
+        '''
+        Everything f(x) does before evaluating the objective function. Returns (x_encoded, g, return_value),
+        where g are the constraint values of x. If x_encoded is None the objective function should not be 
+        evaluated and f(x) returns return_value. Otherwise, f(x) returns _f(x_encoded).
+        '''
         assert type(x) == np.ndarray
 
         if self.constraint_method in  ('ignore','algo_specific'):
@@ -95,7 +156,8 @@ class problem:
         # optimization (that is why we do not count the n_constraint_evals).
         # Need to do the extra check because 'ignore' and 'algo specific' might evaluate unfeasible solutions.
         self.n_constraint_evals -= 1  
-        if not np.all(np.array(self.constraint_check(x)) > 0):
+        g = self.constraint_check(x)
+        if not np.all(np.array(g) > 0):
             self.n_unfeasible_on_ask += 1
 
         if return_value=='f':
@@ -103,18 +165,224 @@ class problem:
                 x_encoded = self.encoder.encode(x)
             else:
                 x_encoded = x
-
-            return_value = self._f(x_encoded)
-            self.n_f_evals+=1
-            self.n_f_calls_without_evaluation = 0
+            return x_encoded, g, None
         else:
             self.n_f_calls_without_evaluation += 1
             if self.n_f_calls_without_evaluation > 2000:
                 self.n_f_evals += 1
+            return None, g, return_value
+
+    def _f_evaluated(self, fidelity:int=None):
+        if fidelity is None or fidelity == len(self.fidelity_levels) - 1:
+            self.n_f_evals+=1
+        else:
+            # The budget is counted in evaluations of the highest fidelity, the cost of lower fidelity
+            # evaluations is accumulated and counted in n_f_evals every time it adds up to one evaluation.
+            self.f_cost_carry += self.fidelity_costs[fidelity]
+            self.n_f_evals += int(self.f_cost_carry)
+            self.f_cost_carry -= int(self.f_cost_carry)
+        if not self.n_f_evals_per_fidelity is None:
+            self.n_f_evals_per_fidelity[-1 if fidelity is None else fidelity] += 1
+        self.n_f_calls_without_evaluation = 0
+
+    def f(self, x:numpy.typing.NDArray[np.float_], fidelity:int=None):
+        '''
+        Objective value of x. If the problem has several fidelity levels, fidelity is an index of 
+        fidelity_levels and None is the highest level. An evaluation at a lower level only uses 
+        fidelity_costs[fidelity] of the budget, measured relative to the cost of the highest level.
+        '''
+        fidelity = self._check_fidelity(fidelity)
+        x_encoded, _, return_value = self._f_prepare(x)
+        if not x_encoded is None:
+            found, return_value = self._lookup_f(x_encoded, fidelity)
+            if not found:
+                return_value = self._f_at(fidelity)(x_encoded)
+                self._store_f(x_encoded, return_value, fidelity)
+            self._f_evaluated(fidelity)
         return return_value
 
+    def _check_fidelity(self, fidelity:int=None):
+        # The fidelity level used to evaluate _f, the highest level is None.
+        if not fidelity is None:
+            assert not self.fidelity_levels is None, f"Problem {self.problem_name} has a single fidelity level."
+            assert 0 <= fidelity < len(self.fidelity_levels), f"fidelity={fidelity} not in range({len(self.fidelity_levels)})."
+            if fidelity == len(self.fidelity_levels) - 1:
+                fidelity = None
+            elif self.fidelity_costs is None:
+                self.fidelity_costs = self._fidelity_costs()
+        return fidelity
+
+    def _f_at(self, fidelity:int=None):
+        # _f at a fidelity level checked with _check_fidelity(), as a function of x that can be sent to worker processes.
+        if fidelity is None:
+            return self._f
+        import functools
+        return functools.partial(self._f, fidelity=fidelity)
+
+    def _f_memo(self, fidelity:int=None):
+        # (f_cache, f_store) of the objective values at a fidelity level, lower levels are memoized separately.
+        if fidelity is None:
+            return self.f_cache, self.f_store
+        if not fidelity in self._fidelity_memo:
+            f_store = None
+            if not self.f_store is None:
+                f_store = evaluation_store(self.evaluation_store_path, self.problem_name, f'{self.config_hash}_fidelity_{self.fidelity_levels[fidelity]}')
+            self._fidelity_memo[fidelity] = (evaluation_cache(self.cache_size if self.deterministic else 0), f_store)
+        return self._fidelity_memo[fidelity]
+
+    def _lookup_f(self, x_encoded:numpy.typing.NDArray[np.float_], fidelity:int=None):
+        '''
+        Returns (True, f) if the objective value of x_encoded is memoized, first looking in the in memory 
+        cache and then in the evaluation store. Returns (False, None) otherwise.
+        '''
+        f_cache, f_store = self._f_memo(fidelity)
+        found, value = f_cache.lookup(x_encoded)
+        if not found and not f_store is None:
+            found, value = f_store.lookup(x_encoded)
+            if found:
+                f_cache.store(x_encoded, value)
+        return found, value
+
+    def _store_f(self, x_encoded:numpy.typing.NDArray[np.float_], value:float, fidelity:int=None):
+        f_cache, f_store = self._f_memo(fidelity)
+        f_cache.store(x_encoded, value)
+        if not f_store is None:
+            f_store.store(x_encoded, value)
+
+    def f_batch(self, X:numpy.typing.NDArray[np.float_], executor=None, return_constraints=False, fidelity:int=None):
+        '''
+        Evaluates f on each row of X, which is equivalent to [self.f(x, fidelity) for x in X]. The constraints of all the rows 
+        are checked with one call to _constraint_check_batch, and the objective function with one call to _f_batch 
+        if the problem has a vectorized implementation (only used at the highest fidelity). Otherwise, if an executor is given (for example, a 
+        concurrent.futures.ProcessPoolExecutor) the objective function evaluations are distributed with executor.map().
+        If return_constraints is True, the (n, n_constraints) matrix with the constraint values of each row is also returned.
+        '''
+        assert type(X) == np.ndarray and X.ndim == 2 and X.shape[1] == self.dim, f"X.shape={X.shape}"
+        fidelity = self._check_fidelity(fidelity)
+
+        # As in f(), the constraint checks of new solutions are not counted in n_constraint_evals, and
+        # solutions already checked just before are discounted.
+        self.n_constraint_evals -= self._n_cached_rows(X)
+        G = self._constraint_check_batch_cached(X)
+        feasible = np.all(G > 0, axis=1)
+        self.n_unfeasible_on_ask += int(np.sum(~feasible))
+
+        if self.constraint_method in  ('ignore','algo_specific'):
+            evaluate = np.ones(X.shape[0], dtype=bool)
+            fs = np.empty(X.shape[0])
+        elif self.constraint_method == 'nan_on_unfeasible':
+            evaluate = feasible
+            fs = np.full(X.shape[0], np.nan)
+        elif self.constraint_method in ('constant_penalty_no_evaluation', 'nn_encoding'):
+            evaluate = feasible
+            fs = np.full(X.shape[0], np.inf)
+        else:
+            raise ValueError("Constraint method "+str(self.constraint_method)+" not recognized.")
+
+        for evaluated in evaluate:
+            if evaluated:
+                self._f_evaluated(fidelity)
+            else:
+                self.n_f_calls_without_evaluation += 1
+                if self.n_f_calls_without_evaluation > 2000:
+                    self.n_f_evals += 1
+
+        if np.any(evaluate):
+            X_encoded = self._encode_batch(X[evaluate]) if self.constraint_method == 'nn_encoding' else X[evaluate]
+            values = np.empty(X_encoded.shape[0])
+            missing = []
+            for i, x_encoded in enumerate(X_encoded):
+                found, value = self._lookup_f(x_encoded, fidelity)
+                if found:
+                    values[i] = value
+                else:
+                    missing.append(i)
+            X_missing = X_encoded[missing]
+            f_at = self._f_at(fidelity)
+            if len(missing) == 0:
+                pass
+            elif not self._f_batch is None and fidelity is None:
+                values[missing] = self._f_batch(X_missing)
+            elif executor is None or not self.parallel_evaluation or len(missing) <= 1:
+                values[missing] = [f_at(x_encoded) for x_encoded in X_missing]
+            else:
+                values[missing] = list(executor.map(f_at, X_missing))
+            for i in missing:
+                self._store_f(X_encoded[i], values[i], fidelity)
+            fs[evaluate] = values
+
+        if return_constraints:
+            return fs, G
+        return fs
+
+    def _encode_batch(self, X:numpy.typing.NDArray[np.float_]) -> numpy.typing.NDArray[np.float_]:
+        return self.encoder.encode_batch(X)
+
+    def _n_cached_rows(self, X:numpy.typing.NDArray[np.float_]) -> int:
+        # Rows that constraint_check() would not count if called on each row in order: 
+        # the first row if it is the last checked solution, and every row equal to the previous one.
+        previous = np.vstack((self.last_x_constraint_check.reshape(1,-1), X[:-1]))
+        return int(np.sum(np.all(X == previous, axis=1)))
+
+    def _constraint_check_batch_cached(self, X:numpy.typing.NDArray[np.float_]) -> numpy.typing.NDArray[np.float_]:
+        '''
+        Constraint values of the rows of X, as constraint_check() would find them if called on each row in order: 
+        rows equal to the previous row (the first one, to the last checked solution) and rows in constraint_cache 
+        are not checked again. The other rows are checked with one call to _constraint_check_batch and stored in 
+        constraint_cache. Returns the (n, n_constraints) matrix, and does not change n_constraint_evals.
+        '''
+        ref = time.perf_counter()
+        X_encoded = self._encode_batch(X) if self.constraint_method == 'nn_encoding' else X
+        G = np.empty((X.shape[0], self.n_constraints))
+        previous = np.vstack((self.last_x_constraint_check.reshape(1,-1), X[:-1]))
+        repeated = np.all(X == previous, axis=1)
+        rows = [] # Rows to check.
+        missing = {} # Maps the cache key of each row to check to its index in X, if the cache is enabled.
+        copies = [] # Rows equal to an earlier row to check, as (row, row to check).
+        for i in range(X.shape[0]):
+            if repeated[i]:
+                continue
+            key = self.constraint_cache.key(X_encoded[i]) if self.constraint_cache.max_size > 0 else None
+            if key in missing:
+                copies.append((i, missing[key]))
+                continue
+            found, g = self.constraint_cache.lookup(X_encoded[i])
+            if found:
+                self.n_constraint_cache_hits += 1
+                G[i] = g
+            else:
+                if not key is None:
+                    missing[key] = i
+                rows.append(i)
+        if len(rows) > 0:
+            G_missing = np.asarray(self._constraint_check_batch(X_encoded[rows]), dtype=np.float64)
+            assert G_missing.shape == (len(rows), self.n_constraints), f"G.shape={G_missing.shape}"
+            G[rows] = G_missing
+            for i, g in zip(rows, G_missing):
+                self.constraint_cache.store(X_encoded[i], tuple(g))
+        for i, j in copies:
+            G[i] = G[j]
+        self.n_constraint_cache_hits += len(copies)
+        for i in np.flatnonzero(repeated):
+            G[i] = self.last_x_constraint_check_result if i == 0 else G[i-1]
+        if X.shape[0] > 0:
+            self.last_x_constraint_check = X[-1].copy()
+            self.last_x_constraint_check_result = tuple(G[-1])
+        self.constraint_check_time += time.perf_counter() - ref
+        return G
+
+    def constraint_check_batch(self, X:numpy.typing.NDArray[np.float_]) -> numpy.typing.NDArray[np.float_]:
+        '''
+        Checks the constraints of each row of X, equivalent to np.array([self.constraint_check(x) for x in X]).
+        Returns a (n, n_constraints) matrix. n_constraint_evals is updated as if constraint_check() was called on each row.
+        '''
+        assert type(X) == np.ndarray and X.ndim == 2 and X.shape[1] == self.dim, f"X.shape={X.shape}"
+        self.n_constraint_evals += X.shape[0] - self._n_cached_rows(X)
+        return self._constraint_check_batch_cached(X)
+
     def constraint_check(self, x:numpy.typing.NDArray[np.float_]) -> tuple:
         assert type(x) == np.ndarray
+        ref = time.perf_counter()
         if self.constraint_method == 'nn_encoding':
             x_encoded = self.encoder.encode(x)
         else:
@@ -124,24 +392,58 @@ class problem:
             res = self.last_x_constraint_check_result
         else:
             self.last_x_constraint_check = x
-            res = self._constraint_check(x_encoded)
+            found, res = self.constraint_cache.lookup(x_encoded)
+            if found:
+                self.n_constraint_cache_hits += 1
+            else:
+                res = self._constraint_check(x_encoded)
+                self.constraint_cache.store(x_encoded, res)
             self.n_constraint_evals += 1
             self.last_x_constraint_check_result = res
         assert type(res) == tuple, str(res) + " of type " + str(type(res))
+        self.constraint_check_time += time.perf_counter() - ref
         return res
 
     def plot_solution(self, x:numpy.typing.NDArray[np.float_]):
         pass
 
+    def _constraint_hash(self):
+        '''
+        constraint_hash, or if the problem does not define it, the hash of the constraint values of a few fixed
+        points, so that a pool saved with other constraints is not loaded.
+        '''
+        if not self.constraint_hash is None:
+            return self.constraint_hash
+        import hashlib
+        X = np.random.RandomState(7).random((64, self.dim))
+        return hashlib.sha256(np.ascontiguousarray(self._constraint_check_batch(X), dtype=np.float64).tobytes()).hexdigest()
+
+    def _get_feasible_pool(self):
+        if self.feasible_pool is None:
+            from feasible_pool import feasible_point_pool
+            if self.constraint_method == 'nn_encoding':
+                # Feasibility depends on the encoder, so the pool is smaller and not saved.
+                self.feasible_pool = feasible_point_pool(self.dim, self.n_constraints, lambda X: self._constraint_check_batch(self._encode_batch(X)), self.seed, block_size=1024, n_blocks=16)
+            else:
+                # Fewer blocks in high dimensional problems, so that the size of the pool is bounded.
+                n_blocks = min(256, max(8, 5120 // self.dim))
+                self.feasible_pool = feasible_point_pool(self.dim, self.n_constraints, self._constraint_check_batch, self.seed, cache_path=f'cache/feasible_pool/{self.problem_name}_{self.dim}_{self.seed}_{self._constraint_hash()[:16]}.npz', n_blocks=n_blocks)
+        return self.feasible_pool
+
     def random_initial_sol(self) -> numpy.typing.NDArray[np.float_]:
 
         if self.constraint_method in ('ignore'):
             return self.rs.random(self.dim)
         elif self.constraint_method in ('nan_on_unfeasible', 'constant_penalty_no_evaluation', 'algo_specific', 'nn_encoding'):
-            feasible = False
-            while not feasible:
-                self.x0 = self.rs.random(self.dim)
-                feasible = np.all(np.array(self.constraint_check(self.x0)) > 0)
+            # Equivalent to checking uniform random points until one is feasible, but the points come from a pool 
+            # (see feasible_pool.py). The constraint evaluations rejection sampling would have needed are counted.
+            ref = time.perf_counter()
+            x0, g, n_checked = self._get_feasible_pool().sample(self.rs)
+            self.n_constraint_evals += n_checked
+            self.last_x_constraint_check = x0
+            self.last_x_constraint_check_result = g
+            self.constraint_check_time += time.perf_counter() - ref
+            self.x0 = x0
             return self.x0
         else:
             raise ValueError("Constraint method "+str(self.constraint_method)+" not recognized.")
@@ -151,10 +453,15 @@ class problem:
 
 class optimization_algorithm:
 
-    def __init__(self, problem: problem, algorithm_name, seed):
+    def __init__(self, problem: problem, algorithm_name, seed, n_workers=1):
         assert algorithm_name in algorithm_name_list
         self.problem = problem
         self.algorithm_name = algorithm_name
+        self.n_workers = n_workers
+        self._asked_x0 = False
+        self._batch_is_x0 = False
+        self._x0_in_flight = set()
+        self.last_tell_was_x0 = False # Whether the last tell_async() was the result of an x0 asked with ask_async().
         if algorithm_name == "snobfit":
             import algorithm_snobfit
             self.algo = algorithm_snobfit.snobfit(problem, seed)
@@ -166,7 +473,7 @@ class optimization_algorithm:
             self.algo = algorithm_pyopt.pyopt(problem, seed)
         elif algorithm_name == "nevergrad":
             import algorithm_nevergrad
-            self.algo = algorithm_nevergrad.ng_optimizer(problem, seed, parallel_threads=1, total_budget=self.problem.budget)
+            self.algo = algorithm_nevergrad.ng_optimizer(problem, seed, parallel_threads=n_workers, total_budget=self.problem.budget)
         elif algorithm_name == "scipySLSQP":
             import algorithm_scipy_SLSQP
             self.algo = algorithm_scipy_SLSQP.scipySLSQP_optimizer(problem, seed)
@@ -179,11 +486,15 @@ class optimization_algorithm:
         elif algorithm_name == "ax":
             import algorithm_ax
             self.algo = algorithm_ax.ax_optimizer(problem, seed, total_budget=self.problem.budget)
+        elif algorithm_name == "pso":
+            import algorithm_pso
+            self.algo = algorithm_pso.pso_optimizer(problem, seed, n_workers=n_workers)
         else:
             print("Algorithm name", algorithm_name, "not recognized.")
 
     def ask(self) -> numpy.typing.NDArray[np.float_]:
         if not self.problem.x0 is None:
+            self._asked_x0 = True
             return self.problem.x0
 
         self.algo.n_f_evals = self.problem.n_f_evals
@@ -194,67 +505,254 @@ class optimization_algorithm:
         return x
 
     def tell(self, f) -> None:
-        if not self.problem.x0 is None:
+        # Only skip the tell if the previous ask returned x0. The algorithm might have set a new x0 inside 
+        # ask(), when restarting from problem.random_initial_sol(), and be waiting for the objective value.
+        if self._asked_x0:
+            self._asked_x0 = False
             self.problem.x0 = None
             return
         self.algo.tell(f)
 
+    def ask_batch(self, k:int) -> numpy.typing.NDArray[np.float_]:
+        '''
+        Ask for up to k solutions that can be evaluated in parallel, returned as the rows of a matrix.
+        Adapters that implement ask_batch(k) and tell_batch(fs) return up to k rows, the rest always 
+        return a single row. The next call must be tell_batch() with the objective value of each row.
+        '''
+        assert k >= 1
+        if not self.problem.x0 is None:
+            self._batch_is_x0 = True
+            return self.problem.x0.reshape(1, -1)
+        self._batch_is_x0 = False
+
+        if not hasattr(self.algo, 'ask_batch'):
+            return self.ask().reshape(1, -1)
+        self.algo.n_f_evals = self.problem.n_f_evals
+        X = self.algo.ask_batch(k)
+        self.algo.n_f_evals = self.problem.n_f_evals
+        assert type(X) == np.ndarray and X.ndim == 2 and 1 <= X.shape[0] <= k and X.shape[1] == self.problem.dim, f"X.shape = {X.shape}"
+        assert np.max(X) <= 1.0 and np.min(X) >= 0.0, f"X = {X} out of bounds [0,1]"
+        return X
+
+    def tell_batch(self, fs) -> None:
+        if self._batch_is_x0:
+            assert len(fs) == 1
+            self._batch_is_x0 = False
+            self.problem.x0 = None
+        elif not hasattr(self.algo, 'tell_batch'):
+            assert len(fs) == 1
+            self.tell(fs[0])
+        else:
+            self.algo.tell_batch(fs)
 
+    def supports_async(self) -> bool:
+        '''
+        Adapters with supports_async = True accept several asks before the corresponding tells, and tell(f, x) 
+        with the results in any order.
+        '''
+        return getattr(self.algo, 'supports_async', False)
 
-def _resume_previous_local_solve(prob: problem, algo:optimization_algorithm, optimization_cache_path_f, optimization_cache_path_x, prob_status_cache_path):
-    x_list = [el for el in np.load(optimization_cache_path_x)]
-    f_list = [el for el in np.load(optimization_cache_path_f)]
-    assert len(x_list) == len(f_list)
+    def ask_async(self) -> numpy.typing.NDArray[np.float_]:
+        '''Like ask(), but several solutions can be asked before they are told with tell_async().'''
+        if not self.problem.x0 is None:
+            x0 = self.problem.x0
+            self.problem.x0 = None
+            self._x0_in_flight.add(x0.tobytes())
+            return x0
+        self.algo.n_f_evals = self.problem.n_f_evals
+        x = self.algo.ask()
+        self.algo.n_f_evals = self.problem.n_f_evals
+        assert type(x) == np.ndarray
+        assert max(x) <= 1.0 and min(x) >= 0.0, f"x = {x} out of bounds [0,1]"
+        return x
+
+    def tell_async(self, x:numpy.typing.NDArray[np.float_], f) -> None:
+        '''Tell the objective value f of a solution x returned by ask_async(), in any order.'''
+        key = x.tobytes()
+        self.last_tell_was_x0 = key in self._x0_in_flight
+        if self.last_tell_was_x0:
+            self._x0_in_flight.remove(key)
+            return
+        self.algo.tell(f, x)
 
-    def load_prob_status():
-        with open(prob_status_cache_path, 'r') as file:
-            data = file.read()
-            status = eval(data)
-            return status
+    def replay_tell_async(self, x:numpy.typing.NDArray[np.float_], f, is_x0:bool) -> None:
+        '''
+        Tell a result saved while resuming an asynchronous run, with is_x0 = last_tell_was_x0 when it was told. 
+        Results of x0 take the same branch of tell_async() as when they were told, and x0 is not asked again.
+        '''
+        if is_x0:
+            if not self.problem.x0 is None and np.all(self.problem.x0 == x):
+                self.problem.x0 = None
+            self._x0_in_flight.add(x.tobytes())
+        self.tell_async(x, f)
 
-    status = load_prob_status()
-    prob.n_f_evals = status['n_f_evals']
-    prob.n_constraint_evals = status['n_constraint_evals']
-    solver_time = status['solver_time']
-    if prob.n_f_evals >= prob.budget:
+    def supports_checkpoint(self) -> bool:
+        '''
+        Adapters that can serialize their internal state implement get_state() -> object and
+        set_state(state). The state returned by get_state() needs to be picklable. nevergrad and pso
+        do. The other adapters (snobfit, cobyqa, pyopt, scipySLSQP, scipyDIRECT, skoptbo and ax) run
+        the optimizer in an ask_tell_bridge, so their state is the stack of a suspended thread or
+        greenlet, which cannot be pickled. They are resumed by replaying the evaluations instead.
+        '''
+        return hasattr(self.algo, 'get_state') and hasattr(self.algo, 'set_state')
+
+    def save_checkpoint(self, path:str, n_evaluations:int) -> None:
+        '''
+        Save a snapshot of the optimizer after n_evaluations evaluations were told. The state of
+        the problem that the optimizer depends on (the random state used for initial solutions
+        and the pending initial solution x0) is saved as well, and so are the x0 asked and not yet told.
+        '''
+        assert self.supports_checkpoint()
+        state = {
+            'n_evaluations': n_evaluations,
+            'algorithm_name': self.algorithm_name,
+            'algo': self.algo.get_state(),
+            'problem_rs': self.problem.rs,
+            'problem_x0': self.problem.x0,
+            'asked_x0': self._asked_x0,
+            'x0_in_flight': set(self._x0_in_flight),
+        }
+        with open(path + '.tmp', 'wb') as file:
+            pickle.dump(state, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + '.tmp', path)
+
+    def load_checkpoint(self, path:str, max_evaluations:int) -> int:
+        '''
+        Restore a snapshot saved with save_checkpoint(). Returns the number of evaluations it includes.
+        Snapshots that include more than max_evaluations evaluations (that is, more than were cached
+        in the journal) are not restored, and 0 is returned.
+        '''
+        assert self.supports_checkpoint()
+        with open(path, 'rb') as file:
+            state = pickle.load(file)
+        assert state['algorithm_name'] == self.algorithm_name, f"Checkpoint {path} was saved by {state['algorithm_name']}, not {self.algorithm_name}."
+        if state['n_evaluations'] > max_evaluations:
+            print(f"Checkpoint {path} includes {state['n_evaluations']} evaluations, but only {max_evaluations} were cached. Ignoring checkpoint.")
+            return 0
+        self.algo.set_state(state['algo'])
+        self.problem.rs = state['problem_rs']
+        self.problem.x0 = state['problem_x0']
+        self._asked_x0 = state.get('asked_x0', False)
+        self._x0_in_flight = set(state.get('x0_in_flight', ()))
+        return state['n_evaluations']
+
+
+
+def _resume_previous_local_solve(prob: problem, algo:optimization_algorithm, journal: evaluation_journal, checkpoint_path:str, asynchronous:bool=False):
+    records = journal.load()
+    if len(records) > 0 and records['n_f_evals'][-1] >= prob.budget:
         print("Error. Optimization already finished, n_f_evals > budget on load from cache.")
         print("Skipping optimization.")
-        return [None,]*5
+        return [None,]*3
+
+    # Restore the optimizer from its last snapshot if possible, and only replay the evaluations told after it.
+    replay_from = 0
+    if algo.supports_checkpoint() and os.path.exists(checkpoint_path):
+        replay_from = algo.load_checkpoint(checkpoint_path, len(records))
+        if replay_from > 0:
+            print(f"Optimizer state loaded from checkpoint at {replay_from} evaluations.")
+    elif not algo.supports_checkpoint() and len(records) > 0:
+        print(f"{algo.algorithm_name} has no checkpoints (see supports_checkpoint()), replaying all the {len(records)} evaluations.")
+
+    # Repeat optimization algorithm with values from from cache. Batches are asked with the same size as in local_solve.
+    pb = tqdm(total=len(records) - replay_from)
+    i = replay_from
+    while i < len(records) and asynchronous:
+        # Results were told out of order, so they cannot be replayed with ask. Tell them as solutions not asked by the algorithm
+        # instead, except the results of x0, which were not told to the algorithm.
+        algo.replay_tell_async(np.array(records['x'][i]), float(records['f'][i]), bool(records['is_x0'][i]))
+        i += 1
+        pb.update(1)
+    if asynchronous:
+        # The x0 that were being evaluated when the run stopped are lost, nothing waits for their result.
+        algo._x0_in_flight.clear()
+    while i < len(records):
+        if algo.n_workers == 1:
+            X = algo.ask().reshape(1, -1)
+        else:
+            n_f_evals_before = 0 if i == 0 else int(records['n_f_evals'][i-1])
+            X = algo.ask_batch(min(algo.n_workers, prob.budget - n_f_evals_before, len(records) - i))
+        for j, x in enumerate(X):
+            x_cached = np.array(records['x'][i+j])
+            assert np.all(x == x_cached), f"cached solution {x_cached} and algorithm solution {x} at index {i+j} differ and should be exactly the same, the euclidean distance between them is {np.linalg.norm(x - x_cached):.3e}"
+        if algo.n_workers == 1:
+            algo.tell(float(records['f'][i]))
+        else:
+            algo.tell_batch(np.array(records['f'][i:i+len(X)]))
+        i += len(X)
+        pb.update(len(X))
+    pb.close()
 
     f_best = 1e10
     x_best = None
-    for i in tqdm(range(len(x_list))): # Repeat optimization algorithm with values from from cache.
-        x = algo.ask()
-
-
-
-        assert np.all(x == x_list[i]), f"cached solution {x_list[i]} and algorithm solution {x} at index {i} differ and should be exactly the same, the euclidean distance between them is {np.linalg.norm(x - x_list[i]):.3e}"
-        f = f_list[i]
-        algo.tell(f)
-        if f < f_best and (prob.constraint_method == 'ignore' or np.all(np.array(prob.constraint_check(x)) > 0)):
-            f_best = f
-            x_best = x
+    if len(records) > 0:
+        f_cached = np.array(records['f'])
+        valid = ~np.isnan(f_cached) & (f_cached < f_best)
+        if prob.constraint_method != 'ignore':
+            valid &= np.all(np.array(records['g']) > 0, axis=1)
+        if np.any(valid):
+            i_best = np.argmin(np.where(valid, f_cached, np.inf))
+            f_best = float(f_cached[i_best])
+            x_best = np.array(records['x'][i_best])
+
+    # Restore the counters after the replay, as the replay itself might have checked constraints.
+    solver_time = 0.0
+    if len(records) > 0:
+        prob.n_f_evals = int(records['n_f_evals'][-1])
+        prob.n_constraint_evals = int(records['n_constraint_evals'][-1])
+        prob.n_unfeasible_on_ask = int(records['n_unfeasible_on_ask'][-1])
+        prob.f_cost_carry = float(records['f_cost_carry'][-1])
+        solver_time = float(records['solver_time'][-1])
     ref = time.time() - solver_time
     print("loaded.")
-    return ref, x_best, f_best, x_list, f_list
+    return ref, x_best, f_best
 
 
 
-def local_solve(problem_name, algorithm_name, constraint_method, seed, budget, reuse_encoding, log_every=None, task_info=None):
+def _seed_evaluation_worker(seed):
+    import multiprocessing
+    import random
+    worker_seed = seed + 28342348 + multiprocessing.current_process()._identity[0]
+    np.random.seed(worker_seed)
+    random.seed(worker_seed)
 
-    task_info_str = "" if task_info is None else task_info["task_name"]
 
-    optimization_cache_path_f = f'cache/{problem_name}_{task_info_str}_{algorithm_name}_{constraint_method}_{budget}_{seed}_f.npy'
-    optimization_cache_path_x = f'cache/{problem_name}_{task_info_str}_{algorithm_name}_{constraint_method}_{budget}_{seed}_x.npy'
-    prob_status_cache_path = f'cache/{problem_name}_{task_info_str}_{algorithm_name}_{constraint_method}_{budget}_{seed}_probstatus.txt'
-    result_file_path = f'results/data/{problem_name}_{task_info_str}_{algorithm_name}_{constraint_method}_{seed}.csv'
+
+def local_solve_paths(problem_name, algorithm_name, constraint_method, seed, budget, task_info=None, cache_dir='cache/', result_dir='results/data/'):
+    '''Returns the paths of the journal, the checkpoint and the result file of local_solve().'''
+    task_info_str = "" if task_info is None else task_info["task_name"]
+    journal_path = os.path.join(cache_dir, f'{problem_name}_{task_info_str}_{algorithm_name}_{constraint_method}_{budget}_{seed}_journal.bin')
+    checkpoint_path = os.path.join(cache_dir, f'{problem_name}_{task_info_str}_{algorithm_name}_{constraint_method}_{budget}_{seed}_checkpoint.pkl')
+    result_file_path = os.path.join(result_dir, f'{problem_name}_{task_info_str}_{algorithm_name}_{constraint_method}_{seed}.csv')
+    return journal_path, checkpoint_path, result_file_path
+
+
+def local_solve(problem_name, algorithm_name, constraint_method, seed, budget, reuse_encoding, log_every=None, task_info=None, journal_fsync_every=100, checkpoint_every=100, n_workers=1, asynchronous=False, cache_dir='cache/', result_dir='results/data/'):
+    '''
+    Solves the problem with the algorithm, caching every evaluation so that the optimization can be resumed.
+
+    With n_workers > 1, solutions are asked in batches of up to n_workers with algo.ask_batch() and their
+    objective values are computed on a pool of n_workers processes. Only the adapters that implement 
+    ask_batch()/tell_batch() produce batches with more than one solution.
+
+    With asynchronous=True, up to n_workers solutions are evaluated at the same time, and each result is 
+    told as soon as it is available (see evaluation_scheduler.py). Only for adapters that support it, see
+    optimization_algorithm.supports_async().
+
+    The journal and checkpoint of the run are saved in cache_dir, and the result csv, log and timing trace 
+    (see evaluation_trace.py) in result_dir.
+    '''
+
+    journal_path, checkpoint_path, result_file_path = local_solve_paths(problem_name, algorithm_name, constraint_method, seed, budget, task_info, cache_dir, result_dir)
+    trace_path = result_file_path[:-len('.csv')] + '_trace.bin'
+    # Runs saved before the evaluation journal cached x and f in .npy files and the counters in a text file, which cannot be resumed.
+    old_cache_paths = [journal_path[:-len('journal.bin')] + suffix for suffix in ('f.npy', 'x.npy', 'probstatus.txt')]
+    if not os.path.exists(journal_path) and any(os.path.exists(path) for path in old_cache_paths):
+        raise FileExistsError(f"{[path for path in old_cache_paths if os.path.exists(path)]} are the cache of a run saved in the format used before the evaluation journal, which cannot be resumed. Finish the run with the previous version, or delete these files and {result_file_path} to start over.")
     np.random.seed(seed+28342348)
     import random
     random.seed(seed+28342348)
 
-    def save_prob_status(solver_time, f_best, n_f_evals, n_constraint_evals):
-        with open(prob_status_cache_path, 'w') as file:
-            file.write(str({'solver_time':solver_time, 'f_best':f_best, 'n_f_evals':n_f_evals, 'n_constraint_evals':n_constraint_evals,}))
     def print_to_log(*args):
             with open(f"{result_file_path}.log", 'a') as f:
                 print(*args,  file=f)
@@ -266,28 +764,26 @@ def local_solve(problem_name, algorithm_name, constraint_method, seed, budget, r
 
 
     prob = problem(problem_name, budget, constraint_method, seed, reuse_encoding, task_info)
-    algo = optimization_algorithm(prob, algorithm_name, seed)
+    algo = optimization_algorithm(prob, algorithm_name, seed, n_workers)
 
     # pb = tqdm(total=budget)
 
 
     # Load from cache (resume previous run)
-    if os.path.exists(optimization_cache_path_f) or os.path.exists(optimization_cache_path_x) or os.path.exists(prob_status_cache_path):
-        assert os.path.exists(optimization_cache_path_f) and os.path.exists(optimization_cache_path_x) and os.path.exists(prob_status_cache_path)
-        print("Optimization cache files exist. Loading cached optimization...")
-        ref, x_best, f_best, x_list, f_list = _resume_previous_local_solve(prob, algo, optimization_cache_path_f, optimization_cache_path_x, prob_status_cache_path)
+    if os.path.exists(journal_path):
+        print("Optimization journal exists. Loading cached optimization...")
+        journal = evaluation_journal(journal_path, prob.dim, prob.n_constraints, fsync_every=journal_fsync_every)
+        ref, x_best, f_best = _resume_previous_local_solve(prob, algo, journal, checkpoint_path, asynchronous)
         if ref is None: # Skip finished optimization
+            journal.close()
             return
         print_to_log(f"--- Resuming optimization {problem_name} {algorithm_name} {constraint_method} {seed} {budget} at {get_human_time()}, from {prob.n_f_evals} evaluations.")
 
 
     # Start from scratch
     else:
-        solver_time = 0.0
         f_best = 1e10
         x_best = None
-        x_list = []
-        f_list = []
         ref = time.time()
         print_to_log(f"--- Starting optimization {problem_name} {algorithm_name} {constraint_method} {seed} {budget} at {get_human_time()}")
         if os.path.exists(result_file_path):
@@ -295,30 +791,34 @@ def local_solve(problem_name, algorithm_name, constraint_method, seed, budget, r
         else:
             with open(result_file_path, "a") as f:
                 print('n_f_evals;n_constraint_evals;n_unfeasible_on_ask;time;f_best;x_best', file=f)
-
-
-
-    assert len(x_list) == len(f_list), f"(len(x_list), len(f_list))={(len(x_list), len(f_list))}"
-
+        journal = evaluation_journal(journal_path, prob.dim, prob.n_constraints, fsync_every=journal_fsync_every)
+
+
+    trace = evaluation_trace(trace_path)
+    last_lap = [time.perf_counter(), prob.constraint_check_time]
+    def lap():
+        # Seconds since the previous lap, as (time not checking constraints, time checking constraints).
+        t, c = time.perf_counter(), prob.constraint_check_time
+        elapsed, constraint_elapsed = t - last_lap[0], c - last_lap[1]
+        last_lap[0], last_lap[1] = t, c
+        return elapsed - constraint_elapsed, constraint_elapsed
+
+    executor = None
+    if n_workers > 1 and prob.parallel_evaluation:
+        if prob.evaluator_pool is None:
+            from concurrent.futures import ProcessPoolExecutor
+            executor = ProcessPoolExecutor(max_workers=n_workers, initializer=_seed_evaluation_worker, initargs=(seed,))
+        else:
+            executor = prob.evaluator_pool(n_workers)
 
     i = 0
-    while prob.n_f_evals < prob.budget:
-        # pb.n = prob.n_f_evals
-        # pb.refresh()
-        x = algo.ask()
-        x_list.append(x)
-    
-        f = prob.f(x)
-        f_list.append(f)
-        solver_time = time.time() - ref
-        algo.tell(f)
-
+    last_checkpoint = len(journal)
+    def record_evaluation(x, f, g, solver_time, is_x0):
+        nonlocal i, f_best, x_best
         # save optimization status to cache
-        np.save(optimization_cache_path_x, np.array(x_list))
-        np.save(optimization_cache_path_f, np.array(f_list))
-        save_prob_status(solver_time, f_best, prob.n_f_evals, prob.n_constraint_evals)
+        journal.append(x, f, g, prob.n_f_evals, prob.n_constraint_evals, prob.n_unfeasible_on_ask, solver_time, prob.f_cost_carry, is_x0)
 
-        if f < f_best and (prob.constraint_method == 'ignore' or np.all(np.array(prob.constraint_check(x)) > 0)):
+        if f < f_best and (prob.constraint_method == 'ignore' or np.all(np.array(g) > 0)):
             f_best = f
             x_best = x
             print_to_log("---New best----------------------------------------------------")
@@ -331,13 +831,83 @@ def local_solve(problem_name, algorithm_name, constraint_method, seed, budget, r
             print_to_log("n_f_evals:", prob.n_f_evals, "n_constraint_evals:", prob.n_constraint_evals, "f:", f, "t:", time.time() - ref, "x:", x.tolist())
         i += 1
 
+    def save_checkpoint_if_needed():
+        nonlocal last_checkpoint
+        if algo.supports_checkpoint() and len(journal) - last_checkpoint >= checkpoint_every:
+            journal.sync() # The checkpoint can never be ahead of the journal.
+            algo.save_checkpoint(checkpoint_path, len(journal))
+            last_checkpoint = len(journal)
+
+    if asynchronous:
+        from evaluation_scheduler import async_evaluation_scheduler
+        if executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+            executor = ThreadPoolExecutor(max_workers=1)
+        scheduler_times = [0.0, 0.0]
+        def on_result(x, f, g):
+            _, t_constraint = lap()
+            record_evaluation(x, f, g, time.time() - ref, algo.last_tell_was_x0)
+            save_checkpoint_if_needed()
+            t_io, c_io = lap()
+            t_ask, t_tell = scheduler.time_ask - scheduler_times[0], scheduler.time_tell - scheduler_times[1]
+            scheduler_times[0], scheduler_times[1] = scheduler.time_ask, scheduler.time_tell
+            trace.append(prob.n_f_evals, t_ask, scheduler.last_evaluation_time, t_constraint + c_io, t_tell, t_io)
+        scheduler = async_evaluation_scheduler(prob, algo, n_workers if prob.parallel_evaluation else 1, executor)
+        lap()
+        scheduler.run(on_result)
+    else:
+        while prob.n_f_evals < prob.budget:
+            # pb.n = prob.n_f_evals
+            # pb.refresh()
+            lap()
+            if n_workers == 1:
+                x = algo.ask()
+                t_ask, c_ask = lap()
+                f = prob.f(x)
+                t_f, c_f = lap()
+                solver_time = time.time() - ref
+                is_x0 = algo._asked_x0
+                algo.tell(f)
+                t_tell, c_tell = lap()
+                # prob.f(x) already checked the constraints of x, so this does not evaluate them again.
+                record_evaluation(x, f, prob.constraint_check(x), solver_time, is_x0)
+                X = [x]
+            else:
+                X = algo.ask_batch(min(n_workers, int(prob.budget - prob.n_f_evals)))
+                t_ask, c_ask = lap()
+                fs, G = prob.f_batch(X, executor, return_constraints=True)
+                t_f, c_f = lap()
+                solver_time = time.time() - ref
+                is_x0 = algo._batch_is_x0
+                algo.tell_batch(fs)
+                t_tell, c_tell = lap()
+                for x, f, g in zip(X, fs, G):
+                    record_evaluation(x, f, g, solver_time, is_x0)
+
+            # Checkpoints are only saved between batches, when every asked solution has been told.
+            save_checkpoint_if_needed()
+            t_io, c_io = lap()
+            n = len(X)
+            for _ in range(n):
+                trace.append(prob.n_f_evals, t_ask / n, t_f / n, (c_ask + c_f + c_tell + c_io) / n, t_tell / n, t_io / n)
+
     # pb.close()
+    if not executor is None:
+        executor.shutdown()
+    journal.close()
+    trace.close()
     with open(result_file_path, "a") as file:
         print(f'{prob.n_f_evals};{prob.n_constraint_evals};{prob.n_unfeasible_on_ask};{time.time() - ref};{f_best};{x_best.tolist()}', file=file)
 
     print_to_log("-------------------------------------------------------------")
     print_to_log("Finished local optimization.", get_human_time())
     print_to_log("n_f_evals:", prob.n_f_evals, "\nn_constraint_evals:", prob.n_constraint_evals, "\nx:", x_best.tolist(), "\nf:", f_best)
+    print_to_log("f cache:", prob.f_cache, "\nconstraint cache:", prob.constraint_cache)
+    if not prob.n_f_evals_per_fidelity is None and sum(prob.n_f_evals_per_fidelity[:-1]) > 0:
+        print_to_log("evaluations per fidelity level:", dict(zip(prob.fidelity_levels, prob.n_f_evals_per_fidelity)), "\ncost per fidelity level:", prob.fidelity_costs)
+    print_to_log(trace_summary(load_trace(trace_path)))
+    if not prob.f_store is None:
+        print_to_log("evaluation store:", prob.f_store)
     print_to_log("Constraints: ")
     [print_to_log("g(x) = ", el) for el in  prob.constraint_check(x_best)]
     print_to_log("-------------------------------------------------------------")
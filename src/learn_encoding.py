@@ -4,6 +4,7 @@ import torch.optim as optim
 import numpy as np
 from tqdm import tqdm as tqdm
 from scipy.stats import gaussian_kde
+from scipy.special import expit
 from sklearn.neighbors import NearestNeighbors
 from mpmath import *
 import sys
@@ -14,6 +15,7 @@ import torch.optim as optim
 from torch.utils.data import DataLoader, TensorDataset
 from sklearn.model_selection import train_test_split
 import torch.nn.functional
+from evaluation_cache import evaluation_cache
 
 feasible_and_unfeasible_sample_size = int(1e6)
 
@@ -31,6 +33,7 @@ encoder_batch_size = 6400
 batch_size_distances_mantained = 120
 feasible_refs_sample_size_for_loss = 120
 encoder_learning_log = "encoder_training.log"
+encode_cache_size = 1000 # Number of recent encodings memoized by solution_space_encoder.encode()
 
 
 def check_gpu():
@@ -180,7 +183,7 @@ class nn_encoding(nn.Module):
         self.fc5 = nn.Linear(prob.dim*2, prob.dim)
         self.relu = nn.ReLU()
         self.sigmoid = nn.Sigmoid()
-        self._feasibility_function = prob._constraint_check
+        self._feasibility_function = prob._constraint_check_batch
         self.n_constraints = prob.n_constraints
         self.problem_dim = prob.dim
         self.seed = seed
@@ -198,38 +201,17 @@ class nn_encoding(nn.Module):
             # Generate feasible/unfeasible samples
             print("Loading feasible/unfeasible samples failed. Generating new samples:")
             print(feasible_and_unfeasible_sample_size)
-            pb = tqdm(total=feasible_and_unfeasible_sample_size)
-            self.feasible_solutions = np.empty((feasible_and_unfeasible_sample_size, prob.dim))
-            self.unfeasible_solutions = np.empty((feasible_and_unfeasible_sample_size, prob.dim))
-
-            count_feasible = 0
-            count_unfeasible = 0
-            while min(count_feasible, count_unfeasible) < feasible_and_unfeasible_sample_size:
-                random_sample = np.random.random((100, prob.dim))
-                res_feasibility_check = self.feasibility_function(random_sample)
-                new_feasible_solutions = random_sample[np.where(np.all(res_feasibility_check > 0.0, axis=1))]
-                new_unfeasible_solutions = random_sample[np.where(np.all(res_feasibility_check < 0.0, axis=1))]
-                for solution in new_feasible_solutions:
-                    if count_feasible < feasible_and_unfeasible_sample_size:
-                        self.feasible_solutions[count_feasible] = solution
-                        count_feasible += 1
-                for solution in new_unfeasible_solutions:
-                    if count_unfeasible < feasible_and_unfeasible_sample_size:
-                        self.unfeasible_solutions[count_unfeasible] = solution
-                        count_unfeasible += 1
-                pb.n = min(count_feasible, count_unfeasible)
-                pb.refresh()
-            pb.close()
-            self.feasible_solutions = self.feasible_solutions[:feasible_and_unfeasible_sample_size,:]
-            self.unfeasible_solutions = self.unfeasible_solutions[:feasible_and_unfeasible_sample_size,:]
-            np.save(f'cache/feasible_{prob.problem_name}_{seed}.npy', self.feasible_solutions)
-            np.save(f'cache/unfeasible_{prob.problem_name}_{seed}.npy', self.unfeasible_solutions)
+            from feasibility_samples import generate_feasibility_samples
+            generate_feasibility_samples(self.feasibility_function, prob.dim, feasible_and_unfeasible_sample_size, 
+                                         f'cache/feasible_{prob.problem_name}_{seed}.npy', f'cache/unfeasible_{prob.problem_name}_{seed}.npy', seed)
+            self.feasible_solutions = np.load(f'cache/feasible_{prob.problem_name}_{seed}.npy')
+            self.unfeasible_solutions = np.load(f'cache/unfeasible_{prob.problem_name}_{seed}.npy')
 
 
 
 
     def feasibility_function(self, x_matrix):
-        return np.array([self._feasibility_function(el) for el in x_matrix])
+        return self._feasibility_function(np.asarray(x_matrix))
 
     def forward(self, x):
         x = self.relu(self.fc1(x))
@@ -238,6 +220,10 @@ class nn_encoding(nn.Module):
         x = self.relu(self.fc4(x))
         x = self.sigmoid(self.fc5(x))
         return x
+
+    def export_weights(self):
+        '''Returns [(W, b), ...] of fc1, ..., fc5 as float32 arrays, so that a layer computes x @ W + b without torch.'''
+        return [(layer.weight.detach().cpu().numpy().T.copy(), layer.bias.detach().cpu().numpy().copy()) for layer in (self.fc1, self.fc2, self.fc3, self.fc4, self.fc5)]
     
     def loss_constraints(self, output):
         feasibility_values = self.feasibility_function(output)
@@ -423,11 +409,33 @@ class solution_space_encoder:
             self.encoding_model.train_model(self.encoding_model, encoder_epochs, encoder_batch_size)
             self.encoding_model.load_model_from_cache_folder() # Load model with best validation error
 
+        # Inference runs forward() with numpy, which avoids the overhead of torch on every call with a single solution.
+        # It is computed in float64, so that encoding a solution alone or in a batch gives the same float32 result.
+        self.dim = prob.dim
+        self.weights = [(W.astype(np.float64), b.astype(np.float64)) for W, b in self.encoding_model.export_weights()]
+        self.encode_cache = evaluation_cache(encode_cache_size)
+
+
+    def encode_batch(self, X):
+        '''Encodes each row of the (n, dim) matrix X, returns a (n, dim) float32 matrix.'''
+        assert X.ndim == 2 and X.shape[1] == self.dim, f"X.shape={X.shape}"
+        h = np.asarray(X, dtype=np.float64)
+        for W, b in self.weights[:-1]:
+            h = h @ W
+            h += b
+            np.maximum(h, 0.0, out=h)
+        W, b = self.weights[-1]
+        h = h @ W
+        h += b
+        return expit(h, out=h).astype(np.float32)
 
     def encode(self, input):
-        assert input.shape == (self.classifier_model.prob.dim,)
-        with torch.no_grad():
-            res = self.encoding_model(torch.tensor(input, dtype=torch.float32)).cpu().numpy()
+        assert input.shape == (self.dim,)
+        found, res = self.encode_cache.lookup(input)
+        if not found:
+            res = self.encode_batch(input.reshape(1, -1))[0]
+            res.setflags(write=False) # Shared by every call with the same input.
+            self.encode_cache.store(input, res)
         return res
         
 # import interfaces 
@@ -13,11 +13,9 @@ if __name__ == "__main__":
         problem_name = sys.argv[2]
         n_montecarlo = 5000
         prob = problem(problem_name, 100, 'ignore', 2, True)
-        set_list = [set() for _ in range(prob.n_constraints)]
-        for i in tqdm(range(n_montecarlo)):
-            x_random = np.random.random(prob.dim)
-            res = prob.constraint_check(x_random)
-            [set_list[idx].add(i) for idx in range(prob.n_constraints) if res[idx] > 0.0]
+        X_random = np.random.random((n_montecarlo, prob.dim))
+        G = prob.constraint_check_batch(X_random)
+        set_list = [set(np.nonzero(G[:,idx] > 0.0)[0].tolist()) for idx in range(prob.n_constraints)]
         plot_src.plot_venn_diagram(problem_name, set_list, n_montecarlo, ["constraint_"+str(i) for i in range(prob.n_constraints)])
 
     # Directly solve problem locally, with f function that returns np.nan on infeasible solutions.
@@ -35,32 +33,61 @@ if __name__ == "__main__":
 
     # Directly solve problem locally, with f function that returns np.nan on infeasible solutions.
     elif sys.argv[1] == "--all-local-solve":
+        # python src/main.py --all-local-solve [n_workers]
+        n_workers = int(sys.argv.pop()) if len(sys.argv) > 2 else 1
         sys.argv.pop()
+        from experiment_grid import experiment_grid, grid_job
         reuse_encoding = True
         budget = 50
-        global_log_path = "global_log.log"
-        if os.path.exists(global_log_path):
-            os.remove(global_log_path)
 
         algorithm_name_list = ["nevergrad",] #"snobfit", "cobyqa", "pyopt"]:
         constraint_method_list = ["ignore"]# ["algo_specific", "nn_encoding", 'constant_penalty_no_evaluation']
         problem_name_list = ['airframes']#['windflo', 'toy']
         seed_list = list(range(2,102))
 
-        pb = tqdm(total = len(algorithm_name_list)*len(constraint_method_list)*len(problem_name_list)*len(seed_list))
-        for algorithm_name in algorithm_name_list:
-            for constraint_method in constraint_method_list:
-                for problem_name in problem_name_list:
-                    for seed in seed_list:
-                        with open(global_log_path, "a") as file:
-                            file.write(f"Launching {problem_name} {seed} {constraint_method} - ")
-                        local_solve(problem_name, algorithm_name, constraint_method, seed, budget, reuse_encoding, log_every=100)
-                        with open(global_log_path, "a") as file:
-                            file.write("done\n")
-                        pb.update()
-        pb.close()
+        job_list = [grid_job(problem_name, algorithm_name, constraint_method, seed, budget, reuse_encoding, log_every=100)
+                    for algorithm_name in algorithm_name_list
+                    for constraint_method in constraint_method_list
+                    for problem_name in problem_name_list
+                    for seed in seed_list]
+        failed = experiment_grid(job_list, n_workers).run()
+        if len(failed) > 0:
+            print(len(failed), "jobs failed:", failed)
 
 
+    # Plot the time per 1000 evaluations of an algorithm, from the timing traces saved by local_solve.
+    # python src/main.py --plot-time-per-1000-evaluations problem_name algorithm_name [constraint_method]
+    elif sys.argv[1] == "--plot-time-per-1000-evaluations":
+        import plot_src
+        problem_name = sys.argv[2]
+        algorithm_name = sys.argv[3]
+        constraint_method = sys.argv[4] if len(sys.argv) > 4 else "ignore"
+        assert problem_name in problem_name_list and algorithm_name in algorithm_name_list and constraint_method in constraint_method_list
+        plot_src.plot_time_per_1000_evaluations(problem_name, algorithm_name, constraint_method)
+
+    # Compare the time of the windflo constraint check one solution at a time and vectorized.
+    # python src/main.py --benchmark-windflo-constraint-check
+    elif sys.argv[1] == "--benchmark-windflo-constraint-check":
+        import problem_windflo
+        problem_windflo.benchmark_constraint_check()
+
+    # Time of the objective function and the constraints of windflo as the number of turbines grows.
+    # python src/main.py --benchmark-windflo-sizes
+    elif sys.argv[1] == "--benchmark-windflo-sizes":
+        import problem_windflo
+        problem_windflo.benchmark_sizes()
+
+    # Time of evaluating single turbine moves of a windflo layout reusing its wakes, compared to full evaluations.
+    # python src/main.py --benchmark-windflo-moves
+    elif sys.argv[1] == "--benchmark-windflo-moves":
+        import problem_windflo
+        problem_windflo.benchmark_moves()
+
+    # Error and speedup of the numpy windflo backend with respect to the compiled WindFLO library.
+    # python src/main.py --validate-windflo-numpy [n_layouts]
+    elif sys.argv[1] == "--validate-windflo-numpy":
+        import problem_windflo
+        problem_windflo.validate_numpy_backend(int(sys.argv[2]) if len(sys.argv) > 2 else 200)
 
     # Plot how time per evaluation in snobfit increases linearly
     elif sys.argv[1] == "--plot-snobfit-time-per-1000-evaluations":
@@ -146,6 +146,38 @@ def compare_different_constraint_methods(problem, algorithm, constraint_method_l
     plt.legend(loc='lower left', bbox_to_anchor=(0.0, 1.05), shadow=False, ncol=1)
     plt.tight_layout()
 
+def plot_time_per_1000_evaluations(problem, algorithm, constraint_method):
+    '''
+    Stacked plot of the time per 1000 evaluations spent in ask, f, constraint checks, tell and io, from the timing
+    traces saved by local_solve. The median over all the seeds (traces) is shown.
+    '''
+    import glob
+    import os
+    import re
+    from evaluation_trace import load_trace, time_per_1000_evaluations, TRACE_COMPONENTS
+    # Traces are saved as {problem}_{task_name}_{algorithm}_{constraint_method}_{seed}_trace.bin (see local_solve_paths), the
+    # task name is empty or has no underscores. The glob alone would also match problems starting with problem (windflo_20).
+    trace_name = re.compile(f"{re.escape(problem)}_[^_]*_{re.escape(algorithm)}_{re.escape(constraint_method)}_[0-9]+_trace[.]bin")
+    file_list = sorted(file_path for file_path in glob.glob(f"results/data/{problem}_*_trace.bin") if trace_name.fullmatch(os.path.basename(file_path)))
+    assert len(file_list) > 0, f"No timing traces found for {problem} {algorithm} {constraint_method}."
+
+    time_list = [time_per_1000_evaluations(load_trace(file_path))[1] for file_path in file_list]
+    n_blocks = min(time.shape[0] for time in time_list)
+    median_time = np.median(np.array([time[:n_blocks] for time in time_list]), axis=0)
+
+    plt.figure(figsize=(4,3))
+    plt.stackplot(np.arange(1, n_blocks+1), median_time.T, labels=TRACE_COMPONENTS, colors=color_list[1:len(TRACE_COMPONENTS)+1])
+    plt.ylabel("time (s)")
+    plt.xlabel("x 1000 evaluations")
+    plt.title(f"{algorithm}: time per 1000 evaluations")
+    plt.legend(loc='upper left', shadow=False, ncol=1)
+    plt.tight_layout()
+    dir_path = "results/figures/time_per_1000_evaluations"
+    os.makedirs(dir_path, exist_ok=True)
+    plt.savefig(dir_path + f"/{problem}_{algorithm}_{constraint_method}.pdf")
+    plt.close()
+
+
 from typing import Iterable
 def sidebyside_boxplots(file_list: Iterable[str]):
     import pandas as pd
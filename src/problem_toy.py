@@ -11,6 +11,12 @@ def f(x: numpy.typing.ArrayLike):
     return np.linalg.norm(x - offset) + np.random.normal(0, np.sqrt(0.1))
 
 
+def f_batch(X: numpy.typing.ArrayLike):
+    '''Evaluating the performance of each row of X, with the same random noise as calling f() on each row in order.'''
+    offset = np.abs(np.random.RandomState(2).random(X.shape[1]) / 2.0)
+    return np.linalg.norm(X - offset, axis=1) + np.random.normal(0, np.sqrt(0.1), size=X.shape[0])
+
+
 def constraint_check(x: numpy.typing.ArrayLike):
     check_0 = x[0] - x[1]
     check_1 = math.cos(x[1]) - math.sin(x[2])
@@ -19,3 +25,10 @@ def constraint_check(x: numpy.typing.ArrayLike):
     return (check_0, check_1, check_2, check_3) 
 
 
+def constraint_check_batch(X: numpy.typing.ArrayLike):
+    '''Constraint values of each row of X, returns a (n, 4) matrix.'''
+    check_0 = X[:,0] - X[:,1]
+    check_1 = np.cos(X[:,1]) - np.sin(X[:,2])
+    check_2 = np.arctan(X[:,2]) - X[:,3]
+    check_3 = X[:,3]*X[:,3]*X[:,3] - X[:,4]*X[:,6]
+    return np.stack((check_0, check_1, check_2, check_3), axis=1)
@@ -16,6 +16,12 @@ from numpy import linalg
 from tqdm import tqdm as tqdm
 import numpy.typing
 import os
+import tempfile
+import hashlib
+import shutil
+import multiprocessing
+import multiprocessing.util
+from concurrent.futures import ProcessPoolExecutor
 
 sys.path.append('other_src/WindFLO/API')
 from WindFLO import WindFLO
@@ -24,129 +30,730 @@ from WindFLO import WindFLO
 # FUNCTIONS
 #==================================================================================================
 
-N_TURBINES = 10
-SOLUTION_DIM = N_TURBINES*2
+INPUT_FILE = 'other_src/WindFLO/Examples/Example1/WindFLO.dat'
+TURBINE_FILE = 'other_src/WindFLO/Examples/Example1/V90-3MW.dat'
+TERRAIN_FILE = 'other_src/WindFLO/Examples/Example1/terrain.dat'
+TERRAIN_SITE_SIZE = 2000.0 # TERRAIN_FILE covers a TERRAIN_SITE_SIZE x TERRAIN_SITE_SIZE square.
+HOLE_CENTER = (1350.0, 750.0) # Center of the invalid terrain in the TERRAIN_SITE_SIZE site, scaled with the site.
+
+
+
+# Number of Monte Carlo points of each fidelity level of f, from lowest to highest. The highest level is the
+# fidelity of f(x), lower levels are cheaper and noisier estimates of the same farm power.
+FIDELITY_MONTECARLO_PTS = [50, 200, 1000]
+
+
+# Number of turbines of the problems windflo_{n}, 'windflo' has 10 turbines. The site grows linearly with the
+# number of turbines (site_size = 200 * n), so that the fraction of uniform random layouts that satisfy the
+# minimum distance constraint stays close to the one of windflo.
+WINDFLO_SIZES = [20, 50, 100, 200, 500]
+# The compiled library of the problems above evaluates a flat terrain (the terrainfile of INPUT_FILE, 'terrain.dat',
+# is an empty file in the working directory). The {name}_terrain variants evaluate the terrain of TERRAIN_FILE
+# instead, interpolated in the grid of windflo_instance.get_terrain_grid(), the same terrain as the numpy backend.
+PROBLEM_NAMES = ['windflo'] + [f'windflo_{n}' for n in WINDFLO_SIZES]
+PROBLEM_NAMES += [f'{problem_name}_terrain' for problem_name in PROBLEM_NAMES]
+
+
+def hole_radius(n_turbines:int, site_size:float):
+    '''
+    Radius of the invalid terrain. Every turbine has to be outside of it, so with the same fraction of the site
+    the constraint would become harder with more turbines, and with the same radius it would vanish in larger
+    sites. Instead, the radius is chosen so that the probability that n_turbines uniform random turbines are all
+    outside of it is the same as in windflo (10 turbines, 2000 m site, 400 m radius). Rounded to 0.1 m.
+    '''
+    area_windflo = np.pi * 400.0**2 / 2000.0**2
+    area = 1.0 - (1.0 - area_windflo) ** (10.0 / n_turbines)
+    return round(float(site_size * np.sqrt(area / np.pi)), 1)
+
+
+def problem_parameters(problem_name:str):
+    '''Returns (n_turbines, site_size, min_distance, hole_radius, gridded_terrain) of a problem in PROBLEM_NAMES.'''
+    assert problem_name in PROBLEM_NAMES, f"{problem_name} not in {PROBLEM_NAMES}."
+    gridded_terrain = problem_name.endswith('_terrain')
+    base_name = problem_name[:-len('_terrain')] if gridded_terrain else problem_name
+    n_turbines = 10 if base_name == 'windflo' else int(base_name.split('_')[1])
+    site_size = 200.0 * n_turbines
+    return n_turbines, site_size, 300.0, hole_radius(n_turbines, site_size), gridded_terrain
+
+
+def scaled_terrain_file(site_size:float, cache_dir:str='cache/windflo_terrain/'):
+    '''
+    TERRAIN_FILE with the x and y coordinates scaled from TERRAIN_SITE_SIZE to site_size, so that the terrain
+    covers the whole site. Written once in cache_dir. The IDW weights only depend on ratios of distances, so
+    the interpolated terrain is the original one stretched to the site.
+    '''
+    if site_size == TERRAIN_SITE_SIZE:
+        return TERRAIN_FILE
+    path = os.path.join(cache_dir, f'terrain_{site_size:.1f}.dat')
+    if not os.path.exists(path):
+        points = np.loadtxt(TERRAIN_FILE).reshape(-1, 3)
+        points[:,0:2] *= site_size / TERRAIN_SITE_SIZE
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = path + f'.{os.getpid()}.tmp'
+        np.savetxt(tmp_path, points, fmt='%.6f')
+        os.replace(tmp_path, path)
+    return path
+
+
+# Model used to evaluate f: 'ctypes' is the compiled WindFLO library, and 'numpy' the vectorized model in
+# windflo_numpy.py, orders of magnitude faster but only an approximation (see validate_numpy_backend()).
+# Read from the environment variable WINDFLO_BACKEND, so that worker processes use the same backend.
+BACKENDS = ['ctypes', 'numpy']
+BACKEND = os.environ.get('WINDFLO_BACKEND', 'ctypes')
+assert BACKEND in BACKENDS, f"WINDFLO_BACKEND={BACKEND} not in {BACKENDS}."
+
+
+def set_backend(backend:str):
+    '''Changes the backend used by f. Needs to be called before creating the problem, as the backend is part of config_hash().'''
+    global BACKEND
+    assert backend in BACKENDS, f"Backend {backend} not in {BACKENDS}."
+    BACKEND = backend
+    os.environ['WINDFLO_BACKEND'] = backend
+
+
+_RUN_DIRS = {}
+def get_run_dir(subdir:str):
+    '''
+    WindFLO writes its input files with fixed names, so every process evaluating f needs its own
+    directory for them. Created on first use in each process (also in forked worker processes), in
+    /dev/shm if available so that the input files are not written to disk, and removed on exit.
+    The input files of each WindFLO object are updated incrementally, so each object uses a
+    subdirectory of its own (see windflo_instance.get_run_dir()).
+    '''
+    pid = os.getpid()
+    if pid not in _RUN_DIRS:
+        _RUN_DIRS[pid] = tempfile.mkdtemp(prefix=f'windflo_{pid}_', dir='/dev/shm' if os.path.isdir('/dev/shm') else None) + os.path.sep
+        # Unlike atexit handlers, multiprocessing finalizers also run when worker processes exit.
+        multiprocessing.util.Finalize(None, _remove_run_dir, args=(pid,), exitpriority=0)
+    run_dir = _RUN_DIRS[pid] + subdir + os.path.sep
+    if not os.path.isdir(run_dir):
+        os.makedirs(run_dir, exist_ok=True)
+    return run_dir
+
+
+def _remove_run_dir(pid:int):
+    # Forked processes inherit the finalizers of the parent, only the process that created the directory removes it.
+    if os.getpid() == pid:
+        shutil.rmtree(_RUN_DIRS[pid], ignore_errors=True)
+
+
+# With fewer turbines, evaluating all the moves at the same time with f_batch() is faster than reusing the wakes
+# of the incumbent one move at a time (see benchmark_moves()).
+MOVE_EVALUATOR_MIN_TURBINES = 100
+
+# With more turbines than this, the minimum distance is computed with a KD-tree instead of with all the pairs.
+KD_TREE_MIN_TURBINES = 64
+
+
+# The compiled library reads the terrain file in the first run of a process and keeps it, runs with a different
+# terrain file afterwards evaluate a flat terrain. This is the terrain file of the first run in this process (or
+# in the parent process, forked processes inherit the library). Flat terrain problems do not depend on it, and
+# problems with gridded_terrain evaluate f in a process of their own if the library read another terrain.
+_LIBRARY_TERRAIN_FILE = None
+
+
+_INSTANCES = {}
+def get_instance(n_turbines:int=10, site_size:float=2000.0, min_distance:float=300.0, hole_radius:float=400.0, gridded_terrain:bool=False):
+    '''
+    The windflo_instance with these parameters, created once per process. Instances are pickled as their
+    parameters, so the methods of an instance can be sent to worker processes, where they are evaluated
+    by the worker's own instance.
+    '''
+    key = (int(n_turbines), float(site_size), float(min_distance), float(hole_radius), bool(gridded_terrain))
+    if key not in _INSTANCES:
+        _INSTANCES[key] = windflo_instance(*key)
+    return _INSTANCES[key]
+
+
+class windflo_instance:
+
+    '''
+    A windflo problem: n_turbines turbines in a site_size x site_size square, at least min_distance apart
+    and outside of a circle of invalid terrain of radius hole_radius. The WindFLO objects, terrain and run
+    directories belong to the instance, so several instances can be used in the same process. Use
+    get_instance() instead of creating instances directly. With gridded_terrain, the compiled library
+    evaluates the terrain of terrain_grid_file() instead of a flat terrain (see PROBLEM_NAMES).
+    '''
+
+    def __init__(self, n_turbines:int, site_size:float, min_distance:float, hole_radius:float, gridded_terrain:bool=False):
+        self.n_turbines = n_turbines
+        self.solution_dim = n_turbines*2
+        self.site_size = site_size
+        self.min_distance = min_distance
+        self.hole_center = np.array(HOLE_CENTER) * (site_size / TERRAIN_SITE_SIZE)
+        self.hole_radius = hole_radius
+        self.gridded_terrain = gridded_terrain
+        self.terrain_file = scaled_terrain_file(site_size)
+        self.pairs_i, self.pairs_j = np.triu_indices(n_turbines, 1) # Pairs of different turbines, each pair once.
+        self._windflo_objs = {} # One WindFLO object per fidelity level, created on first use.
+        self._numpy_engine = None
+        self._terrain_grid_file = None
+        self._terrain_executor = None # Process of f if the library of this process read another terrain.
+        self._incumbent = (None, None, None)
+
+    def parameters(self):
+        return (self.n_turbines, self.site_size, self.min_distance, self.hole_radius, self.gridded_terrain)
+
+    def __reduce__(self):
+        return (get_instance, self.parameters())
+
+    def get_windFLO_object(self, fidelity:int=None):
+        '''
+        Initialize the characteristics of the terrain and turbines on which the optimization will be applied.
+        fidelity is an index of FIDELITY_MONTECARLO_PTS, None is the highest fidelity.
+        '''
+        fidelity = len(FIDELITY_MONTECARLO_PTS) - 1 if fidelity is None else fidelity
+        if fidelity not in self._windflo_objs:
+            # Configuration and parameters.
+            windFLO = WindFLO(
+            inputFile = INPUT_FILE, # Input file to read.
+            libDir = 'other_src/WindFLO/release/', # Path to the shared library libWindFLO.so.
+            turbineFile = TURBINE_FILE,# Turbine parameters.
+            terrainfile = self.terrain_file, # File associated with the terrain.
+            nTurbines = self.n_turbines, # Number of turbines.
+
+            monteCarloPts = FIDELITY_MONTECARLO_PTS[fidelity] # Parameter whose accuracy will be modified.
+            )
+
+            # Change the default terrain model from RBF to IDW.
+            windFLO.terrainmodel = 'IDW'
+            self._windflo_objs[fidelity] = windFLO
+            if self.gridded_terrain:
+                windFLO.terrainfile = self.terrain_grid_file()
+        return self._windflo_objs[fidelity]
+
+    def get_run_dir(self, fidelity:int=None):
+        '''Run directory of the WindFLO object of this instance and fidelity level in this process (see get_run_dir()).'''
+        fidelity = len(FIDELITY_MONTECARLO_PTS) - 1 if fidelity is None else fidelity
+        return get_run_dir(f'{self.n_turbines}_{self.site_size:.1f}{"_terrain" if self.gridded_terrain else ""}_fidelity_{fidelity}')
+
+    def get_terrain_grid(self):
+        '''
+        Elevation grid of the terrain file with the terrain model of the WindFLO object, built once and
+        memory-mapped from cache/terrain_grid/ afterwards. Used by the numpy backend and by plot_WindFLO().
+        '''
+        windFLO = self.get_windFLO_object()
+        if windFLO.terrainGrid is None:
+            windFLO.GetTerrainGrid(self.terrain_file, cacheDir='cache/terrain_grid/')
+        return windFLO.terrainGrid
+
+    def terrain_grid_file(self):
+        '''
+        The nodes of get_terrain_grid() as a terrain file, written once next to the grid in cache/terrain_grid/.
+        It is the terrain file of the compiled library in the gridded_terrain problems, so that the library
+        reads the terrain already interpolated, the same terrain as the numpy backend.
+        '''
+        if self._terrain_grid_file is None:
+            grid = self.get_terrain_grid()
+            path = os.path.abspath(os.path.join('cache/terrain_grid/', f'terrain_{grid.key}.dat'))
+            if not os.path.exists(path):
+                grid.writeTerrainFile(path)
+            self._terrain_grid_file = path
+        return self._terrain_grid_file
+
+    def get_numpy_engine(self):
+        if self._numpy_engine is None:
+            from windflo_numpy import windflo_numpy_engine
+            self._numpy_engine = windflo_numpy_engine(INPUT_FILE, TURBINE_FILE, self.terrain_file, terrain_model=self.get_windFLO_object().terrainmodel, terrain_grid=self.get_terrain_grid())
+        return self._numpy_engine
+
+    def config_hash(self):
+        '''
+        Hash of everything that determines the value of f, other than x. Two solutions with the same x
+        evaluated with the same config_hash() have the same objective value.
+        '''
+        windFLO = self.get_windFLO_object()
+        h = hashlib.sha256()
+        for path in [INPUT_FILE, TURBINE_FILE, self.terrain_file]:
+            with open(path, 'rb') as file:
+                h.update(file.read())
+        h.update(repr((self.n_turbines, windFLO.montecarlopts, windFLO.terrainmodel)).encode())
+        if self.site_size != 2000.0:
+            h.update(repr(self.site_size).encode())
+        if BACKEND != 'ctypes':
+            h.update(BACKEND.encode())
+        if BACKEND == 'numpy' or self.gridded_terrain:
+            h.update(self.get_terrain_grid().key.encode())
+        return h.hexdigest()
+
+    def constraint_hash(self):
+        '''Hash of everything that determines the constraint values, other than x (see constraint_check()).'''
+        h = hashlib.sha256()
+        h.update(repr((self.n_turbines, self.site_size, self.min_distance, tuple(self.hole_center), self.hole_radius, 0.333333333)).encode())
+        return h.hexdigest()
+
+    def from_0_1_to_windflo(self, x: numpy.typing.ArrayLike):
+        assert x.shape == (self.solution_dim,), f"x.shape={x.shape} solution_dim={self.solution_dim}"
+        lbound = np.zeros(self.solution_dim)
+        ubound = np.ones(self.solution_dim)*self.site_size
+        return lbound + x*(ubound - lbound)
+
+    def f(self, x: numpy.typing.ArrayLike, fidelity:int=None):
+        '''
+        Evaluating the performance of a single solution. fidelity is an index of FIDELITY_MONTECARLO_PTS,
+        None is the highest fidelity. The numpy backend has no Monte Carlo integration, and ignores it.
+        '''
+        if BACKEND == 'numpy':
+            return self.f_batch(np.asarray(x).reshape(1, self.solution_dim))[0]
+        solution=self.from_0_1_to_windflo(x)
+        windFLO = self.get_windFLO_object(fidelity)
+        global _LIBRARY_TERRAIN_FILE
+        if _LIBRARY_TERRAIN_FILE is None:
+            _LIBRARY_TERRAIN_FILE = windFLO.terrainfile
+        elif self.gridded_terrain and windFLO.terrainfile != _LIBRARY_TERRAIN_FILE:
+            if self._terrain_executor is None:
+                # Spawned, so that the process starts with a library that has not read any terrain yet.
+                self._terrain_executor = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn'))
+            return self._terrain_executor.submit(self.f, x, fidelity).result()
+
+        windFLO.turbineArrays.position[:,0:2] = solution.reshape(self.n_turbines, 2)
+
+        # The input files stay in the run directory, only the files of the turbines that moved are written again.
+        windFLO.run(incremental = True, runDir = self.get_run_dir(fidelity))
+
+        return -windFLO.farmPower / 10000000.0 # negative sign because we assume minimization in the paper Scale down to avoid numerical errors.
+
+    def fidelity_costs(self, n:int=20, cache_path:str='cache/windflo_fidelity_costs.json'):
+        '''
+        Cost of an evaluation of f at each fidelity level, relative to the highest fidelity. Measured once, as
+        the mean time of n random layouts per level, and saved in cache_path for each config_hash(), so that
+        the budget charged for each fidelity does not change between runs.
+        '''
+        import json
+        if BACKEND == 'numpy':
+            return [1.0] * len(FIDELITY_MONTECARLO_PTS)
+        key = f'{self.config_hash()}_{FIDELITY_MONTECARLO_PTS}'
+        costs = {}
+        if os.path.exists(cache_path):
+            with open(cache_path, 'r') as file:
+                costs = json.load(file)
+        if key not in costs:
+            X = np.random.RandomState(3).random((n, self.solution_dim))
+            times = []
+            for fidelity in range(len(FIDELITY_MONTECARLO_PTS)):
+                self.f(X[0], fidelity) # Writes the input files of the level.
+                ref = time.perf_counter()
+                for x in X:
+                    self.f(x, fidelity)
+                times.append((time.perf_counter() - ref) / n)
+            costs[key] = [t / times[-1] for t in times]
+            os.makedirs(os.path.dirname(cache_path) or '.', exist_ok=True)
+            tmp_path = cache_path + f'.{os.getpid()}.tmp'
+            with open(tmp_path, 'w') as file:
+                json.dump(costs, file)
+            os.replace(tmp_path, cache_path)
+        return costs[key]
+
+    def f_batch(self, X: numpy.typing.ArrayLike):
+        '''f() of each row of X, with the numpy backend. All rows are evaluated at the same time.'''
+        assert X.ndim == 2 and X.shape[1] == self.solution_dim, f"X.shape={X.shape} solution_dim={self.solution_dim}"
+        farm_power, _, _ = self.get_numpy_engine().run((X * self.site_size).reshape(X.shape[0], self.n_turbines, 2))
+        return -farm_power / 10000000.0
+
+    def _incumbent_constraints(self, x_pos: numpy.typing.NDArray[np.float_]):
+        # For a layout x_pos, (n_turbines, 2): for each turbine m, the minimum squared distance between two other
+        # turbines and from another turbine to the invalid terrain, and the quadrant counts of the layout.
+        d = x_pos[:,None,:] - x_pos[None,:,:]
+        D = d[:,:,0]*d[:,:,0] + d[:,:,1]*d[:,:,1]
+        np.fill_diagonal(D, np.inf)
+        # The two closest turbines to each turbine i: without m, the closest to i is the first unless the first is m.
+        closest = np.argsort(D, axis=1, kind='stable')[:,:2]
+        first, second = np.take_along_axis(D, closest, axis=1).T
+        without = np.where(closest[None,:,0] == np.arange(self.n_turbines)[:,None], second[None,:], first[None,:])
+        np.fill_diagonal(without, np.inf)
+        hx, hy = x_pos[:,0] - self.hole_center[0], x_pos[:,1] - self.hole_center[1]
+        H = hx*hx + hy*hy
+        H_without = np.array([np.min(np.delete(H, m), initial=np.inf) for m in range(self.n_turbines)])
+        return {'x_pos': x_pos, 'min_sq_distance': np.min(without, axis=1), 'min_sq_hole': H_without, 'quadrant': self._quadrant(x_pos)}
+
+    def _quadrant(self, x_pos: numpy.typing.NDArray[np.float_]):
+        # Quadrant (0 to 3, as in constraint_check_loop()) of each turbine, 4 if it is on the line x or y = site_size/2.
+        half = self.site_size / 2.0
+        px, py = x_pos[...,0], x_pos[...,1]
+        quadrant = np.full(px.shape, 4)
+        quadrant[(px > half) & (py > half)] = 0
+        quadrant[(px < half) & (py > half)] = 1
+        quadrant[(px < half) & (py < half)] = 2
+        quadrant[(px > half) & (py < half)] = 3
+        return quadrant
+
+    def _constraint_check_moves(self, incumbent: dict, turbines: numpy.typing.NDArray[np.int_], new_positions: numpy.typing.NDArray[np.float_]):
+        # constraint_check_batch() of the layouts with turbine turbines[i] moved to new_positions[i] (in meters), in O(n_turbines) per move.
+        x_pos = incumbent['x_pos']
+        k = turbines.shape[0]
+        d = new_positions[:,None,:] - x_pos[None,:,:]
+        D = d[:,:,0]*d[:,:,0] + d[:,:,1]*d[:,:,1]
+        D[np.arange(k), turbines] = np.inf
+        check_0 = np.sqrt(np.minimum(np.min(D, axis=1), incumbent['min_sq_distance'][turbines])) - self.min_distance
+
+        q_count = np.zeros((k, 5), dtype=np.int64)
+        q_count[:] = np.bincount(incumbent['quadrant'], minlength=5)
+        q_count[np.arange(k), incumbent['quadrant'][turbines]] -= 1
+        q_count[np.arange(k), self._quadrant(new_positions)] += 1
+        check_1 = self.n_turbines * 0.333333333 - np.max(q_count[:,:4], axis=1)
+
+        hx, hy = new_positions[:,0] - self.hole_center[0], new_positions[:,1] - self.hole_center[1]
+        check_2 = np.minimum(np.sqrt(np.minimum(hx*hx + hy*hy, incumbent['min_sq_hole'][turbines])) - self.hole_radius, 1e8)
+        return np.stack((check_0, check_1, check_2), axis=1)
+
+    def evaluate_moves(self, x: numpy.typing.ArrayLike, turbines: numpy.typing.ArrayLike, new_positions: numpy.typing.ArrayLike):
+        '''
+        Evaluates k layouts that differ from x in a single turbine: in layout i turbine turbines[i] is moved to
+        new_positions[i], in [0,1]^2. Returns (fs, G), the (k,) objective values and (k, 3) constraint values.
+
+        The distances between the turbines of x are computed once (and kept while x does not change), so the
+        constraints of each move cost O(n_turbines). With the numpy backend and at least MOVE_EVALUATOR_MIN_TURBINES
+        turbines, so are the wakes of x, and only the turbines affected by each move are computed again (see
+        windflo_numpy_engine.run_moves()). The values are
+        those of f_batch() and constraint_check_batch() up to rounding errors. The compiled library evaluates each
+        layout with f().
+        '''
+        x = np.asarray(x, dtype=np.float64).reshape(self.solution_dim)
+        turbines = np.asarray(turbines, dtype=np.intp).reshape(-1)
+        new_positions = np.asarray(new_positions, dtype=np.float64).reshape(-1, 2)
+        assert turbines.shape[0] == new_positions.shape[0] and np.all((turbines >= 0) & (turbines < self.n_turbines)), f"turbines={turbines}"
+        x_pos = (x * self.site_size).reshape(self.n_turbines, 2)
+        if self._incumbent[0] != (x.tobytes(), BACKEND):
+            self._incumbent = ((x.tobytes(), BACKEND), self._incumbent_constraints(x_pos), self.get_numpy_engine().incumbent(x_pos) if BACKEND == 'numpy' else None)
+        G = self._constraint_check_moves(self._incumbent[1], turbines, new_positions * self.site_size)
+        if BACKEND == 'numpy' and self.n_turbines >= MOVE_EVALUATOR_MIN_TURBINES:
+            farm_power, _ = self.get_numpy_engine().run_moves(self._incumbent[2], turbines, new_positions * self.site_size)
+            return -farm_power / 10000000.0, G
+        X = np.repeat(x.reshape(1, self.solution_dim), turbines.shape[0], axis=0)
+        X[np.arange(turbines.shape[0])[:,None], 2*turbines[:,None] + np.arange(2)] = new_positions
+        if BACKEND == 'numpy':
+            return self.f_batch(X), G
+        return np.array([self.f(x_move) for x_move in X]), G
+
+    def evaluator_pool(self, n_workers:int=None):
+        '''windflo_evaluator_pool of this instance, with n_workers processes.'''
+        return windflo_evaluator_pool(n_workers, self)
+
+    def plot_WindFLO(self, x: numpy.typing.ArrayLike):
+        '''Graphically represent the solution.'''
+        self.f(x) # Loads solution into the WindFLO object.
+        self.get_terrain_grid() # Elevation of the turbines and terrain surface in the 3D plot.
+        windFLO = self.get_windFLO_object()
+        # Results in 2D.
+        fig = plt.figure(figsize=(8,5), edgecolor = 'gray', linewidth = 2)
+        ax = windFLO.plotWindFLO2D(fig, plotVariable = 'P', scale = 1.0e-3, title = 'P [kW]')
+        windFLO.annotatePlot(ax)
+        plt.show()
+
+        # Results in 3D.
+        fig = plt.figure(figsize=(8,5), edgecolor = 'gray', linewidth = 2)
+        ax = windFLO.plotWindFLO3D(fig)
+        windFLO.annotatePlot(ax)
+        plt.show()
+
+    def constraint_check_loop(self, x: numpy.typing.ArrayLike):
+        '''Reference implementation of constraint_check(), one turbine at a time. Used to validate and benchmark constraint_check_batch().'''
+        # Assuming turbines are placed in a site_size x site_size grid.
+
+        # get position of the turbines in the site_size x site_size grid.
+        sol = self.from_0_1_to_windflo(x)
+        k = 0
+        x_pos = np.zeros((self.n_turbines, 2))
+        for i in range(0, self.n_turbines):
+            for j in range(0, 2):
+                x_pos[i,j] = sol[k]
+                k = k + 1
+
+        # constraint 0: distance between every two turbines minimum min_distance
+        min_distance = self.min_distance
+        check_0 = np.inf
+        for i_1 in range(self.n_turbines):
+            for i_2 in range(self.n_turbines):
+                if i_1==i_2:
+                    continue
+                check_0 = min(check_0, np.linalg.norm(x_pos[i_1]- x_pos[i_2]) - min_distance)
+
+
+        # constraint 1: solutions should be evenly distributed in the space: Each quandrant should not have more than 1/3 of the solutions.
+        half = self.site_size / 2.0
+        q_count = np.zeros(4)
+        for i in range(self.n_turbines):
+            if x_pos[i][0] > half and x_pos[i][1] > half:
+                q_count[0] += 1
+            if x_pos[i][0] < half and x_pos[i][1] > half:
+                q_count[1] += 1
+            if x_pos[i][0] < half and x_pos[i][1] < half:
+                q_count[2] += 1
+            if x_pos[i][0] > half and x_pos[i][1] < half:
+                q_count[3] += 1
+        check_1 = self.n_turbines * 0.333333333 - max(q_count)
+
+        # constraint 2: Certain parts of the terrain are not valid. None of the solutions can be placed there.
+        hole_centers = np.array([[708.8905828911846, 1260.4771639928265], [989.3119875121884, 660.7845491117623], [1987.104282428962, 305.0923824053107], [929.1961117086416, 1395.3453795609323], [307.03362602397857, 1563.8444852857797], [1417.7499940372359, 621.6371831490444], [564.8454935706593, 849.5591424031293], [1359.7356592197577, 606.894587154017], [249.21741910436057, 1852.908347601767], [997.8899037977513, 735.7795317462887], [1432.1922070653075, 730.3002772617315], [1406.8871687624742, 1525.401811750595], [1291.7086773075002, 519.8698443219552], [1056.7478073369641, 913.2615384103344], [1104.8969457872658, 337.9687180510689], [1794.4047180743548, 367.3240213120086]])
+        # The center and the radius of the invalid terrain are scaled with the site (see hole_radius()).
+        diameter_holes = self.hole_radius
+        check_2 = 1e8
+        for center_non_valid_terrain in hole_centers:
+            center_non_valid_terrain = self.hole_center
+            check_2 = min(np.min(np.linalg.norm(x_pos - center_non_valid_terrain, axis=1)) - diameter_holes, check_2)
+
+
+        return (check_0, check_1, check_2)
+
+    def _min_distance_kd_tree(self, x_pos:numpy.typing.NDArray[np.float_]):
+        # Minimum distance between two turbines of each layout in x_pos, (n, n_turbines, 2). All the layouts are put
+        # in a single KD-tree, each in the plane z = index of the layout * a distance larger than the diagonal of the
+        # site, so the nearest neighbor of every turbine is in its own layout and the distance is not changed (dz = 0).
+        from scipy.spatial import cKDTree
+        n = x_pos.shape[0]
+        z = np.repeat(np.arange(n, dtype=np.float64) * (4.0 * self.site_size + 1.0), self.n_turbines)
+        points = np.column_stack((x_pos.reshape(-1, 2), z))
+        distance, _ = cKDTree(points).query(points, k=2)
+        return np.min(distance[:,1].reshape(n, self.n_turbines), axis=1)
+
+    def constraint_check(self, x: numpy.typing.ArrayLike):
+        '''
+        Returns (check_0, check_1, check_2), the constraint values of x. x is feasible if all of them are positive:
+            check_0: distance between the two closest turbines, minus min_distance (300 m).
+            check_1: a third of the turbines, minus the number of turbines in the quadrant with the most turbines.
+            check_2: distance of the closest turbine to the invalid terrain, minus hole_radius (400 m in windflo).
+        '''
+        return tuple(self.constraint_check_batch(np.asarray(x).reshape(1, self.solution_dim))[0])
+
+    def constraint_check_batch(self, X: numpy.typing.ArrayLike, chunk_size:int=65536):
+        '''
+        Vectorized constraint_check() of each row of X, returns a (n, 3) matrix with the same values as
+        constraint_check_loop(). Rows are processed in chunks of chunk_size (fewer with many turbines) to bound
+        the memory used.
+        '''
+        assert X.ndim == 2 and X.shape[1] == self.solution_dim, f"X.shape={X.shape} solution_dim={self.solution_dim}"
+        if self.n_turbines <= KD_TREE_MIN_TURBINES:
+            chunk_size = max(1, min(chunk_size, (1 << 22) // len(self.pairs_i)))
+        if X.shape[0] > chunk_size:
+            return np.concatenate([self.constraint_check_batch(X[i:i+chunk_size], chunk_size) for i in range(0, X.shape[0], chunk_size)])
+        x_pos = (X * self.site_size).reshape(X.shape[0], self.n_turbines, 2)
+        px, py = x_pos[:,:,0], x_pos[:,:,1]
+
+        # constraint 0: minimum distance between every two turbines. sqrt is monotonic, so the square root of
+        # the minimum squared distance is the minimum distance.
+        min_distance = self.min_distance
+        if self.n_turbines <= KD_TREE_MIN_TURBINES:
+            dx = px[:, self.pairs_i] - px[:, self.pairs_j]
+            dy = py[:, self.pairs_i] - py[:, self.pairs_j]
+            check_0 = np.sqrt(np.min(dx*dx + dy*dy, axis=1)) - min_distance
+        else:
+            check_0 = self._min_distance_kd_tree(x_pos) - min_distance
+
+        # constraint 1: no quadrant with more than 1/3 of the turbines (turbines on the lines x=site_size/2 or y=site_size/2 are not counted).
+        half = self.site_size / 2.0
+        right = px > half
+        left = px < half
+        top = py > half
+        bottom = py < half
+        q_count = np.stack(((right & top).sum(axis=1), (left & top).sum(axis=1), (left & bottom).sum(axis=1), (right & bottom).sum(axis=1)), axis=1)
+        check_1 = self.n_turbines * 0.333333333 - np.max(q_count, axis=1)
+
+        # constraint 2: distance to the invalid terrain, centered in hole_center as in constraint_check_loop().
+        diameter_holes = self.hole_radius
+        hx, hy = px - self.hole_center[0], py - self.hole_center[1]
+        check_2 = np.minimum(np.sqrt(np.min(hx*hx + hy*hy, axis=1)) - diameter_holes, 1e8)
+
+        return np.stack((check_0, check_1, check_2), axis=1)
+
+
+
+def _init_evaluator_worker(parameters:tuple):
+    # Each worker has its own instance, and its own run directory with the input files already written.
+    instance = get_instance(*parameters)
+    instance.f(np.random.RandomState(0).random(instance.solution_dim))
+
+
+class windflo_evaluator_pool:
+
+    '''
+    Evaluates f in n_workers long-lived processes, each with its own WindFLO object and run directory,
+    so several solutions are evaluated at the same time (see WindFLO/Examples/Example3/example3.py).
+
+    evaluate(X) evaluates the rows of X in parallel, and can be used as parallelFunc of
+    WindFLO/Optimizers/pso.py with lb = zeros and ub = ones (with constraints=True, pso gets the
+    objective and constraint values of the swarm in a single call). It also has the submit(), map() and
+    shutdown() methods of concurrent.futures executors, so local_solve() and problem.f_batch() use it
+    to distribute the evaluations of windflo, and the same pool can be reused by several pso() runs.
+    Methods of any windflo_instance can be sent to the workers, the instance only sets up the workers.
+    '''
+
+    def __init__(self, n_workers:int=None, instance:windflo_instance=None):
+        '''
+        n_workers (int): Number of worker processes, all the cores by default.
+        instance (windflo_instance): Problem evaluated by evaluate(), windflo by default.
+        '''
+        self.n_workers = os.cpu_count() if n_workers is None else n_workers
+        self.instance = get_instance(*problem_parameters('windflo')) if instance is None else instance
+        self.executor = ProcessPoolExecutor(max_workers=self.n_workers, initializer=_init_evaluator_worker, initargs=(self.instance.parameters(),))
+
+    def evaluate(self, X: numpy.typing.ArrayLike, constraints:bool=False):
+        '''
+        Returns the array [f(x) for x in X], with the rows of X in [0,1]^solution_dim. If constraints is True,
+        returns the tuple (fs, G) with G = constraint_check_batch(X), computed while the workers evaluate f.
+        '''
+        X = np.asarray(X, dtype=np.float64).reshape(-1, self.instance.solution_dim)
+        # Several solutions per message when there are many more solutions than workers.
+        chunksize = max(1, X.shape[0] // (4 * self.n_workers))
+        # All the solutions are submitted before map() returns.
+        fs = self.executor.map(self.instance.f, X, chunksize=chunksize)
+        G = self.instance.constraint_check_batch(X) if constraints else None
+        fs = np.fromiter(fs, dtype=np.float64, count=X.shape[0])
+        return (fs, G) if constraints else fs
+
+    def __call__(self, X: numpy.typing.ArrayLike, constraints:bool=False):
+        return self.evaluate(X, constraints)
+
+    def submit(self, fn, *args, **kwargs):
+        return self.executor.submit(fn, *args, **kwargs)
+
+    def map(self, fn, *iterables, chunksize=1):
+        return self.executor.map(fn, *iterables, chunksize=chunksize)
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+
+
+
+def benchmark_moves(problem_names=PROBLEM_NAMES, n_moves:int=100):
+    '''
+    Prints the time per layout of evaluating n_moves random single turbine moves of a random layout with
+    evaluate_moves() and with f_batch() and constraint_check_batch(), with the numpy backend, for each problem
+    in problem_names.
+    '''
+    backend = BACKEND
+    rs = np.random.RandomState(2)
+    try:
+        set_backend('numpy')
+        for problem_name in problem_names:
+            instance = get_instance(*problem_parameters(problem_name))
+            N = instance.n_turbines
+            x = rs.random(instance.solution_dim)
+            turbines = rs.randint(N, size=n_moves)
+            new_positions = np.clip(x.reshape(N, 2)[turbines] + rs.normal(0.0, 0.02, size=(n_moves, 2)), 0.0, 1.0)
+            instance.evaluate_moves(x, turbines[:1], new_positions[:1]) # Computes the incumbent.
+            ref = time.perf_counter()
+            fs, G = instance.evaluate_moves(x, turbines, new_positions)
+            t_moves = (time.perf_counter() - ref) / n_moves
+            X = np.repeat(x.reshape(1, instance.solution_dim), n_moves, axis=0)
+            X[np.arange(n_moves)[:,None], 2*turbines[:,None] + np.arange(2)] = new_positions
+            ref = time.perf_counter()
+            fs_batch = instance.f_batch(X)
+            G_batch = instance.constraint_check_batch(X)
+            t_batch = (time.perf_counter() - ref) / n_moves
+            _, n_recomputed = instance.get_numpy_engine().run_moves(instance._incumbent[2], turbines, new_positions * instance.site_size)
+            assert np.allclose(fs, fs_batch, rtol=1e-9, atol=0.0) and np.allclose(G, G_batch, rtol=1e-12, atol=1e-9), "evaluate_moves() does not match f_batch() and constraint_check_batch()."
+            print(f"{problem_name:>12} ({N:>3} turbines): moves {1e3 * t_moves:8.3f}ms  f_batch {1e3 * t_batch:8.3f}ms per layout  speedup x{t_batch / t_moves:6.1f}  turbines recomputed per move {np.mean(n_recomputed):6.1f}")
+    finally:
+        set_backend(backend)
+
+
+def benchmark_constraint_check(sizes=(1, 1000, 1000000), problem_name:str='windflo'):
+    '''Prints the time of constraint_check_loop() and constraint_check_batch() with n random rows, for each n in sizes.'''
+    instance = get_instance(*problem_parameters(problem_name))
+    rs = np.random.RandomState(2)
+    for n in sizes:
+        X = rs.random((n, instance.solution_dim))
+        # The loop is timed on at most 10000 rows and extrapolated.
+        n_loop = min(n, 10000)
+        ref = time.perf_counter()
+        G_loop = np.array([instance.constraint_check_loop(x) for x in X[:n_loop]])
+        t_loop = (time.perf_counter() - ref) * n / n_loop
+        ref = time.perf_counter()
+        G = instance.constraint_check_batch(X) if n > 1 else np.array([instance.constraint_check(X[0])])
+        t_batch = time.perf_counter() - ref
+        assert np.array_equal(G[:n_loop], G_loop), "constraint_check_batch() does not match constraint_check_loop()."
+        print(f"n = {n:>8}: loop {t_loop:10.4f}s{'*' if n_loop < n else ' '}  vectorized {t_batch:10.4f}s  speedup x{t_loop / t_batch:8.1f}")
+    print("* extrapolated from 10000 rows.")
+
+
+def benchmark_sizes(problem_names=PROBLEM_NAMES, n_layouts:int=1000, n_f:int=5):
+    '''
+    Prints the time per layout of the constraint check (KD-tree and all pairs) and of f with the current backend,
+    for each problem in problem_names, with n_layouts and n_f uniform random layouts respectively.
+    '''
+    rs = np.random.RandomState(2)
+    for problem_name in problem_names:
+        instance = get_instance(*problem_parameters(problem_name))
+        X = rs.random((n_layouts, instance.solution_dim))
+        x_pos = (X * instance.site_size).reshape(n_layouts, instance.n_turbines, 2)
+        ref = time.perf_counter()
+        G = instance.constraint_check_batch(X)
+        t_constraint = (time.perf_counter() - ref) / n_layouts
+        ref = time.perf_counter()
+        d_kd_tree = instance._min_distance_kd_tree(x_pos)
+        t_kd_tree = (time.perf_counter() - ref) / n_layouts
+        # All the pairs of a few layouts, to bound the memory used.
+        n_pairs = min(n_layouts, max(1, (1 << 22) // len(instance.pairs_i)))
+        ref = time.perf_counter()
+        d = x_pos[:n_pairs, instance.pairs_i] - x_pos[:n_pairs, instance.pairs_j]
+        d_pairs = np.sqrt(np.min(np.sum(d*d, axis=2), axis=1))
+        t_pairs = (time.perf_counter() - ref) / n_pairs
+        assert np.allclose(d_kd_tree[:n_pairs], d_pairs), "KD-tree and all pairs minimum distances are different."
+        instance.f(X[0])
+        ref = time.perf_counter()
+        for x in X[1:n_f+1]:
+            instance.f(x)
+        t_f = (time.perf_counter() - ref) / n_f
+        print(f"{problem_name:>12} ({instance.n_turbines:>3} turbines, site {instance.site_size:>7.0f}m, hole radius {instance.hole_radius:>6.0f}m): f {1e3 * t_f:9.3f}ms  constraints {1e6 * t_constraint:9.1f}us  min distance KD-tree {1e6 * t_kd_tree:9.1f}us  all pairs {1e6 * t_pairs:9.1f}us  feasible {np.mean(np.all(G > 0, axis=1)):.3f}")
+
+
+
+def validate_numpy_backend(n:int=200, reference_file:str='other_src/WindFLO/Examples/Example0/result.txt'):
+    '''
+    Prints the error of the numpy backend: with respect to the turbine velocities and powers in reference_file
+    (a result file of the WindFLO executable, same wind and wake models), and with respect to the ctypes
+    backend in n random feasible layouts of windflo.
+    '''
+    instance = get_instance(*problem_parameters('windflo'))
+    with open(reference_file, 'r') as file:
+        lines = file.read().splitlines()
+    start = [i for i, line in enumerate(lines) if line.strip() == '$Turbines'][0] + 2
+    rows = []
+    for line in lines[start:]:
+        if line.strip().startswith('$'):
+            break
+        rows.append([float(el) for el in line.split(',')])
+    rows = np.array(rows)
+    _, velocity, power = instance.get_numpy_engine().run(rows[None,:,1:3])
+    print(f"{reference_file}: turbine velocity relative error max {np.max(np.abs(velocity[0] / rows[:,7] - 1)):.2e}, turbine power relative error max {np.max(np.abs(power[0] / rows[:,14] - 1)):.2e}, farm power relative error {abs(np.sum(power) / np.sum(rows[:,14]) - 1):.2e}")
+
+    rs = np.random.RandomState(2)
+    X = np.zeros((0, instance.solution_dim))
+    while X.shape[0] < n:
+        X_new = rs.random((10000, instance.solution_dim))
+        X = np.concatenate((X, X_new[np.all(instance.constraint_check_batch(X_new) > 0, axis=1)]))[:n]
+    backend = BACKEND
+    try:
+        set_backend('ctypes')
+        ref = time.perf_counter()
+        f_ctypes = np.array([instance.f(x) for x in X])
+        t_ctypes = time.perf_counter() - ref
+        set_backend('numpy')
+        ref = time.perf_counter()
+        f_numpy = instance.f_batch(X)
+        t_numpy = time.perf_counter() - ref
+    finally:
+        set_backend(backend)
+    relative_error = np.abs(f_numpy / f_ctypes - 1)
+    from scipy.stats import spearmanr
+    print(f"{n} random feasible layouts: f relative error mean {np.mean(relative_error):.2e} max {np.max(relative_error):.2e}, Spearman correlation {spearmanr(f_numpy, f_ctypes)[0]:.4f}")
+    print(f"ctypes {1e3 * t_ctypes / n:.3f}ms per layout, numpy {1e3 * t_numpy / n:.3f}ms per layout, speedup x{t_ctypes / t_numpy:.1f}")
 
 
 
-def get_windFLO_object():
-    '''Initialize the characteristics of the terrain and turbines on which the optimization will be applied.'''
-
-    # Configuration and parameters.
-    windFLO = WindFLO(
-    inputFile = 'other_src/WindFLO/Examples/Example1/WindFLO.dat', # Input file to read.
-    libDir = 'other_src/WindFLO/release/', # Path to the shared library libWindFLO.so.
-    turbineFile = 'other_src/WindFLO/Examples/Example1/V90-3MW.dat',# Turbine parameters.
-    terrainfile = 'other_src/WindFLO/Examples/Example1/terrain.dat', # File associated with the terrain.
-    nTurbines = N_TURBINES, # Number of turbines.
-
-    monteCarloPts = 1000# Parameter whose accuracy will be modified.
-    )
-
-    # Change the default terrain model from RBF to IDW.
-    windFLO.terrainmodel = 'IDW'
-
-    return windFLO
-WINDFLO_OBJ=get_windFLO_object()
-
-
-def from_0_1_to_windflo(x: numpy.typing.ArrayLike):
-    assert x.shape == (SOLUTION_DIM,), f"x.shape={x.shape} SOLUTION_DIM={SOLUTION_DIM}"
-    lbound = np.zeros(SOLUTION_DIM)    
-    ubound = np.ones(SOLUTION_DIM)*2000
-    return lbound + x*(ubound - lbound)
-
-
-
-def f(x: numpy.typing.ArrayLike):
-    '''Evaluating the performance of a single solution.'''
-    solution=from_0_1_to_windflo(x)
-
-    k = 0
-    for i in range(0, N_TURBINES):
-        for j in range(0, 2):
-            WINDFLO_OBJ.turbines[i].position[j] = solution[k]
-            k = k + 1
-
-    WINDFLO_OBJ.run(clean = True) 
-
-    return -WINDFLO_OBJ.farmPower / 10000000.0 # negative sign because we assume minimization in the paper Scale down to avoid numerical errors.
-
-
-
-
-
-
-def plot_WindFLO(x: numpy.typing.ArrayLike):
-    '''Graphically represent the solution.'''
-    f(x) # Loads solution into WINDFLO_OBJ
-    # Results in 2D.
-    fig = plt.figure(figsize=(8,5), edgecolor = 'gray', linewidth = 2)
-    ax = WINDFLO_OBJ.plotWindFLO2D(fig, plotVariable = 'P', scale = 1.0e-3, title = 'P [kW]')
-    WINDFLO_OBJ.annotatePlot(ax)
-    plt.show()
-
-    # Results in 3D.
-    fig = plt.figure(figsize=(8,5), edgecolor = 'gray', linewidth = 2)
-    ax = WINDFLO_OBJ.plotWindFLO3D(fig)
-    WINDFLO_OBJ.annotatePlot(ax)
-    plt.show()
-
-
-
-def constraint_check(x: numpy.typing.ArrayLike):
-    
-    # Assuming turbines are placed in a 2000x2000 grid.
-
-    # get position of the turbines in the 2000x2000 grid.
-    sol = from_0_1_to_windflo(x)
-    k = 0
-    x_pos = np.zeros((N_TURBINES, 2))
-    for i in range(0, N_TURBINES):
-        for j in range(0, 2):
-            x_pos[i,j] = sol[k]
-            k = k + 1
-
-    # constraint 0: distance between every two turbines minimum 200 m
-    min_distance = 300.0
-    check_0 = np.inf
-    for i_1 in range(N_TURBINES):
-        for i_2 in range(N_TURBINES):
-            if i_1==i_2:
-                continue
-            check_0 = min(check_0, np.linalg.norm(x_pos[i_1]- x_pos[i_2]) - min_distance)
-
-
-    # constraint 1: solutions should be evenly distributed in the space: Each quandrant should not have more than 1/3 of the solutions.
-    q_count = np.zeros(4)
-    for i in range(N_TURBINES):
-        if x_pos[i][0] > 1000 and x_pos[i][1] > 1000:
-            q_count[0] += 1
-        if x_pos[i][0] < 1000 and x_pos[i][1] > 1000:
-            q_count[1] += 1
-        if x_pos[i][0] < 1000 and x_pos[i][1] < 1000:
-            q_count[2] += 1
-        if x_pos[i][0] > 1000 and x_pos[i][1] < 1000:
-            q_count[3] += 1
-    check_1 = N_TURBINES * 0.333333333 - max(q_count)
-
-    # constraint 2: Certain parts of the terrain are not valid. None of the solutions can be placed there.
-    hole_centers = np.array([[708.8905828911846, 1260.4771639928265], [989.3119875121884, 660.7845491117623], [1987.104282428962, 305.0923824053107], [929.1961117086416, 1395.3453795609323], [307.03362602397857, 1563.8444852857797], [1417.7499940372359, 621.6371831490444], [564.8454935706593, 849.5591424031293], [1359.7356592197577, 606.894587154017], [249.21741910436057, 1852.908347601767], [997.8899037977513, 735.7795317462887], [1432.1922070653075, 730.3002772617315], [1406.8871687624742, 1525.401811750595], [1291.7086773075002, 519.8698443219552], [1056.7478073369641, 913.2615384103344], [1104.8969457872658, 337.9687180510689], [1794.4047180743548, 367.3240213120086]])
-    diameter_holes = 400
-    check_2 = 1e8
-    for center_non_valid_terrain in hole_centers:
-        center_non_valid_terrain = np.array([1350.0, 750.0])
-        check_2 = min(np.min(np.linalg.norm(x_pos - center_non_valid_terrain, axis=1)) - diameter_holes, check_2)
-
-
-    return (check_0, check_1, check_2)
-
 if __name__ == "__main__":
-    plot_WindFLO(np.random.random(SOLUTION_DIM))
-    plot_WindFLO(np.random.random(SOLUTION_DIM)/10)
-    plot_WindFLO(np.random.random(SOLUTION_DIM)/100)
-    plot_WindFLO(np.random.random(SOLUTION_DIM)/1000)
-    plot_WindFLO(np.random.random(SOLUTION_DIM)/10000)
+    windflo = get_instance(*problem_parameters('windflo'))
+    windflo.plot_WindFLO(np.random.random(windflo.solution_dim))
+    windflo.plot_WindFLO(np.random.random(windflo.solution_dim)/10)
+    windflo.plot_WindFLO(np.random.random(windflo.solution_dim)/100)
+    windflo.plot_WindFLO(np.random.random(windflo.solution_dim)/1000)
+    windflo.plot_WindFLO(np.random.random(windflo.solution_dim)/10000)
 
 
 # # Delete auxiliary files.
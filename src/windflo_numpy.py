@@ -0,0 +1,282 @@
+import numpy as np
+import numpy.typing
+import heapq
+import f90nml
+
+'''
+Vectorized wind farm model, a fast alternative to the compiled WindFLO library for the windflo problem
+(see problem_windflo.set_backend()). It reads the same WindFLO.dat, turbine and terrain files, and
+computes the power of a batch of layouts at the same time with array operations over turbine pairs.
+
+The equations are those of the WindFLO user guide (other_src/WindFLO/docs/WindFLO-User-Guide.pdf):
+ambient wind models (constant, log, power and deaves-harris), the Jensen and Frandsen wake models, and
+linear, quadratic, energy and DWM wake merging. Other than in WindFLO:
+    - The area of the rotor inside a wake is computed exactly (intersection of two circles) instead
+      of with Monte Carlo integration, so the result is deterministic.
+    - The velocity is constant on the rotor, and the elevation of the terrain is interpolated with
+      inverse distance weighting over all the terrain points (WindFLO uses an octree), or bilinearly
+      in a precomputed grid of elevations if a WindFLO.TerrainGrid is given.
+    - The thrust coefficient is obtained from the power coefficient with actuator disk theory,
+      Cp = 4a(1-a)^2 and Ct = 4a(1-a).
+    - In the Frandsen model k = 2 and alpha = 10 * wakeExpansionCoeff[0] (the guide says that alpha is
+      typically of the order of 10 k_w), which reproduces the velocities of the turbines in
+      other_src/WindFLO/Examples/Example0/result.txt within 0.5%.
+The error with respect to the compiled library is measured with python src/main.py --validate-windflo-numpy.
+'''
+
+KAPPA = 0.4 # von Karman constant.
+POWER_LAW_EXPONENT = 0.143 # Neutrally stable atmosphere.
+
+
+
+def _circle_intersection_area(R, r, d):
+    '''Area of the intersection of circles with radius R and r whose centers are at distance d (arrays with the same shape).'''
+    d = np.maximum(d, 1e-12)
+    inside = d <= np.abs(R - r)
+    outside = d >= R + r
+    cos_1 = np.clip((d*d + r*r - R*R) / (2.0*d*r), -1.0, 1.0)
+    cos_2 = np.clip((d*d + R*R - r*r) / (2.0*d*R), -1.0, 1.0)
+    kite = 0.5 * np.sqrt(np.maximum((-d+r+R) * (d+r-R) * (d-r+R) * (d+r+R), 0.0))
+    partial = r*r*np.arccos(cos_1) + R*R*np.arccos(cos_2) - kite
+    return np.where(outside, 0.0, np.where(inside, np.pi * np.minimum(R, r)**2, partial))
+
+
+
+class windflo_numpy_engine:
+
+    def __init__(self, input_file:str, turbine_file:str, terrain_file:str=None, terrain_model:str=None, terrain_grid=None):
+        '''
+        Parameters:
+            input_file (str): WindFLO.dat with the wind and wake model parameters.
+            turbine_file (str): Parameters of the turbine, the same for every turbine of the farm.
+            terrain_file (str): x, y, z points of the terrain. If None, the terrain is flat.
+            terrain_model (str): Only 'IDW' is supported. If None, the one in input_file.
+            terrain_grid (WindFLO.TerrainGrid): Grid of elevations of terrain_file. If given, it is used instead
+                of interpolating the terrain points in every call, and terrain_model can also be 'RBF'.
+        '''
+        params = f90nml.read(input_file)['windflo_data']
+        self.rho = float(params.get('rho', 1.2))
+        model_velocity = np.array(params.get('modelvelocity', [10.0, 0.0, 0.0]), dtype=np.float64)
+        self.wind_speed = float(np.linalg.norm(model_velocity[:2]))
+        self.wind_direction = model_velocity[:2] / self.wind_speed
+        self.wind_model = str(params.get('windmodel', 'constant')).lower()
+        self.reference_height = float(params.get('referenceheight', 1.0))
+        self.surface_roughness = float(params.get('surfaceroughness', 0.0))
+        self.wake_model = str(params.get('wakemodel', 'Frandsen')).lower()
+        self.wake_merge_model = str(params.get('wakemergemodel', 'Quadratic')).lower()
+        self.wake_expansion_coeff = float(np.atleast_1d(params.get('wakeexpansioncoeff', [0.045]))[0])
+        self.power_idw = float(params.get('poweridw', 4))
+        assert self.wind_model in ('constant', 'log', 'power', 'deaves-harris'), f"Wind model {self.wind_model} not supported."
+        assert self.wake_model in ('jensen', 'frandsen'), f"Wake model {self.wake_model} not supported, only Jensen and Frandsen."
+        assert self.wake_merge_model in ('linear', 'quadratic', 'energy', 'dwm'), f"Wake merge model {self.wake_merge_model} not supported."
+
+        turbine = f90nml.read(turbine_file)['turbine_data']
+        self.height = float(turbine['height'])
+        self.diameter = float(turbine['diameter'])
+        self.radius = self.diameter / 2.0
+        self.area = np.pi * self.radius * self.radius
+        self.rated_power = float(turbine['ratedpower'])
+        cp_curve = np.array(turbine['cpcurve'], dtype=np.float64)
+        self.cp_velocity, self.cp = cp_curve[:,0], cp_curve[:,1]
+
+        # Ct as a function of Cp, with a in [0, 1/3].
+        a = np.linspace(0.0, 1.0/3.0, 2001)
+        self._ct_table_cp = 4.0*a*(1.0-a)**2
+        self._ct_table_ct = 4.0*a*(1.0-a)
+
+        self.terrain = None
+        self.terrain_grid = terrain_grid
+        terrain_model = params.get('terrainmodel', 'IDW') if terrain_model is None else terrain_model
+        if not terrain_file is None and terrain_grid is None:
+            assert terrain_model.upper() == 'IDW', "Only IDW terrain interpolation is supported."
+            self.terrain = np.loadtxt(terrain_file).reshape(-1, 3)
+
+    def elevation(self, xy:numpy.typing.NDArray[np.float_]) -> numpy.typing.NDArray[np.float_]:
+        '''Elevation of the terrain at the points xy[...,:2].'''
+        if not self.terrain_grid is None:
+            return self.terrain_grid.elevation(xy[...,0], xy[...,1])
+        if self.terrain is None:
+            return np.zeros(xy.shape[:-1])
+        d = np.sqrt(np.sum((xy[...,None,:] - self.terrain[:,:2])**2, axis=-1))
+        d = np.maximum(d, 1e-9)
+        w = d ** -self.power_idw
+        return np.sum(w * self.terrain[:,2], axis=-1) / np.sum(w, axis=-1)
+
+    def ambient_velocity(self, z:numpy.typing.NDArray[np.float_]) -> numpy.typing.NDArray[np.float_]:
+        '''Ambient wind speed at height z over the terrain.'''
+        if self.wind_model == 'constant':
+            return np.full(z.shape, self.wind_speed)
+        if self.wind_model == 'log':
+            return self.wind_speed / KAPPA * np.log(z / self.surface_roughness)
+        if self.wind_model == 'power':
+            return self.wind_speed * (z / self.reference_height) ** POWER_LAW_EXPONENT
+        h = z / self.reference_height
+        return self.wind_speed / KAPPA * (np.log(z / self.surface_roughness) + 5.75*h - 1.88*h**2 - 1.33*h**3 + 0.25*h**4)
+
+    def power_coefficient(self, u):
+        return np.interp(u, self.cp_velocity, self.cp, left=0.0, right=0.0)
+
+    def thrust_coefficient(self, u):
+        return np.interp(np.minimum(self.power_coefficient(u), self._ct_table_cp[-1]), self._ct_table_cp, self._ct_table_ct)
+
+    def _wake(self, x, ct):
+        # Wake diameter and velocity deficit at a distance x downstream of a turbine with thrust coefficient ct.
+        D = self.diameter
+        if self.wake_model == 'jensen':
+            expansion = 1.0 + 2.0 * self.wake_expansion_coeff * x / D
+            return D * expansion, (1.0 - np.sqrt(1.0 - ct)) / expansion**2
+        sqrt_1_ct = np.sqrt(np.maximum(1.0 - ct, 1e-12))
+        beta = (1.0 + sqrt_1_ct) / (2.0 * sqrt_1_ct)
+        wake_diameter = D * np.sqrt(beta + 10.0 * self.wake_expansion_coeff * x / D)
+        return wake_diameter, 0.5 * (1.0 - np.sqrt(np.maximum(1.0 - 2.0 * (D / wake_diameter)**2 * ct, 0.0)))
+
+    def _wake_overlap(self, x, distance, ct):
+        # Fraction of the rotor of a turbine inside the wakes of turbines at downwind distance x and crosswind and
+        # vertical distance distance from it (0 for turbines that are not upwind), and the velocity deficit of the wakes.
+        wake_diameter, deficit = self._wake(np.maximum(x, 0.0), ct)
+        overlap = _circle_intersection_area(wake_diameter / 2.0, self.radius, distance) / self.area
+        return np.where(x > 1e-9, overlap, 0.0), deficit
+
+    def _merge(self, u_free, u_wake, overlap):
+        # Velocity of a turbine with ambient velocity u_free[...,0] in wakes with velocities u_wake (last axis).
+        if self.wake_merge_model == 'linear':
+            return u_free[...,0] - np.sum(overlap * (u_free - u_wake), axis=-1)
+        elif self.wake_merge_model == 'quadratic':
+            return u_free[...,0] - np.sqrt(np.sum(overlap * (u_free - u_wake)**2, axis=-1))
+        elif self.wake_merge_model == 'energy':
+            return np.sqrt(np.maximum(u_free[...,0]**2 - np.sum(overlap * (u_free**2 - u_wake**2), axis=-1), 0.0))
+        return u_free[...,0] - np.max(overlap * (u_free - u_wake), axis=-1)
+
+    def run(self, positions:numpy.typing.NDArray[np.float_]):
+        '''
+        Computes the wind farms of a batch of layouts.
+
+        Parameters:
+            positions: (n, n_turbines, 2) x, y coordinates of the turbines of n layouts.
+
+        Returns:
+            (farm_power, velocity, power), the (n,) power of each farm in W, and the (n, n_turbines) velocity
+            and power of each turbine.
+        '''
+        positions = np.asarray(positions, dtype=np.float64)
+        n, n_turbines, _ = positions.shape
+        downwind = positions @ self.wind_direction
+        crosswind = positions @ np.array([-self.wind_direction[1], self.wind_direction[0]])
+        hub = self.elevation(positions) + self.height
+        # The wind profile is relative to the ground, so every hub has the same ambient velocity.
+        ambient = self.ambient_velocity(np.full(hub.shape, self.height))
+
+        # Turbines are computed from upwind to downwind, each only depends on the turbines upwind of it.
+        order = np.argsort(downwind, axis=1, kind='stable')
+        downwind, crosswind, hub, ambient = [np.take_along_axis(a, order, axis=1) for a in (downwind, crosswind, hub, ambient)]
+        velocity = np.empty((n, n_turbines))
+        ct = np.empty((n, n_turbines))
+        for k in range(n_turbines):
+            velocity[:,k] = ambient[:,k]
+            if k > 0:
+                x = downwind[:,k,None] - downwind[:,:k]
+                distance = np.sqrt((crosswind[:,k,None] - crosswind[:,:k])**2 + (hub[:,k,None] - hub[:,:k])**2)
+                overlap, deficit = self._wake_overlap(x, distance, ct[:,:k])
+                velocity[:,k] = self._merge(ambient[:,k,None], velocity[:,:k] * (1.0 - deficit), overlap)
+            ct[:,k] = self.thrust_coefficient(velocity[:,k])
+
+        power = np.minimum(0.5 * self.rho * self.area * self.power_coefficient(velocity) * velocity**3, self.rated_power)
+        # Back to the order of the turbines in positions.
+        inverse = np.argsort(order, axis=1)
+        velocity = np.take_along_axis(velocity, inverse, axis=1)
+        power = np.take_along_axis(power, inverse, axis=1)
+        return np.sum(power, axis=1), velocity, power
+
+    def incumbent(self, positions:numpy.typing.NDArray[np.float_]) -> dict:
+        '''
+        Wind farm of a single layout, positions (n_turbines, 2), to evaluate moves of its turbines with run_moves().
+        The velocity of each turbine is computed as in run_moves(), so that turbines whose wakes do not change
+        keep exactly the same velocity.
+        '''
+        positions = np.array(positions, dtype=np.float64)
+        downwind = positions @ self.wind_direction
+        crosswind = positions @ np.array([-self.wind_direction[1], self.wind_direction[0]])
+        hub = self.elevation(positions) + self.height
+        ambient = self.ambient_velocity(np.full(hub.shape, self.height))
+        velocity = ambient.copy()
+        ct = self.thrust_coefficient(velocity)
+        for k in np.argsort(downwind, kind='stable'):
+            velocity[k] = self._turbine_velocity(k, downwind, crosswind, hub, ambient, velocity, ct)
+            ct[k] = self.thrust_coefficient(velocity[k])
+        return {'positions': positions, 'downwind': downwind, 'crosswind': crosswind, 'hub': hub, 'ambient': ambient, 'velocity': velocity, 'ct': ct}
+
+    def _turbine_velocity(self, k, downwind, crosswind, hub, ambient, velocity, ct):
+        # Velocity of turbine k of a single layout. Only the wakes that reach the rotor of k are merged, in the order 
+        # of the turbines. The other wakes would add zeros, so the result is the same as merging all of them.
+        x = downwind[k] - downwind
+        distance = np.sqrt((crosswind[k] - crosswind)**2 + (hub[k] - hub)**2)
+        wake_diameter, _ = self._wake(np.maximum(x, 0.0), ct)
+        upwind = np.nonzero((x > 1e-9) & (np.maximum(distance, 1e-12) < wake_diameter / 2.0 + self.radius))[0]
+        if len(upwind) == 0:
+            return ambient[k]
+        overlap, deficit = self._wake_overlap(x[upwind], distance[upwind], ct[upwind])
+        return self._merge(ambient[k:k+1], velocity[upwind] * (1.0 - deficit), overlap)
+
+    def _wake_targets(self, j, downwind, crosswind, hub, ct_j):
+        # Turbines with a part of the rotor inside the wake of turbine j, if its thrust coefficient is ct_j.
+        x = downwind - downwind[j]
+        distance = np.sqrt((crosswind - crosswind[j])**2 + (hub - hub[j])**2)
+        wake_diameter, _ = self._wake(np.maximum(x, 0.0), ct_j)
+        return np.nonzero((x > 1e-9) & (np.maximum(distance, 1e-12) < wake_diameter / 2.0 + self.radius))[0]
+
+    def run_moves(self, incumbent:dict, turbines:numpy.typing.NDArray[np.int_], new_positions:numpy.typing.NDArray[np.float_]):
+        '''
+        Farm power of k layouts, each of them the incumbent layout (see incumbent()) with turbine turbines[i] moved 
+        to new_positions[i]. The velocities of the incumbent are reused: only the moved turbine and the turbines 
+        in its wake (before or after the move) are computed again, and then the turbines in the wake of a 
+        turbine whose velocity changed, in downwind order. Each recomputed turbine costs O(n_turbines).
+
+        Returns:
+            (farm_power, n_recomputed), the (k,) power of each farm in W and the number of turbines whose velocity
+            was computed again in each layout.
+        '''
+        turbines = np.asarray(turbines, dtype=np.intp).reshape(-1)
+        new_positions = np.asarray(new_positions, dtype=np.float64).reshape(-1, 2)
+        farm_power = np.empty(turbines.shape[0])
+        n_recomputed = np.zeros(turbines.shape[0], dtype=np.int64)
+        crosswind_direction = np.array([-self.wind_direction[1], self.wind_direction[0]])
+        new_hub = self.elevation(new_positions) + self.height
+        incumbent_power = np.minimum(0.5 * self.rho * self.area * self.power_coefficient(incumbent['velocity']) * incumbent['velocity']**3, self.rated_power)
+        for i, (m, position) in enumerate(zip(turbines, new_positions)):
+            downwind = incumbent['downwind'].copy()
+            crosswind = incumbent['crosswind'].copy()
+            hub = incumbent['hub'].copy()
+            velocity = incumbent['velocity'].copy()
+            ct = incumbent['ct'].copy()
+            ambient = incumbent['ambient']
+            # Turbines in the wake of m before the move.
+            old_targets = self._wake_targets(m, downwind, crosswind, hub, ct[m])
+            downwind[m] = position @ self.wind_direction
+            crosswind[m] = position @ crosswind_direction
+            hub[m] = new_hub[i]
+            # The affected turbines are computed in downwind order, with a heap of (downwind, index).
+            queue = [(downwind[m], m)] + [(downwind[k], k) for k in old_targets]
+            heapq.heapify(queue)
+            queued = set(k for _, k in queue)
+            changed = []
+            while len(queue) > 0:
+                _, k = heapq.heappop(queue)
+                n_recomputed[i] += 1
+                v = self._turbine_velocity(k, downwind, crosswind, hub, ambient, velocity, ct)
+                if v == velocity[k] and k != m:
+                    continue
+                ct_k = self.thrust_coefficient(v)
+                targets = self._wake_targets(k, downwind, crosswind, hub, ct_k)
+                if k != m:
+                    targets = np.concatenate((targets, self._wake_targets(k, downwind, crosswind, hub, ct[k])))
+                velocity[k] = v
+                ct[k] = ct_k
+                changed.append(k)
+                for target in targets:
+                    if not target in queued:
+                        queued.add(target)
+                        heapq.heappush(queue, (downwind[target], target))
+            changed = np.array(changed, dtype=np.intp)
+            power = np.minimum(0.5 * self.rho * self.area * self.power_coefficient(velocity[changed]) * velocity[changed]**3, self.rated_power)
+            farm_power[i] = np.sum(incumbent_power) - np.sum(incumbent_power[changed]) + np.sum(power)
+        return farm_power, n_recomputed